@@ -5,6 +5,13 @@
 
 echo "🚀 Starting Dream Companion App deployment..."
 
+# Bundle a fresh Cognito JWKS snapshot so cold starts can verify tokens without fetching it
+echo "🔑 Fetching Cognito JWKS snapshot..."
+if ! curl -sf https://cognito-idp.us-east-1.amazonaws.com/us-east-1_A7pHyJ90V/.well-known/jwks.json -o src/app/cognito_jwks.json; then
+    echo "⚠️  Could not fetch the JWKS snapshot; cold starts will fetch it from Cognito"
+    rm -f src/app/cognito_jwks.json
+fi
+
 # Build the SAM application
 echo "📦 Building SAM application..."
 sam build
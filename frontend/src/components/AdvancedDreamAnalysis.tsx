@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { fetchAuthSession } from 'aws-amplify/auth';
 import { getUserPhoneNumber } from '../helpers/user';
+import { entitlementHeaders } from '../helpers/entitlement';
 
 interface ArchetypeAnalysis {
   archetypes_found: string[];
@@ -100,15 +101,15 @@ export const AdvancedDreamAnalysis: React.FC = () => {
       const [analysisResponse, archetypeResponse, patternResponse] = await Promise.all([
         fetch(
           `${API_BASE_URL}/api/analysis/advanced/${phoneNumber.replace("+", "")}`,
-          { headers: { 'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}` } }
+          { headers: { 'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}`, ...entitlementHeaders() } }
         ),
         fetch(
           `${API_BASE_URL}/api/analysis/archetypes/${phoneNumber.replace("+", "")}`,
-          { headers: { 'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}` } }
+          { headers: { 'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}`, ...entitlementHeaders() } }
         ),
         fetch(
           `${API_BASE_URL}/api/analysis/patterns/${phoneNumber.replace("+", "")}`,
-          { headers: { 'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}` } }
+          { headers: { 'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}`, ...entitlementHeaders() } }
         )
       ]);
 
@@ -76,24 +76,30 @@ const DreamArt: React.FC<DreamArtProps> = ({ className = '', onArtReady }) => {
 
       const data = await response.json();
       
-      // For art generation, we only need basic info
-      const dreamPromises = data.dreams.slice(0, 20).map(async (dream: any) => {
-        try {
-          const dreamResponse = await fetch(
-            `${API_BASE_URL}/api/dreams/${phoneNumber.replace("+", "")}/${dream.key.split('/').pop()?.replace('.json', '')}`,
-            { headers: { 'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}` } }
-          );
-          if (dreamResponse.ok) {
-            return await dreamResponse.json();
+      // For art generation, we only need basic info - fetch the sample in one batch request
+      const ids = data.dreams.slice(0, 20).map((dream: any) => dream.key.split('/').pop()?.replace('.json', ''));
+      let validDreams: Dream[] = [];
+      if (ids.length > 0) {
+        const batchResponse = await fetch(
+          `${API_BASE_URL}/api/dreams/${phoneNumber.replace("+", "")}/batch`,
+          {
+            method: 'POST',
+            headers: {
+              'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}`,
+              'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ ids })
           }
-        } catch (error) {
-          console.warn('Failed to fetch individual dream:', error);
+        );
+        if (!batchResponse.ok) {
+          throw new Error(`Failed to fetch dreams: ${batchResponse.status}`);
         }
-        return null;
-      });
-
-      const dreamResults = await Promise.all(dreamPromises);
-      const validDreams = dreamResults.filter((dream): dream is Dream => dream !== null);
+        const batchData = await batchResponse.json();
+        if (batchData.errors && Object.keys(batchData.errors).length > 0) {
+          console.warn('Failed to fetch some dreams:', batchData.errors);
+        }
+        validDreams = batchData.dreams;
+      }
       
       setDreams(validDreams);
     } catch (error) {
@@ -34,13 +34,18 @@ const mockDreams = [
 
 const mockDreamsResponse = {
   dreams: [
-    { key: 'dream1' },
-    { key: 'dream2' }
+    { key: '1234567890/dreams/1.json' },
+    { key: '1234567890/2.json' }
   ],
   total: 2,
   hasMore: false
 };
 
+const mockBatchResponse = {
+  dreams: mockDreams,
+  errors: {}
+};
+
 describe('DreamList Component', () => {
   beforeEach(() => {
     vi.clearAllMocks();
@@ -94,11 +99,7 @@ describe('DreamList Component', () => {
       })
       .mockResolvedValueOnce({
         ok: true,
-        json: () => Promise.resolve(mockDreams[0])
-      })
-      .mockResolvedValueOnce({
-        ok: true,
-        json: () => Promise.resolve(mockDreams[1])
+        json: () => Promise.resolve(mockBatchResponse)
       });
 
     render(<DreamList />);
@@ -111,7 +112,7 @@ describe('DreamList Component', () => {
     expect(screen.getByText('Maze dream')).toBeInTheDocument();
   });
 
-  it('expands dream details when clicked', async () => {
+  it('fetches the page in one batch request', async () => {
     (global.fetch as any)
       .mockResolvedValueOnce({
         ok: true,
@@ -119,11 +120,53 @@ describe('DreamList Component', () => {
       })
       .mockResolvedValueOnce({
         ok: true,
-        json: () => Promise.resolve(mockDreams[0])
+        json: () => Promise.resolve(mockBatchResponse)
+      });
+
+    render(<DreamList />);
+
+    await waitFor(() => {
+      expect(screen.getByText('Flying dream')).toBeInTheDocument();
+    });
+
+    expect(global.fetch).toHaveBeenCalledTimes(2);
+    const [url, options] = (global.fetch as any).mock.calls[1];
+    expect(url).toMatch(/\/api\/dreams\/1234567890\/batch$/);
+    expect(options.method).toBe('POST');
+    expect(JSON.parse(options.body)).toEqual({ ids: ['1', '2'] });
+  });
+
+  it('splits large pages into batches of at most 100 ids', async () => {
+    const keys = Array.from({ length: 150 }, (_, i) => ({ key: `1234567890/dreams/d${i}.json` }));
+    (global.fetch as any)
+      .mockResolvedValueOnce({
+        ok: true,
+        json: () => Promise.resolve({ dreams: keys, total: 150, hasMore: false })
+      })
+      .mockResolvedValue({
+        ok: true,
+        json: () => Promise.resolve(mockBatchResponse)
+      });
+
+    render(<DreamList />);
+
+    await waitFor(() => {
+      expect(screen.getByText('You have 150 dreams recorded')).toBeInTheDocument();
+    });
+
+    const batchBodies = (global.fetch as any).mock.calls.slice(1).map(([, options]: any) => JSON.parse(options.body));
+    expect(batchBodies.map((body: any) => body.ids.length)).toEqual([100, 50]);
+  });
+
+  it('expands dream details when clicked', async () => {
+    (global.fetch as any)
+      .mockResolvedValueOnce({
+        ok: true,
+        json: () => Promise.resolve(mockDreamsResponse)
       })
       .mockResolvedValueOnce({
         ok: true,
-        json: () => Promise.resolve(mockDreams[1])
+        json: () => Promise.resolve(mockBatchResponse)
       });
 
     render(<DreamList />);
@@ -154,11 +197,7 @@ describe('DreamList Component', () => {
       })
       .mockResolvedValueOnce({
         ok: true,
-        json: () => Promise.resolve(mockDreams[0])
-      })
-      .mockResolvedValueOnce({
-        ok: true,
-        json: () => Promise.resolve(mockDreams[1])
+        json: () => Promise.resolve(mockBatchResponse)
       });
 
     render(<DreamList />);
@@ -196,11 +235,7 @@ describe('DreamList Component', () => {
       })
       .mockResolvedValueOnce({
         ok: true,
-        json: () => Promise.resolve(mockDreams[0])
-      })
-      .mockResolvedValueOnce({
-        ok: true,
-        json: () => Promise.resolve(mockDreams[1])
+        json: () => Promise.resolve(mockBatchResponse)
       });
 
     render(<DreamList />);
@@ -241,11 +276,7 @@ describe('DreamList Component', () => {
       })
       .mockResolvedValueOnce({
         ok: true,
-        json: () => Promise.resolve(mockDreams[0])
-      })
-      .mockResolvedValueOnce({
-        ok: true,
-        json: () => Promise.resolve(mockDreams[1])
+        json: () => Promise.resolve(mockBatchResponse)
       });
 
     render(<DreamList />);
@@ -7,6 +7,7 @@ import { DreamHeatmap } from './HeatMap';
 // Constants
 const API_BASE_URL = "https://jj1rq9vx9l.execute-api.us-east-1.amazonaws.com/Prod";
 const DREAMS_PER_PAGE = 10;
+const MAX_BATCH_DREAMS = 100;
 
 interface Dream {
   id: string;
@@ -133,70 +134,62 @@ const DreamListOptimized: React.FC = () => {
   
   // Cache for individual dreams to prevent refetching
   const [dreamCache, setDreamCache] = useState<Map<string, Dream>>(new Map());
-  // Track ongoing requests to prevent duplicates
-  const [ongoingRequests, setOngoingRequests] = useState<Set<string>>(new Set());
-
-  // Memoized function to fetch individual dream with caching
-  const fetchIndividualDream = useCallback(async (dreamKey: string, phoneNumber: string, session: any): Promise<Dream | null> => {
-    // dreamKey is the full S3 key like "16464578206/dream-id.json" or "16464578206/dreams/dream-id.json"
-    // Extract just the dream ID part (remove .json extension if present)
-    const lastPart = dreamKey.split('/').pop(); // Get the last part after the slash
-    const dreamId = lastPart?.replace('.json', '') || ''; // Remove .json extension
-    const cacheKey = dreamKey; // Use the full key as cache key
-    
-    // Check cache first
-    if (dreamCache.has(cacheKey)) {
-      return dreamCache.get(cacheKey)!;
-    }
-    
-    // Check if request is already ongoing
-    if (ongoingRequests.has(cacheKey)) {
-      return null; // Will be handled by the ongoing request
+
+  // Memoized function to fetch a page of dreams with the batch endpoint, skipping cached ones
+  const fetchDreamBatch = useCallback(async (dreamKeys: string[], phoneNumber: string, session: any): Promise<Dream[]> => {
+    // dreamKeys are full S3 keys like "16464578206/dream-id.json" or "16464578206/dreams/dream-id.json"
+    // The API takes just the dream ID part (last path segment without .json)
+    const dreamIds = dreamKeys.map(dreamKey => dreamKey.split('/').pop()?.replace('.json', '') || '');
+    const missingIds = dreamIds.filter(dreamId => dreamId && !dreamCache.has(dreamId));
+
+    // The API caps each batch at MAX_BATCH_DREAMS ids
+    const chunks: string[][] = [];
+    for (let i = 0; i < missingIds.length; i += MAX_BATCH_DREAMS) {
+      chunks.push(missingIds.slice(i, i + MAX_BATCH_DREAMS));
     }
-    
-    // Mark request as ongoing
-    setOngoingRequests(prev => new Set(prev).add(cacheKey));
-    
-    try {
-      const dreamResponse = await fetch(
-        `${API_BASE_URL}/api/dreams/${phoneNumber.replace("+", "")}/${dreamId}`,
-        { headers: { 'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}` } }
-      );
 
-      if (!dreamResponse.ok) {
-        console.warn(`Failed to fetch dream ${dreamKey}`);
-        return null;
+    const chunkResults = await Promise.all(chunks.map(async (ids) => {
+      try {
+        const batchResponse = await fetch(
+          `${API_BASE_URL}/api/dreams/${phoneNumber.replace("+", "")}/batch`,
+          {
+            method: 'POST',
+            headers: {
+              'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}`,
+              'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ ids })
+          }
+        );
+
+        if (!batchResponse.ok) {
+          console.warn(`Failed to fetch dreams ${ids.join(', ')}: ${batchResponse.status}`);
+          return [];
+        }
+
+        const batchData = await batchResponse.json();
+        if (batchData.errors && Object.keys(batchData.errors).length > 0) {
+          console.warn('Failed to fetch some dreams:', batchData.errors);
+        }
+        return batchData.dreams as Dream[];
+      } catch (error) {
+        console.warn(`Error fetching dreams ${ids.join(', ')}:`, error);
+        return [];
       }
+    }));
 
-      const dreamData: Dream = await dreamResponse.json();
-      
-      // Debug logging to see what fields are present
-      console.log(`DEBUG: Dream data for ${dreamId}:`, dreamData);
-      console.log(`DEBUG: Available analysis fields:`, {
-        response: dreamData.response,
-        analysis: dreamData.analysis,
-        interpretation: dreamData.interpretation,
-        ai_response: dreamData.ai_response,
-        dream_analysis: dreamData.dream_analysis,
-        insights: dreamData.insights
-      });
-      
-      // Cache the result
-      setDreamCache(prev => new Map(prev).set(cacheKey, dreamData));
-      
-      return dreamData;
-    } catch (error) {
-      console.warn(`Error fetching dream ${dreamKey}:`, error);
-      return null;
-    } finally {
-      // Remove from ongoing requests
-      setOngoingRequests(prev => {
-        const newSet = new Set(prev);
-        newSet.delete(cacheKey);
-        return newSet;
-      });
+    const fetched = new Map<string, Dream>();
+    chunkResults.flat().forEach(dream => fetched.set(dream.id, dream));
+
+    // Cache the results
+    if (fetched.size > 0) {
+      setDreamCache(prev => new Map([...prev, ...fetched]));
     }
-  }, [dreamCache, ongoingRequests]);
+
+    return dreamIds
+      .map(dreamId => dreamCache.get(dreamId) || fetched.get(dreamId))
+      .filter((dream): dream is Dream => dream !== undefined);
+  }, [dreamCache]);
 
   // Memoized fetchDreams function
   const fetchDreams = useCallback(async (isLoadMore = false) => {
@@ -239,13 +232,12 @@ const DreamListOptimized: React.FC = () => {
         setOffset(DREAMS_PER_PAGE);
       }
 
-      // Batch fetch individual dream details with caching
-      const dreamPromises = data.dreams.map((dream: any) => 
-        fetchIndividualDream(dream.key, phoneNumber, session)
+      // Fetch the page's dream details in batch requests, with caching
+      const dreamFiles = await fetchDreamBatch(
+        data.dreams.map((dream: any) => dream.key),
+        phoneNumber,
+        session
       );
-      
-      const dreamResults = await Promise.all(dreamPromises);
-      const dreamFiles = dreamResults.filter((dream): dream is Dream => dream !== null);
 
       // Sort by creation date (newest first) and update dreams
       const sortedDreams = dreamFiles.sort((a, b) =>
@@ -264,7 +256,7 @@ const DreamListOptimized: React.FC = () => {
       setLoading(false);
       setLoadingMore(false);
     }
-  }, [offset, fetchIndividualDream]);
+  }, [offset, fetchDreamBatch]);
 
   const handleLoadMore = useCallback(() => {
     fetchDreams(true);
@@ -0,0 +1,22 @@
+const ENTITLEMENT_TOKEN_KEY = 'entitlementToken';
+
+/**
+ * Stores the signed entitlement returned by the subscription status endpoint
+ * @param token - Entitlement token, or undefined to forget the stored one
+ */
+export const storeEntitlementToken = (token?: string): void => {
+  if (token) {
+    sessionStorage.setItem(ENTITLEMENT_TOKEN_KEY, token);
+  } else {
+    sessionStorage.removeItem(ENTITLEMENT_TOKEN_KEY);
+  }
+};
+
+/**
+ * Headers proving premium access without a server-side subscription lookup
+ * @returns X-Entitlement-Token header when a token is stored, otherwise no headers
+ */
+export const entitlementHeaders = (): Record<string, string> => {
+  const token = sessionStorage.getItem(ENTITLEMENT_TOKEN_KEY);
+  return token ? { 'X-Entitlement-Token': token } : {};
+};
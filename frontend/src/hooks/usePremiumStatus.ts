@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react';
 import { fetchAuthSession } from 'aws-amplify/auth';
 import { getUserPhoneNumber } from '../helpers/user';
+import { storeEntitlementToken } from '../helpers/entitlement';
 
 interface PremiumStatus {
   has_premium: boolean;
@@ -58,6 +59,7 @@ export const usePremiumStatus = (): PremiumStatusHook => {
       }
 
       const data = await response.json();
+      storeEntitlementToken(data.entitlement_token);
       setPremiumStatus(data);
     } catch (error) {
       console.error("Error fetching premium status:", error);
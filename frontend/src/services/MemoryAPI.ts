@@ -1,8 +1,65 @@
 import { fetchAuthSession } from 'aws-amplify/auth';
+import { entitlementHeaders } from '../helpers/entitlement';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'https://jj1rq9vx9l.execute-api.us-east-1.amazonaws.com/Prod';
 
+type UserMemories = {
+  user_id: string;
+  traits: Record<string, {
+    value: string;
+    confidence: number;
+    updated_at: string;
+  }>;
+  dream_patterns: {
+    symbols: Record<string, {
+      frequency: number;
+      first_seen: string;
+      last_seen: string;
+    }>;
+    themes: Record<string, {
+      frequency: number;
+      first_seen: string;
+      last_seen: string;
+    }>;
+    emotions: Record<string, {
+      frequency: number;
+      first_seen: string;
+      last_seen: string;
+    }>;
+  };
+  personal_context: {
+    life_events: Array<{
+      id: string;
+      value: string;
+      importance: string;
+      source: string;
+      created_at: string;
+    }>;
+    goals: Array<{
+      id: string;
+      value: string;
+      importance: string;
+      source: string;
+      created_at: string;
+    }>;
+  };
+  memories: Array<{
+    id: string;
+    content: string;
+    type: string;
+    importance: string;
+    tags: string[];
+    created_at: string;
+  }>;
+  created_at: string;
+  last_updated: string;
+  version: number;
+};
+
 class MemoryAPI {
+  // Last memories document per user with its ETag, for conditional refreshes
+  private static memoriesCache = new Map<string, { etag: string; data: UserMemories }>();
+
   private static async request<T>(endpoint: string, options: RequestInit = {}): Promise<T> {
     const url = `${API_BASE_URL}${endpoint}`;
     
@@ -13,6 +70,7 @@ class MemoryAPI {
       headers: {
         'Content-Type': 'application/json',
         'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}`,
+        ...entitlementHeaders(),
         ...options.headers,
       },
       ...options,
@@ -33,59 +91,40 @@ class MemoryAPI {
     }
   }
 
-  // Get detailed memories for a specific user
-  static async getUserMemories(userId: string) {
-    return this.request<{
-      user_id: string;
-      traits: Record<string, {
-        value: string;
-        confidence: number;
-        updated_at: string;
-      }>;
-      dream_patterns: {
-        symbols: Record<string, {
-          frequency: number;
-          first_seen: string;
-          last_seen: string;
-        }>;
-        themes: Record<string, {
-          frequency: number;
-          first_seen: string;
-          last_seen: string;
-        }>;
-        emotions: Record<string, {
-          frequency: number;
-          first_seen: string;
-          last_seen: string;
-        }>;
-      };
-      personal_context: {
-        life_events: Array<{
-          id: string;
-          value: string;
-          importance: string;
-          source: string;
-          created_at: string;
-        }>;
-        goals: Array<{
-          id: string;
-          value: string;
-          importance: string;
-          source: string;
-          created_at: string;
-        }>;
-      };
-      memories: Array<{
-        id: string;
-        content: string;
-        type: string;
-        importance: string;
-        tags: string[];
-        created_at: string;
-      }>;
-      created_at: string;
-      last_updated: string;
-    }>(`/api/memories/user/${userId}`);
+  // Get detailed memories for a specific user; unchanged memories are revalidated, not re-downloaded
+  static async getUserMemories(userId: string): Promise<UserMemories> {
+    const url = `${API_BASE_URL}/api/memories/user/${userId}`;
+    const cached = this.memoriesCache.get(userId);
+    const session = await fetchAuthSession();
+
+    try {
+      const response = await fetch(url, {
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${session?.tokens?.idToken?.toString()}`,
+          ...entitlementHeaders(),
+          ...(cached ? { 'If-None-Match': cached.etag } : {}),
+        },
+      });
+
+      if (response.status === 304 && cached) {
+        return cached.data;
+      }
+
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      const data: UserMemories = await response.json();
+      const etag = response.headers.get('ETag');
+      if (etag) {
+        this.memoriesCache.set(userId, { etag, data });
+      }
+      return data;
+    } catch (error) {
+      console.error('API request failed:', error);
+      throw error;
+    }
   }
 
   // Get user memory summary
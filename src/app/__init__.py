@@ -5,9 +5,11 @@ from .auth import auth_bp
 from .routes import routes_bp
 from .premium import premium_bp
 from .dream_analysis import dream_analysis_bp
-from .stripe_integration import stripe_bp
+from .stripe_integration import stripe_bp, sync_stripe_customers_command
 from .memories import memories_bp
 from .feedback import feedback_bp
+from .bootstrap import bootstrap_command
+from .memory_migration import migrate_memories_command
 
 def create_app(config_override=None):
     """Create and configure the Flask application"""
@@ -27,7 +29,12 @@ def create_app(config_override=None):
         'http://localhost:5173',
         'http://localhost:5174',
         'http://localhost:8080'
-    ], supports_credentials=True, vary_header=False)
+    ], supports_credentials=True, vary_header=False, expose_headers=['ETag', 'X-Memories-Version'])
+
+    # Provisioning runs explicitly (flask bootstrap), never per request
+    app.cli.add_command(bootstrap_command)
+    app.cli.add_command(migrate_memories_command)
+    app.cli.add_command(sync_stripe_customers_command)
 
     # Register blueprints
     with app.app_context():
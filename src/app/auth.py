@@ -1,8 +1,12 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g, has_request_context
 import boto3
 import jwt
 import json
 import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
 from functools import wraps
 from datetime import datetime, timedelta
 import requests
@@ -14,57 +18,209 @@ COGNITO_REGION = 'us-east-1'
 COGNITO_USER_POOL_ID = 'us-east-1_A7pHyJ90V'
 COGNITO_APP_CLIENT_ID = '4ae3obdbcsojg3cn1aq7njf229'
 
-# Cache for JWKs (JSON Web Key Set)
+COGNITO_JWKS_URL = f'https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_USER_POOL_ID}/.well-known/jwks.json'
+
+# JWKS refresh policy: keys are refetched in the background shortly before
+# they expire and the current keys keep being served meanwhile. A token
+# signed with an unknown kid forces a refetch, at most once per interval.
+JWKS_CACHE_TTL = int(os.getenv('JWKS_CACHE_TTL', '3600'))
+JWKS_REFRESH_AHEAD = int(os.getenv('JWKS_REFRESH_AHEAD', '300'))
+JWKS_FORCED_REFRESH_INTERVAL = int(os.getenv('JWKS_FORCED_REFRESH_INTERVAL', '60'))
+
+# Optional JWKS snapshot bundled with the deployment (written by deploy.sh),
+# so a cold start can verify tokens without waiting on Cognito
+COGNITO_JWKS_SNAPSHOT = os.getenv(
+    'COGNITO_JWKS_SNAPSHOT', os.path.join(os.path.dirname(__file__), 'cognito_jwks.json')
+)
+
+# Cache for JWKs (JSON Web Key Set): the raw document and its keys parsed once per fetch
 _jwks_cache = None
 _jwks_cache_expiry = None
+_jwks_keys = {}
+_jwks_lock = threading.Lock()
+_jwks_fetch_lock = threading.Lock()
+_jwks_refresh_thread = None
+_jwks_last_forced_refresh = 0.0
+
+# Claims of tokens that already passed verification, keyed by token digest,
+# so a token reused across requests is only RSA-verified once
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv('VERIFIED_TOKEN_CACHE_SIZE', '1024'))
+_verified_tokens = OrderedDict()
+_verified_tokens_lock = threading.Lock()
+_verified_token_stats = {'hits': 0, 'misses': 0}
+
+def parse_jwks(jwks: dict) -> dict:
+    """Build a kid -> RSA public key map from a JWKS document"""
+    keys = {}
+    for key in jwks.get('keys', []):
+        try:
+            keys[key['kid']] = jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
+        except Exception as e:
+            print(f"Skipping unusable JWKS key {key.get('kid')}: {e}")
+    return keys
+
+def install_cognito_jwks(jwks: dict, expiry: datetime):
+    """Make a JWKS document the current key set"""
+    global _jwks_cache, _jwks_cache_expiry, _jwks_keys
+
+    keys = parse_jwks(jwks)
+    _jwks_cache = jwks
+    _jwks_cache_expiry = expiry
+    _jwks_keys = keys
+    purge_verified_tokens(set(keys))
+
+def refresh_cognito_public_keys() -> bool:
+    """Fetch the JWKS from Cognito and install it, keeping the current keys on failure"""
+    with _jwks_fetch_lock:
+        try:
+            response = requests.get(COGNITO_JWKS_URL, timeout=10)
+            response.raise_for_status()
+            install_cognito_jwks(response.json(), datetime.utcnow() + timedelta(seconds=JWKS_CACHE_TTL))
+            return True
+        except Exception as e:
+            print(f"Error fetching Cognito JWKS: {e}")
+            return False
+
+def refresh_cognito_public_keys_in_background():
+    """Start a JWKS refresh unless one is already running"""
+    global _jwks_refresh_thread
+
+    with _jwks_lock:
+        if _jwks_refresh_thread and _jwks_refresh_thread.is_alive():
+            return
+        _jwks_refresh_thread = threading.Thread(target=refresh_cognito_public_keys, daemon=True)
+        _jwks_refresh_thread.start()
+
+def load_cognito_jwks_snapshot() -> bool:
+    """Install the bundled JWKS snapshot, marked as due for refresh"""
+    if not COGNITO_JWKS_SNAPSHOT or not os.path.exists(COGNITO_JWKS_SNAPSHOT):
+        return False
 
-def get_cognito_public_keys():
-    """Get the public keys from AWS Cognito for JWT verification"""
-    global _jwks_cache, _jwks_cache_expiry
-    
-    # Check if cache is still valid (cache for 1 hour)
-    if _jwks_cache and _jwks_cache_expiry and datetime.utcnow() < _jwks_cache_expiry:
-        return _jwks_cache
-    
     try:
-        # Fetch the JWKS from Cognito
-        jwks_url = f'https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_USER_POOL_ID}/.well-known/jwks.json'
-        response = requests.get(jwks_url, timeout=10)
-        response.raise_for_status()
-        
-        jwks = response.json()
-        _jwks_cache = jwks
-        _jwks_cache_expiry = datetime.utcnow() + timedelta(hours=1)
-        
-        return jwks
+        with open(COGNITO_JWKS_SNAPSHOT) as snapshot:
+            jwks = json.load(snapshot)
+        with _jwks_lock:
+            install_cognito_jwks(jwks, datetime.utcnow())
+        return bool(_jwks_keys)
     except Exception as e:
-        print(f"Error fetching Cognito JWKS: {e}")
-        return None
+        print(f"Error loading Cognito JWKS snapshot: {e}")
+        return False
+
+def clear_cognito_public_keys():
+    """Forget the cached JWKS (the next lookup fetches it again)"""
+    global _jwks_cache, _jwks_cache_expiry, _jwks_keys, _jwks_last_forced_refresh
+
+    with _jwks_lock:
+        _jwks_cache = None
+        _jwks_cache_expiry = None
+        _jwks_keys = {}
+        _jwks_last_forced_refresh = 0.0
+
+def get_cognito_public_keys():
+    """Get the public keys from AWS Cognito for JWT verification, as a kid -> key map"""
+    if _jwks_keys:
+        # Serve the current keys, refreshing them in the background when they are about to expire
+        if datetime.utcnow() >= _jwks_cache_expiry - timedelta(seconds=JWKS_REFRESH_AHEAD):
+            refresh_cognito_public_keys_in_background()
+        return _jwks_keys
+
+    if load_cognito_jwks_snapshot():
+        refresh_cognito_public_keys_in_background()
+        return _jwks_keys
+
+    refresh_cognito_public_keys()
+    return _jwks_keys or None
+
+def force_refresh_cognito_public_keys() -> bool:
+    """Refetch the JWKS for an unknown kid, at most once per JWKS_FORCED_REFRESH_INTERVAL"""
+    global _jwks_last_forced_refresh
+
+    now = time.time()
+    if now - _jwks_last_forced_refresh < JWKS_FORCED_REFRESH_INTERVAL:
+        return False
+    _jwks_last_forced_refresh = now
+    return refresh_cognito_public_keys()
 
 def get_public_key(token):
     """Get the public key for the given JWT token"""
-    jwks = get_cognito_public_keys()
-    if not jwks:
+    keys = get_cognito_public_keys()
+    if not keys:
         return None
     
     try:
         # Decode the JWT header to get the key ID
-        unverified_header = jwt.get_unverified_header(token)
-        kid = unverified_header.get('kid')
+        kid = jwt.get_unverified_header(token).get('kid')
         
-        # Find the matching key
-        for key in jwks.get('keys', []):
-            if key.get('kid') == kid:
-                return jwt.algorithms.RSAAlgorithm.from_jwk(json.dumps(key))
+        # Keys may have rotated since the last fetch
+        if kid not in keys and force_refresh_cognito_public_keys():
+            keys = _jwks_keys
         
-        return None
+        return keys.get(kid)
     except Exception as e:
         print(f"Error getting public key: {e}")
         return None
 
+def token_digest(token: str) -> str:
+    """Cache key for a token (the token itself is never kept)"""
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def get_cached_token_claims(digest: str):
+    """Claims for a previously verified token, or None if unknown or expired"""
+    with _verified_tokens_lock:
+        entry = _verified_tokens.get(digest)
+        if entry and time.time() < entry['expires_at']:
+            _verified_tokens.move_to_end(digest)
+            _verified_token_stats['hits'] += 1
+            return dict(entry['claims'])
+
+        if entry:
+            del _verified_tokens[digest]
+        _verified_token_stats['misses'] += 1
+        return None
+
+def cache_verified_token(digest: str, kid: str, claims: dict):
+    """Remember a verified token's claims until the token expires"""
+    expires_at = claims.get('exp')
+    if not isinstance(expires_at, (int, float)) or expires_at <= time.time():
+        return
+
+    with _verified_tokens_lock:
+        _verified_tokens[digest] = {'claims': dict(claims), 'kid': kid, 'expires_at': expires_at}
+        _verified_tokens.move_to_end(digest)
+        while len(_verified_tokens) > VERIFIED_TOKEN_CACHE_SIZE:
+            _verified_tokens.popitem(last=False)
+
+def purge_verified_tokens(valid_kids=None):
+    """Forget verified tokens signed by keys no longer in the JWKS (all of them if valid_kids is None)"""
+    with _verified_tokens_lock:
+        if valid_kids is None:
+            _verified_tokens.clear()
+            return
+
+        for digest in [digest for digest, entry in _verified_tokens.items() if entry['kid'] not in valid_kids]:
+            del _verified_tokens[digest]
+
+def get_verified_token_cache_stats() -> dict:
+    """Hit/miss counters and current size of the verified token cache"""
+    with _verified_tokens_lock:
+        return {**_verified_token_stats, 'size': len(_verified_tokens)}
+
+def clear_verified_token_cache():
+    """Empty the verified token cache and reset its counters"""
+    with _verified_tokens_lock:
+        _verified_tokens.clear()
+        _verified_token_stats['hits'] = 0
+        _verified_token_stats['misses'] = 0
+
 def verify_cognito_token(token):
     """Verify and decode a Cognito JWT token"""
     try:
+        # Tokens verified by an earlier request skip signature verification
+        digest = token_digest(token)
+        cached_claims = get_cached_token_claims(digest)
+        if cached_claims is not None:
+            return cached_claims
+        
         # Get the public key
         public_key = get_public_key(token)
         if not public_key:
@@ -79,6 +235,7 @@ def verify_cognito_token(token):
             issuer=f'https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_USER_POOL_ID}'
         )
         
+        cache_verified_token(digest, jwt.get_unverified_header(token).get('kid'), decoded_token)
         return decoded_token
     except jwt.ExpiredSignatureError:
         print("JWT token has expired")
@@ -90,6 +247,58 @@ def verify_cognito_token(token):
         print(f"Error verifying JWT token: {e}")
         return None
 
+def normalize_phone_number(phone_number: str) -> str:
+    """Phone number as used in storage keys and URLs (no + prefix)"""
+    return (phone_number or '').replace('+', '')
+
+class AuthContext:
+    """The authenticated caller of the current request.
+
+    Created once by require_cognito_auth and stored on flask.g; the derived
+    values are computed on first use and shared by every decorator and
+    handler that runs for the request.
+    """
+
+    def __init__(self, claims: dict):
+        self.claims = claims
+        self._user_info = None
+        self._premium = None
+
+    @property
+    def user_info(self) -> dict:
+        if self._user_info is None:
+            self._user_info = {
+                'username': self.claims.get('username'),
+                'sub': self.claims.get('sub'),
+                'email': self.claims.get('email'),
+                'phone_number': self.claims.get('phone_number'),
+                'cognito_groups': self.claims.get('cognito:groups', []),
+                'token_use': self.claims.get('token_use'),
+                'client_id': self.claims.get('client_id')
+            }
+        return self._user_info
+
+    @property
+    def phone_number(self) -> str:
+        return normalize_phone_number(self.claims.get('phone_number'))
+
+    @property
+    def groups(self) -> list:
+        return self.claims.get('cognito:groups', [])
+
+    def has_premium(self) -> bool:
+        """Whether the caller has an active premium subscription (looked up once per request)"""
+        if self._premium is None:
+            from .premium import is_premium_user
+            self._premium = bool(self.phone_number) and is_premium_user(self.phone_number)
+        return self._premium
+
+def get_auth_context():
+    """The current request's AuthContext, or None outside authenticated requests"""
+    if not has_request_context():
+        return None
+    return g.get('auth_context')
+
 def require_cognito_auth(f):
     """Decorator to require valid Cognito authentication"""
     @wraps(f)
@@ -110,6 +319,7 @@ def require_cognito_auth(f):
         
         # Add user info to the request context
         request.cognito_user = decoded_token
+        g.auth_context = AuthContext(decoded_token)
         
         return f(*args, **kwargs)
     
@@ -117,19 +327,14 @@ def require_cognito_auth(f):
 
 def get_cognito_user_info():
     """Get user information from the current Cognito token"""
+    context = get_auth_context()
+    if context:
+        return context.user_info
+    
     if not hasattr(request, 'cognito_user'):
         return None
     
-    user_info = request.cognito_user
-    return {
-        'username': user_info.get('username'),
-        'sub': user_info.get('sub'),
-        'email': user_info.get('email'),
-        'phone_number': user_info.get('phone_number'),
-        'cognito_groups': user_info.get('cognito:groups', []),
-        'token_use': user_info.get('token_use'),
-        'client_id': user_info.get('client_id')
-    }
+    return AuthContext(request.cognito_user).user_info
 
 @auth_bp.route('/verify', methods=['POST'])
 def verify_token():
@@ -0,0 +1,103 @@
+import click
+import boto3
+from .premium import premium_table_name
+from .memories import memories_table_name
+from .feedback import feedback_table_name
+from .stripe_integration import stripe_customers_table_name, stripe_events_table_name, stripe_subscriptions_table_name
+
+def table_definitions() -> list:
+    """create_table arguments for every DynamoDB table the app uses (plus an optional TimeToLiveAttribute)"""
+    return [
+        {
+            'TableName': premium_table_name,
+            'KeySchema': [{'AttributeName': 'phone_number', 'KeyType': 'HASH'}],
+            'AttributeDefinitions': [{'AttributeName': 'phone_number', 'AttributeType': 'S'}],
+            'BillingMode': 'PAY_PER_REQUEST'
+        },
+        {
+            'TableName': memories_table_name,
+            'KeySchema': [
+                {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'entry_key', 'KeyType': 'RANGE'}
+            ],
+            'AttributeDefinitions': [
+                {'AttributeName': 'user_id', 'AttributeType': 'S'},
+                {'AttributeName': 'entry_key', 'AttributeType': 'S'}
+            ],
+            'BillingMode': 'PAY_PER_REQUEST'
+        },
+        {
+            'TableName': feedback_table_name,
+            'KeySchema': [{'AttributeName': 'feedback_id', 'KeyType': 'HASH'}],
+            'AttributeDefinitions': [
+                {'AttributeName': 'feedback_id', 'AttributeType': 'S'},
+                {'AttributeName': 'user_id', 'AttributeType': 'S'},
+                {'AttributeName': 'created_at', 'AttributeType': 'S'}
+            ],
+            'GlobalSecondaryIndexes': [{
+                'IndexName': 'user-feedback-index',
+                'KeySchema': [
+                    {'AttributeName': 'user_id', 'KeyType': 'HASH'},
+                    {'AttributeName': 'created_at', 'KeyType': 'RANGE'}
+                ],
+                'Projection': {'ProjectionType': 'ALL'}
+            }],
+            'BillingMode': 'PAY_PER_REQUEST'
+        },
+        {
+            'TableName': stripe_customers_table_name,
+            'KeySchema': [{'AttributeName': 'phone_number', 'KeyType': 'HASH'}],
+            'AttributeDefinitions': [{'AttributeName': 'phone_number', 'AttributeType': 'S'}],
+            'BillingMode': 'PAY_PER_REQUEST'
+        },
+        {
+            'TableName': stripe_subscriptions_table_name,
+            'KeySchema': [{'AttributeName': 'subscription_id', 'KeyType': 'HASH'}],
+            'AttributeDefinitions': [{'AttributeName': 'subscription_id', 'AttributeType': 'S'}],
+            'BillingMode': 'PAY_PER_REQUEST'
+        },
+        {
+            'TableName': stripe_events_table_name,
+            'KeySchema': [{'AttributeName': 'event_id', 'KeyType': 'HASH'}],
+            'AttributeDefinitions': [{'AttributeName': 'event_id', 'AttributeType': 'S'}],
+            'BillingMode': 'PAY_PER_REQUEST',
+            'TimeToLiveAttribute': 'expires_at'
+        }
+    ]
+
+def ensure_tables(dynamodb=None) -> dict:
+    """Create any missing tables and wait for them to become active.
+
+    Returns table name -> 'exists' or 'created'. Run once per environment
+    (flask bootstrap) instead of checking from the request path.
+    """
+    dynamodb = dynamodb or boto3.resource('dynamodb')
+    client = dynamodb.meta.client
+    results = {}
+
+    for definition in table_definitions():
+        ttl_attribute = definition.pop('TimeToLiveAttribute', None)
+        table_name = definition['TableName']
+        try:
+            client.describe_table(TableName=table_name)
+            results[table_name] = 'exists'
+            continue
+        except client.exceptions.ResourceNotFoundException:
+            pass
+
+        table = dynamodb.create_table(**definition)
+        table.wait_until_exists()
+        if ttl_attribute:
+            client.update_time_to_live(
+                TableName=table_name,
+                TimeToLiveSpecification={'Enabled': True, 'AttributeName': ttl_attribute}
+            )
+        results[table_name] = 'created'
+
+    return results
+
+@click.command('bootstrap')
+def bootstrap_command():
+    """Provision the DynamoDB tables used by the app."""
+    for table_name, status in ensure_tables().items():
+        click.echo(f"{table_name}: {status}")
@@ -1,21 +1,267 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g, has_request_context
 from flask_cors import cross_origin
-import boto3
 import os
 import json
 import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
 from datetime import datetime, timedelta
-from collections import Counter
+from collections import Counter, OrderedDict
 from functools import wraps
 from .premium import require_premium, check_premium_access
 from .auth import require_cognito_auth
+from .keyword_matcher import KeywordMatcher
+from .dream_store import (
+    get_dream_manifest, fetch_concurrently, get_shared_s3_client, manifest_entry,
+    features_key, aggregates_key, load_index_document, save_index_document, iter_dream_events
+)
 
 dream_analysis_bp = Blueprint('dream_analysis_bp', __name__)
 
-# Initialize S3 client
-s3_client = boto3.client('s3')
+# Initialize S3 client (shared, pooled for concurrent dream fetches)
+s3_client = get_shared_s3_client()
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 
+# The analysis endpoints are requested together by the frontend, so a user's
+# corpus is kept briefly in memory and shared between them.
+DREAM_CORPUS_TTL = int(os.getenv('DREAM_CORPUS_TTL', '60'))
+DREAM_CORPUS_CACHE_SIZE = int(os.getenv('DREAM_CORPUS_CACHE_SIZE', '32'))
+
+# Bump when extract_dream_features changes so stored records are recomputed
+FEATURE_VERSION = 1
+
+# Bump when the running aggregate layout changes so stored aggregates are rebuilt
+AGGREGATE_VERSION = 1
+
+# Number of most recent dreams behind the archetype endpoint
+RECENT_ARCHETYPE_DREAMS = 5
+
+_corpus_cache = OrderedDict()
+_corpus_cache_lock = threading.Lock()
+
+class DreamRepository:
+    """Keeps a user's running analysis aggregate and shares it across analysis endpoints.
+
+    Dreams are listed from the user's manifest (new and legacy paths, without
+    metadata/themes files) and fetched concurrently. Per-dream feature records
+    are persisted in the user's features index keyed by object key and ETag,
+    so only new or changed dreams are downloaded and scored, and the analysis
+    endpoints render from a running aggregate of those records. Aggregates are
+    cached per request and in a short-TTL process cache.
+    """
+
+    def __init__(self, s3, bucket, ttl=None, max_workers=None):
+        self.s3 = s3
+        self.bucket = bucket
+        self.ttl = DREAM_CORPUS_TTL if ttl is None else ttl
+        self.max_workers = max_workers
+        self.last_fetch_stats = {}
+
+    def list_dream_entries(self, phone_number: str) -> list:
+        """Manifest entries for the user's dreams, newest first"""
+        return get_dream_manifest(self.s3, self.bucket, phone_number)['dreams']
+
+    def _fetch_entries(self, entries: list) -> tuple:
+        """(entry, dream document) pairs for the entries that could be read, and the entries holding invalid JSON"""
+        self.last_fetch_stats = {}
+        results = fetch_concurrently(
+            self._fetch_dream,
+            [entry['key'] for entry in entries],
+            max_workers=self.max_workers,
+            stats=self.last_fetch_stats
+        )
+
+        fetched = []
+        unreadable = []
+        for entry, (key, dream_data, error) in zip(entries, results):
+            if error is not None:
+                print(f"Error reading dream {key}: {error}")
+                # Invalid content stays invalid until the object changes; S3 errors are retried
+                if isinstance(error, ValueError):
+                    unreadable.append(entry)
+                continue
+            fetched.append((entry, dream_data))
+        return fetched, unreadable
+
+    def _fetch_dream(self, key: str) -> dict:
+        response = self.s3.get_object(Bucket=self.bucket, Key=key)
+        return json.loads(response['Body'].read().decode('utf-8'))
+
+    def _features_for(self, phone_number: str, entries: list, prune: bool) -> list:
+        """Feature records for the given entries, scoring only new or changed dreams.
+
+        Dreams holding invalid JSON get a tombstone record at their ETag, so
+        they are not downloaded again until they change, and are left out.
+        """
+        key = features_key(phone_number)
+        document = load_index_document(self.s3, self.bucket, key) or {}
+        records = document.get('features', {}) if document.get('version') == FEATURE_VERSION else {}
+
+        stale = [entry for entry in entries if not feature_record_is_current(records.get(entry['key']), entry)]
+        changed = bool(stale)
+        fetched, unreadable = self._fetch_entries(stale)
+        for entry, dream_data in fetched:
+            record = extract_dream_features(dream_data)
+            record['key'] = entry['key']
+            record['etag'] = entry.get('etag', '')
+            records[entry['key']] = record
+        for entry in unreadable:
+            records[entry['key']] = {
+                'key': entry['key'],
+                'etag': entry.get('etag', ''),
+                'feature_version': FEATURE_VERSION,
+                'unreadable': True
+            }
+
+        if prune:
+            # Drop records for dreams that have been deleted
+            listed = {entry['key'] for entry in entries}
+            for record_key in [record_key for record_key in records if record_key not in listed]:
+                del records[record_key]
+                changed = True
+
+        if changed:
+            save_index_document(self.s3, self.bucket, key, {
+                'version': FEATURE_VERSION,
+                'generatedAt': datetime.utcnow().isoformat(),
+                'features': records
+            })
+
+        return [
+            records[entry['key']] for entry in entries
+            if entry['key'] in records and not records[entry['key']].get('unreadable')
+        ]
+
+    def load_aggregate(self, phone_number: str):
+        """Load the user's running analysis aggregate, brought up to date with the manifest.
+
+        Returns None when the user has no dream objects at all. Dreams newer
+        than everything already folded are added in place; deleted or changed
+        dreams and out-of-order additions trigger a rebuild from the stored
+        feature records.
+        """
+        cached = self._cached('aggregate', phone_number)
+        if cached is not None:
+            return cached
+
+        entries = self.list_dream_entries(phone_number)
+        if not entries:
+            return None
+
+        aggregate = self._current_aggregate(phone_number, entries)
+        self._store('aggregate', phone_number, aggregate)
+        return aggregate
+
+    def add_dream(self, phone_number: str, key: str) -> bool:
+        """Fold a newly written dream into the user's stored aggregate in place.
+
+        Returns False when the dream could not be folded incrementally; the
+        next load_aggregate then brings the aggregate up to date.
+        """
+        aggregate = self._load_stored_aggregate(phone_number)
+        if aggregate is None or key in aggregate['dreams']:
+            return False
+
+        head = self.s3.head_object(Bucket=self.bucket, Key=key)
+        head['Key'] = key
+        entry = manifest_entry(head)
+        return self._fold_new_entries(phone_number, aggregate, [entry])
+
+    def _current_aggregate(self, phone_number: str, entries: list) -> dict:
+        aggregate = self._load_stored_aggregate(phone_number)
+        listed = {entry['key']: entry.get('etag', '') for entry in entries}
+
+        if aggregate is not None and all(listed.get(key) == etag for key, etag in aggregate['dreams'].items()):
+            # Entries are newest first; fold additions oldest first
+            new_entries = [entry for entry in reversed(entries) if entry['key'] not in aggregate['dreams']]
+            if not new_entries or self._fold_new_entries(phone_number, aggregate, new_entries):
+                return aggregate
+
+        aggregate = build_dream_aggregate(self._features_for(phone_number, list(reversed(entries)), prune=True))
+        self._save_aggregate(phone_number, aggregate)
+        return aggregate
+
+    def _fold_new_entries(self, phone_number: str, aggregate: dict, entries: list) -> bool:
+        features_list = sorted(
+            self._features_for(phone_number, entries, prune=False),
+            key=lambda x: x['createdAt'] or ''
+        )
+        if any((features['createdAt'] or '') < aggregate['last_created_at'] for features in features_list):
+            return False
+
+        for features in features_list:
+            fold_dream_features(aggregate, features, features['key'], features['etag'])
+        if features_list:
+            self._save_aggregate(phone_number, aggregate)
+        return True
+
+    def _load_stored_aggregate(self, phone_number: str):
+        aggregate = load_index_document(self.s3, self.bucket, aggregates_key(phone_number))
+        if aggregate is None or aggregate.get('version') != AGGREGATE_VERSION:
+            return None
+        return aggregate
+
+    def _save_aggregate(self, phone_number: str, aggregate: dict):
+        aggregate['updatedAt'] = datetime.utcnow().isoformat()
+        save_index_document(self.s3, self.bucket, aggregates_key(phone_number), aggregate)
+
+    def _cached(self, kind: str, phone_number: str):
+        cache_key = (kind, phone_number)
+        if has_request_context() and cache_key in g.setdefault('dream_corpus', {}):
+            return g.dream_corpus[cache_key]
+
+        with _corpus_cache_lock:
+            cached = _corpus_cache.get(cache_key)
+            if cached is None:
+                return None
+            if time.time() - cached[0] > self.ttl:
+                del _corpus_cache[cache_key]
+                return None
+            result = cached[1]
+
+        if has_request_context():
+            g.dream_corpus[cache_key] = result
+        return result
+
+    def _store(self, kind: str, phone_number: str, result):
+        cache_key = (kind, phone_number)
+        if has_request_context():
+            g.setdefault('dream_corpus', {})[cache_key] = result
+
+        with _corpus_cache_lock:
+            _corpus_cache[cache_key] = (time.time(), result)
+            _corpus_cache.move_to_end(cache_key)
+            while len(_corpus_cache) > DREAM_CORPUS_CACHE_SIZE:
+                _corpus_cache.popitem(last=False)
+
+def get_dream_repository() -> DreamRepository:
+    """Dream repository over the configured bucket"""
+    return DreamRepository(s3_client, S3_BUCKET_NAME)
+
+def clear_dream_corpus_cache():
+    """Drop every cached dream corpus"""
+    with _corpus_cache_lock:
+        _corpus_cache.clear()
+
+def apply_dream_analysis_event(s3, event: dict) -> int:
+    """Fold newly written dreams into their owners' running aggregates from S3 notifications.
+
+    Removals need no work here: the next analysis request sees the key missing
+    from the manifest and rebuilds. Returns the number of dreams folded.
+    """
+    applied = 0
+    for event_name, bucket, key, phone_number in iter_dream_events(event):
+        if event_name.startswith('ObjectRemoved'):
+            continue
+        try:
+            if DreamRepository(s3, bucket).add_dream(phone_number, key):
+                applied += 1
+        except Exception as e:
+            print(f"Error updating dream aggregate for {key}: {e}")
+
+    return applied
+
 # Dream archetypes and their meanings with comprehensive keyword lists
 DREAM_ARCHETYPES = {
     'water': {
@@ -103,6 +349,84 @@ STOPWORDS = set([
     'it\'s','im','i\'m','you\'re','we\'re','they\'re','there\'s','here\'s'
 ])
 
+# Emotion lexicons used to classify each dream
+EMOTION_WORDS = {
+    'fear': ['afraid', 'scared', 'terrified', 'fear', 'panic', 'anxiety', 'worried', 'nervous', 'dread', 'frightened', 'alarmed', 'apprehensive'],
+    'joy': ['happy', 'joy', 'excited', 'elated', 'ecstatic', 'cheerful', 'delighted', 'thrilled', 'euphoric', 'blissful', 'jubilant', 'gleeful'],
+    'sadness': ['sad', 'depressed', 'melancholy', 'grief', 'sorrow', 'mourning', 'dejected', 'downcast', 'blue', 'gloomy', 'despondent', 'heartbroken'],
+    'anger': ['angry', 'furious', 'rage', 'irritated', 'mad', 'enraged', 'livid', 'outraged', 'fuming', 'incensed', 'wrathful', 'hostile'],
+    'peace': ['calm', 'peaceful', 'serene', 'tranquil', 'relaxed', 'content', 'satisfied', 'at ease', 'composed', 'placid', 'untroubled', 'harmonious'],
+    'love': ['love', 'loving', 'affectionate', 'caring', 'tender', 'romantic', 'passionate', 'devoted', 'adoring', 'fond', 'cherished', 'beloved'],
+    'surprise': ['surprised', 'shocked', 'amazed', 'astonished', 'startled', 'bewildered', 'stunned', 'astounded', 'flabbergasted', 'dumbfounded'],
+    'disgust': ['disgusted', 'repulsed', 'revolted', 'sickened', 'nauseated', 'appalled', 'horrified', 'repugnant', 'abhorrent', 'loathsome']
+}
+
+# Shorter emotion lexicon used by the psychological pattern analysis
+PATTERN_EMOTION_WORDS = {
+    'fear': ['afraid', 'scared', 'terrified', 'fear', 'panic', 'anxiety', 'worried', 'nervous', 'dread'],
+    'joy': ['happy', 'joy', 'excited', 'elated', 'ecstatic', 'cheerful', 'delighted', 'thrilled', 'euphoric'],
+    'sadness': ['sad', 'depressed', 'melancholy', 'grief', 'sorrow', 'mourning', 'dejected', 'downcast', 'blue'],
+    'anger': ['angry', 'furious', 'rage', 'irritated', 'mad', 'enraged', 'livid', 'outraged', 'fuming'],
+    'peace': ['calm', 'peaceful', 'serene', 'tranquil', 'relaxed', 'content', 'satisfied', 'at ease', 'composed'],
+    'love': ['love', 'loving', 'affectionate', 'caring', 'tender', 'romantic', 'passionate', 'devoted'],
+    'surprise': ['surprised', 'shocked', 'amazed', 'astonished', 'startled', 'bewildered', 'stunned'],
+    'disgust': ['disgusted', 'repulsed', 'revolted', 'sickened', 'nauseated', 'appalled', 'horrified']
+}
+
+# Sentiment fallback when no specific emotion is detected
+NEGATIVE_SENTIMENT_WORDS = [
+    'bad', 'terrible', 'awful', 'horrible', 'nightmare', 'scary', 'frightening',
+    'worried', 'anxious', 'stressed', 'troubled', 'disturbed', 'upset', 'concerned',
+    'difficult', 'hard', 'challenging', 'struggling', 'fighting', 'conflict',
+    'dark', 'cold', 'lonely', 'lost', 'confused', 'overwhelmed', 'trapped',
+    'hurt', 'pain', 'suffering', 'agony', 'torment', 'misery', 'despair',
+    'angry', 'frustrated', 'annoyed', 'irritated', 'mad', 'furious', 'rage',
+    'sad', 'depressed', 'gloomy', 'melancholy', 'sorrow', 'grief', 'mourning',
+    'disappointed', 'discouraged', 'hopeless', 'helpless', 'powerless'
+]
+
+POSITIVE_SENTIMENT_WORDS = [
+    'good', 'great', 'wonderful', 'amazing', 'beautiful', 'fantastic', 'excellent',
+    'happy', 'joyful', 'cheerful', 'delighted', 'pleased', 'content', 'satisfied',
+    'peaceful', 'calm', 'serene', 'tranquil', 'relaxed', 'comfortable', 'safe',
+    'bright', 'warm', 'sunny', 'light', 'clear', 'free', 'liberated',
+    'successful', 'achieving', 'winning', 'victorious', 'triumphant', 'accomplished',
+    'loved', 'cared', 'cherished', 'valued', 'appreciated', 'accepted', 'welcomed',
+    'excited', 'thrilled', 'enthusiastic', 'energetic', 'vibrant', 'alive', 'inspired',
+    'hopeful', 'optimistic', 'confident', 'strong', 'powerful', 'capable', 'able'
+]
+
+# Sentiment words behind the stress-reduction recommendation
+RECOMMENDATION_NEGATIVE_WORDS = ['fear', 'anxiety', 'stress', 'worried', 'scared', 'terrified', 'angry', 'sad', 'depressed', 'frustrated', 'hurt', 'pain', 'struggling', 'difficult', 'hard', 'bad', 'terrible', 'awful', 'nightmare']
+RECOMMENDATION_POSITIVE_WORDS = ['joy', 'peace', 'happiness', 'happy', 'calm', 'serene', 'content', 'satisfied', 'good', 'great', 'wonderful', 'amazing', 'beautiful', 'successful', 'achieving', 'loved', 'caring', 'safe', 'comfortable']
+
+# Temporal keyword detection with context analysis
+TEMPORAL_PATTERNS = {
+    'past': {
+        'explicit': ['yesterday', 'childhood', 'old', 'remember', 'memory', 'ago', 'before', 'earlier', 'previously', 'once', 'used to', 'was', 'were'],
+        'implicit': ['former', 'ex', 'previous', 'last', 'past', 'ancient', 'historical', 'retro', 'vintage', 'nostalgic'],
+        'context': ['reminiscing', 'recalling', 'revisiting', 'looking back', 'in the past', 'back then']
+    },
+    'future': {
+        'explicit': ['tomorrow', 'next', 'will', 'going to', 'plan', 'soon', 'later', 'eventually', 'someday', 'shall', 'gonna'],
+        'implicit': ['upcoming', 'forthcoming', 'prospective', 'potential', 'anticipated', 'expected', 'predicted'],
+        'context': ['planning', 'preparing', 'anticipating', 'looking forward', 'in the future', 'ahead']
+    },
+    'present': {
+        'explicit': ['now', 'today', 'current', 'happening', 'currently', 'right now', 'at this moment', 'presently'],
+        'implicit': ['ongoing', 'active', 'live', 'real-time', 'immediate', 'instant', 'contemporary'],
+        'context': ['happening now', 'taking place', 'in progress', 'at present', 'currently']
+    }
+}
+
+# Connectors marking how events in a dream relate in time
+TEMPORAL_CONNECTORS = {
+    'sequence': ['then', 'after', 'next', 'following', 'subsequently', 'later', 'afterwards'],
+    'simultaneous': ['while', 'during', 'meanwhile', 'at the same time', 'simultaneously'],
+    'cause_effect': ['because', 'since', 'as a result', 'therefore', 'consequently', 'due to'],
+    'contrast': ['but', 'however', 'although', 'despite', 'nevertheless', 'yet']
+}
+
 def extract_meaningful_words(text: str):
     """Tokenize text and filter to meaningful words for theme analysis.
     - Lowercase
@@ -138,37 +462,103 @@ def extract_dream_symbols(dreams):
     
     return list(all_symbols)
 
-def extract_symbols_from_text(text, symbol_list):
-    """Extract symbols present in text with fuzzy matching"""
+
+# Every symbol tracked by the symbol evolution analysis
+DREAM_SYMBOLS = extract_dream_symbols([])
+
+# Every lexicon the per-dream feature extraction looks for, compiled once so a
+# dream's text is scanned a single time. Labels are (lexicon, category)
+# pairs, except 'symbol' which covers DREAM_SYMBOLS.
+LEXICON_MATCHER = KeywordMatcher({
+    **{('emotion', emotion): words for emotion, words in EMOTION_WORDS.items()},
+    **{('pattern_emotion', emotion): words for emotion, words in PATTERN_EMOTION_WORDS.items()},
+    ('sentiment', 'negative'): NEGATIVE_SENTIMENT_WORDS,
+    ('sentiment', 'positive'): POSITIVE_SENTIMENT_WORDS,
+    ('recommendation', 'negative'): RECOMMENDATION_NEGATIVE_WORDS,
+    ('recommendation', 'positive'): RECOMMENDATION_POSITIVE_WORDS,
+    **{('archetype', archetype): info.get('keywords', [archetype]) for archetype, info in DREAM_ARCHETYPES.items()},
+    **{('archetype_name', archetype): [archetype] for archetype in DREAM_ARCHETYPES},
+    **{('temporal_context', time_period): patterns['context'] for time_period, patterns in TEMPORAL_PATTERNS.items()},
+    **{('connector', relationship_type): connectors for relationship_type, connectors in TEMPORAL_CONNECTORS.items()},
+    'symbol': DREAM_SYMBOLS
+})
+
+# Punctuation stripped from words before weighing emotional strength
+NON_WORD_PATTERN = re.compile(r'[^\w\s]')
+
+class TokenizedDream:
+    """A dream's text normalised, tokenised and scanned for lexicon hits once.
+
+    Every analysis stage reads from the same instance instead of lowercasing,
+    splitting and searching the text again. The text is the dream content
+    followed by its summary; tokens are its whitespace-separated words.
+    """
+
+    def __init__(self, dream: dict, matcher: KeywordMatcher = None):
+        self.matcher = matcher or LEXICON_MATCHER
+        self.summary = dream.get('summary', '')
+        self.content = dream.get('dreamContent', '').lower()
+        self.text = f"{self.content} {self.summary.lower()}"
+
+        self.tokens = []
+        self.offsets = []
+        for token in re.finditer(r'\S+', self.text):
+            self.tokens.append(token.group())
+            self.offsets.append(token.start())
+        self.token_set = set(self.tokens)
+        # The summary is joined with a space, so content tokens are exactly
+        # those starting inside the content
+        self.content_token_count = bisect_left(self.offsets, len(self.content))
+
+        matches = self.matcher.find(self.text)
+        self.hits = self.matcher.group(matches)
+        self.content_hits = self.matcher.group(matches, end=len(self.content))
+        self.occurrences = {}
+        for start, keyword in matches:
+            self.occurrences.setdefault(keyword, []).append(start)
+
+    def content_words(self) -> list:
+        """Content tokens with punctuation removed (tokens left empty are dropped)"""
+        return NON_WORD_PATTERN.sub('', self.content).split()
+
+    def token_indices(self, keyword: str) -> list:
+        """Indices of the tokens containing keyword, in order"""
+        if keyword not in self.matcher.labels or any(char.isspace() for char in keyword):
+            return [index for index, token in enumerate(self.tokens) if keyword in token]
+
+        indices = []
+        for start in self.occurrences.get(keyword, []):
+            index = bisect_right(self.offsets, start) - 1
+            if not indices or indices[-1] != index:
+                indices.append(index)
+        return indices
+
+def extract_symbols_from_text(dream_tokens: TokenizedDream, symbol_list):
+    """Extract symbols present in a dream with fuzzy matching"""
     found_symbols = []
-    words = text.lower().split()
+    words = dream_tokens.token_set
+    symbol_hits = dream_tokens.hits.get('symbol', {})
     
     for symbol in symbol_list:
-        # Exact match
-        if symbol in words:
-            found_symbols.append(symbol)
-        # Partial match (symbol is part of a word)
-        elif any(symbol in word for word in words):
+        # Exact or partial match (symbol is a word or part of one)
+        if symbol in symbol_hits:
             found_symbols.append(symbol)
         # Plural/singular variations
         elif symbol.endswith('s') and symbol[:-1] in words:
             found_symbols.append(symbol[:-1])
-        elif symbol + 's' in words:
-            found_symbols.append(symbol)
     
     return found_symbols
 
-def extract_symbol_context(text, symbol, context_window=5):
+def extract_symbol_context(dream_tokens: TokenizedDream, symbol, context_window=5):
     """Extract context words around a symbol"""
-    words = text.lower().split()
+    words = dream_tokens.tokens
     context_words = []
     
-    for i, word in enumerate(words):
-        if symbol in word:
-            # Get words before and after
-            start = max(0, i - context_window)
-            end = min(len(words), i + context_window + 1)
-            context_words.extend(words[start:end])
+    for i in dream_tokens.token_indices(symbol):
+        # Get words before and after
+        start = max(0, i - context_window)
+        end = min(len(words), i + context_window + 1)
+        context_words.extend(words[start:end])
     
     # Remove duplicates and filter meaningful words
     context_words = list(set(context_words))
@@ -176,20 +566,20 @@ def extract_symbol_context(text, symbol, context_window=5):
     
     return meaningful_context[:10]  # Limit to 10 most relevant words
 
+# Words that colour the context a symbol appears in
+SYMBOL_CONTEXT_WORDS = {
+    'positive': ['happy', 'joy', 'love', 'peace', 'beautiful', 'wonderful', 'amazing', 'good', 'great', 'safe', 'comfortable', 'bright', 'warm'],
+    'negative': ['scared', 'afraid', 'angry', 'sad', 'dark', 'cold', 'dangerous', 'terrible', 'awful', 'bad', 'frightening', 'worried', 'anxious'],
+    'neutral': ['normal', 'regular', 'usual', 'common', 'typical', 'ordinary', 'standard']
+}
+
+SYMBOL_CONTEXT_MATCHER = KeywordMatcher(SYMBOL_CONTEXT_WORDS)
+
 def analyze_symbol_emotional_context(context_words):
     """Analyze the emotional context around a symbol"""
-    emotional_words = {
-        'positive': ['happy', 'joy', 'love', 'peace', 'beautiful', 'wonderful', 'amazing', 'good', 'great', 'safe', 'comfortable', 'bright', 'warm'],
-        'negative': ['scared', 'afraid', 'angry', 'sad', 'dark', 'cold', 'dangerous', 'terrible', 'awful', 'bad', 'frightening', 'worried', 'anxious'],
-        'neutral': ['normal', 'regular', 'usual', 'common', 'typical', 'ordinary', 'standard']
-    }
-    
     context_text = ' '.join(context_words).lower()
-    emotion_scores = {}
-    
-    for emotion, words in emotional_words.items():
-        score = sum(1 for word in words if word in context_text)
-        emotion_scores[emotion] = score
+    hits = SYMBOL_CONTEXT_MATCHER.match(context_text)
+    emotion_scores = {emotion: len(hits.get(emotion, {})) for emotion in SYMBOL_CONTEXT_WORDS}
     
     # Determine dominant emotion
     if emotion_scores['positive'] > emotion_scores['negative'] and emotion_scores['positive'] > emotion_scores['neutral']:
@@ -259,13 +649,13 @@ def generate_symbol_evolution_insights(evolution_metrics):
     
     return insights
 
-def analyze_temporal_content(text, temporal_patterns):
-    """Analyze temporal content in text with sophisticated detection"""
+def analyze_temporal_content(dream_tokens: TokenizedDream, temporal_patterns):
+    """Analyze temporal content in a dream with sophisticated detection"""
     time_scores = {'past': 0, 'present': 0, 'future': 0}
     keywords_found = {'past': [], 'present': [], 'future': []}
     context_indicators = []
     
-    words = text.lower().split()
+    words = dream_tokens.token_set
     
     # Score each time period
     for time_period, patterns in temporal_patterns.items():
@@ -282,8 +672,9 @@ def analyze_temporal_content(text, temporal_patterns):
                 keywords_found[time_period].append(keyword)
         
         # Context phrases (highest weight)
+        context_hits = dream_tokens.hits.get(('temporal_context', time_period), {})
         for context in patterns['context']:
-            if context in text:
+            if context in context_hits:
                 time_scores[time_period] += 3
                 context_indicators.append(context)
     
@@ -309,74 +700,63 @@ def analyze_temporal_content(text, temporal_patterns):
         'context': context_indicators
     }
 
-def analyze_temporal_relationships(text):
+def analyze_temporal_relationships(dream_tokens: TokenizedDream):
     """Analyze temporal relationships between events in dreams"""
     relationships = []
+    words = dream_tokens.token_set
     
-    # Temporal connectors
-    temporal_connectors = {
-        'sequence': ['then', 'after', 'next', 'following', 'subsequently', 'later', 'afterwards'],
-        'simultaneous': ['while', 'during', 'meanwhile', 'at the same time', 'simultaneously'],
-        'cause_effect': ['because', 'since', 'as a result', 'therefore', 'consequently', 'due to'],
-        'contrast': ['but', 'however', 'although', 'despite', 'nevertheless', 'yet']
-    }
-    
-    words = text.lower().split()
-    
-    for relationship_type, connectors in temporal_connectors.items():
+    for relationship_type, connectors in TEMPORAL_CONNECTORS.items():
         for connector in connectors:
             if connector in words:
                 relationships.append({
                     'type': relationship_type,
                     'connector': connector,
-                    'context': extract_context_around_word(text, connector)
+                    'context': extract_context_around_word(dream_tokens, connector)
                 })
     
     return relationships
 
-def extract_context_around_word(text, word, window=3):
+def extract_context_around_word(dream_tokens: TokenizedDream, word, window=3):
     """Extract context around a specific word"""
-    words = text.lower().split()
+    words = dream_tokens.tokens
     context_words = []
     
-    for i, w in enumerate(words):
-        if word in w:
-            start = max(0, i - window)
-            end = min(len(words), i + window + 1)
-            context_words.extend(words[start:end])
+    for i in dream_tokens.token_indices(word):
+        start = max(0, i - window)
+        end = min(len(words), i + window + 1)
+        context_words.extend(words[start:end])
+        if len(context_words) >= 10:
+            break
     
     return ' '.join(context_words[:10])
 
-def calculate_temporal_confidence(time_related_dreams):
+def calculate_temporal_confidence(temporal):
     """Calculate overall confidence in temporal analysis"""
-    if not time_related_dreams:
+    if not temporal['count']:
         return 0
     
-    total_confidence = sum(dream['confidence'] for dream in time_related_dreams)
-    return total_confidence / len(time_related_dreams)
+    return temporal['confidence_sum'] / temporal['count']
 
-def generate_temporal_insights(past_dreams, present_dreams, future_dreams, temporal_relationships):
+def generate_temporal_insights(distribution, relationship_counts):
     """Generate insights about temporal patterns in dreams"""
     insights = []
+    past_dreams, present_dreams, future_dreams = distribution['past'], distribution['present'], distribution['future']
     
-    total_temporal_dreams = len(past_dreams) + len(present_dreams) + len(future_dreams)
+    total_temporal_dreams = past_dreams + present_dreams + future_dreams
     
     if total_temporal_dreams == 0:
         return ["Your dreams don't show strong temporal patterns. This suggests you're focused on the present moment."]
     
     # Analyze temporal distribution
-    if len(past_dreams) > len(future_dreams) and len(past_dreams) > len(present_dreams):
+    if past_dreams > future_dreams and past_dreams > present_dreams:
         insights.append("Your dreams frequently reference the past, suggesting you're processing memories or reflecting on previous experiences.")
-    elif len(future_dreams) > len(past_dreams) and len(future_dreams) > len(present_dreams):
+    elif future_dreams > past_dreams and future_dreams > present_dreams:
         insights.append("Your dreams often look toward the future, indicating forward-thinking and goal-oriented mindset.")
-    elif len(present_dreams) > len(past_dreams) and len(present_dreams) > len(future_dreams):
+    elif present_dreams > past_dreams and present_dreams > future_dreams:
         insights.append("Your dreams focus on the present moment, showing mindfulness and current awareness.")
     
     # Analyze temporal relationships
-    if temporal_relationships:
-        relationship_types = [rel['type'] for rel in temporal_relationships]
-        relationship_counts = Counter(relationship_types)
-        
+    if relationship_counts:
         if relationship_counts.get('sequence', 0) > 2:
             insights.append("Your dreams show strong sequential patterns, indicating structured thinking and logical progression.")
         if relationship_counts.get('cause_effect', 0) > 1:
@@ -385,42 +765,29 @@ def generate_temporal_insights(past_dreams, present_dreams, future_dreams, tempo
             insights.append("Your dreams involve simultaneous events, suggesting multitasking or complex mental processing.")
     
     # Overall temporal awareness
-    if total_temporal_dreams > len(past_dreams) + len(present_dreams) + len(future_dreams) * 0.3:
+    if total_temporal_dreams > past_dreams + present_dreams + future_dreams * 0.3:
         insights.append("You have strong temporal awareness in your dreams, indicating good time perception and planning abilities.")
     
     return insights
 
 def calculate_emotional_volatility(emotions):
     """Calculate emotional volatility based on emotion changes over time"""
-    if len(emotions) < 2:
+    if emotions['total'] < 2:
         return 0
     
-    # Count emotion transitions
-    transitions = 0
-    for i in range(1, len(emotions)):
-        if emotions[i] != emotions[i-1]:
-            transitions += 1
-    
     # Calculate volatility as ratio of transitions to total possible transitions
-    volatility = transitions / (len(emotions) - 1)
+    volatility = emotions['transitions'] / (emotions['total'] - 1)
     return volatility
 
 def analyze_emotional_patterns_advanced(emotions):
     """Analyze emotional patterns with advanced pattern recognition"""
-    if len(emotions) < 3:
+    if emotions['total'] < 3:
         return {'consistency': 0, 'trends': []}
     
-    # Analyze for patterns
-    patterns = []
     trends = []
     
-    # Look for recurring patterns
-    for i in range(len(emotions) - 2):
-        pattern = emotions[i:i+3]
-        patterns.append(tuple(pattern))
-    
-    # Count pattern occurrences
-    pattern_counts = Counter(patterns)
+    # Count recurring three-emotion patterns
+    pattern_counts = Counter({tuple(pattern.split('|')): count for pattern, count in emotions['trigrams'].items()})
     
     # Calculate consistency (how often patterns repeat)
     consistency = len([count for count in pattern_counts.values() if count > 1]) / len(pattern_counts) if pattern_counts else 0
@@ -431,12 +798,10 @@ def analyze_emotional_patterns_advanced(emotions):
         'sadness': -2, 'anger': -3, 'fear': -3, 'disgust': -2, 'negative': -2, 'positive': 2
     }
     
-    intensities = [emotion_intensity_map.get(emotion, 0) for emotion in emotions]
-    
-    # Calculate trend direction
-    if len(intensities) >= 3:
-        recent_avg = sum(intensities[-3:]) / 3
-        earlier_avg = sum(intensities[:3]) / 3
+    # Calculate trend direction from the earliest and most recent emotions
+    if emotions['total'] >= 3:
+        recent_avg = sum(emotion_intensity_map.get(emotion, 0) for emotion in emotions['tail']) / 3
+        earlier_avg = sum(emotion_intensity_map.get(emotion, 0) for emotion in emotions['head']) / 3
         
         if recent_avg > earlier_avg + 0.5:
             trends.append('increasing_positive')
@@ -506,17 +871,17 @@ def generate_emotional_stability_insights(diversity, volatility, pattern_analysi
     
     return insights
 
-def calculate_emotional_intensity(dream_text: str, dream_emotions: list) -> float:
+def calculate_emotional_intensity(dream_tokens: TokenizedDream, dream_emotions: list) -> float:
     """Calculate emotional intensity based on emotional word density and strength.
     
     Args:
-        dream_text: The dream content text
+        dream_tokens: The tokenized dream (only its content is weighed)
         dream_emotions: List of detected emotions for this dream
     
     Returns:
         Float between 0.0 and 1.0 representing emotional intensity
     """
-    if not dream_text or not dream_emotions:
+    if not dream_tokens.content or not dream_emotions:
         return 0.0
     
     # Define emotional word strength weights
@@ -533,8 +898,7 @@ def calculate_emotional_intensity(dream_text: str, dream_emotions: list) -> floa
     }
     
     # Count emotional words and their strength
-    words = dream_text.lower().split()
-    total_words = len(words)
+    total_words = dream_tokens.content_token_count
     
     if total_words == 0:
         return 0.0
@@ -542,10 +906,8 @@ def calculate_emotional_intensity(dream_text: str, dream_emotions: list) -> floa
     emotional_word_count = 0
     total_emotional_strength = 0.0
     
-    # Check each word against emotional strength weights
-    for word in words:
-        # Clean word (remove punctuation)
-        clean_word = re.sub(r'[^\w]', '', word)
+    # Check each word (punctuation removed) against emotional strength weights
+    for clean_word in dream_tokens.content_words():
         if clean_word in emotion_strength_weights:
             emotional_word_count += 1
             total_emotional_strength += emotion_strength_weights[clean_word]
@@ -571,6 +933,241 @@ def calculate_emotional_intensity(dream_text: str, dream_emotions: list) -> floa
     # Ensure intensity is between 0.0 and 1.0
     return min(max(intensity, 0.0), 1.0)
 
+def detect_emotions(hits: dict, lexicon: str) -> list:
+    """Emotions from the given lexicon found in the text, falling back to overall sentiment"""
+    emotion_words = EMOTION_WORDS if lexicon == 'emotion' else PATTERN_EMOTION_WORDS
+    dream_emotions = [emotion for emotion in emotion_words if (lexicon, emotion) in hits]
+
+    # If no specific emotions found, try broader sentiment analysis
+    if not dream_emotions:
+        dream_emotions.append(classify_sentiment(hits, 'sentiment'))
+
+    return dream_emotions
+
+def classify_sentiment(hits: dict, lexicon: str) -> str:
+    """Classify text as positive, negative or neutral by counting distinct sentiment words"""
+    negative_count = len(hits.get((lexicon, 'negative'), {}))
+    positive_count = len(hits.get((lexicon, 'positive'), {}))
+
+    if negative_count > positive_count and negative_count > 0:
+        return 'negative'
+    elif positive_count > negative_count and positive_count > 0:
+        return 'positive'
+    elif negative_count > 0 or positive_count > 0:
+        # If both are present, choose the stronger one
+        return 'positive' if positive_count >= negative_count else 'negative'
+    # Only default to neutral if absolutely no emotional indicators found
+    return 'neutral'
+
+def extract_dream_features(dream: dict) -> dict:
+    """Score a single dream once so the aggregate analyzers never re-read its text.
+
+    Dreams are immutable once written, so the record can be stored and reused
+    for as long as the dream's ETag is unchanged.
+    """
+    # Tokenised and scanned once; content-only analyses read the hits that
+    # end before the summary starts
+    dream_tokens = TokenizedDream(dream)
+    summary = dream_tokens.summary
+    combined_hits = dream_tokens.hits
+    content_hits = dream_tokens.content_hits
+
+    emotions = detect_emotions(content_hits, 'emotion')
+    archetypes = [archetype for archetype in DREAM_ARCHETYPES if ('archetype', archetype) in combined_hits]
+
+    temporal = analyze_temporal_content(dream_tokens, TEMPORAL_PATTERNS)
+    temporal_relationships = analyze_temporal_relationships(dream_tokens) if temporal['has_temporal_content'] else []
+
+    symbols = extract_symbols_from_text(dream_tokens, DREAM_SYMBOLS)
+
+    return {
+        'feature_version': FEATURE_VERSION,
+        'createdAt': dream.get('createdAt'),
+        'summary_excerpt': summary[:100],
+        'archetype_context': dream.get('summary', dream_tokens.content)[:100],
+        'themes': extract_meaningful_words(summary),
+        'content_length': len(dream.get('dreamContent', '')),
+        'token_count': dream_tokens.content_token_count,
+        'archetypes': archetypes,
+        'archetype_mentions': [archetype for archetype in DREAM_ARCHETYPES if ('archetype_name', archetype) in content_hits],
+        'emotions': emotions,
+        'intensity': calculate_emotional_intensity(dream_tokens, emotions),
+        'pattern_emotions': detect_emotions(content_hits, 'pattern_emotion'),
+        'sentiment': classify_sentiment(content_hits, 'recommendation'),
+        'temporal': temporal,
+        'temporal_relationships': temporal_relationships,
+        'symbols': symbols,
+        'symbol_contexts': {symbol: extract_symbol_context(dream_tokens, symbol) for symbol in set(symbols)}
+    }
+
+def feature_record_is_current(record, entry: dict) -> bool:
+    """Check whether a stored feature record still matches the dream's manifest entry"""
+    return (
+        isinstance(record, dict)
+        and record.get('feature_version') == FEATURE_VERSION
+        and record.get('etag', '') == entry.get('etag', '')
+    )
+
+def dream_features(dreams: list) -> list:
+    """Feature records for a list of dreams, scoring any that are still raw documents"""
+    return [
+        dream if dream.get('feature_version') == FEATURE_VERSION else extract_dream_features(dream)
+        for dream in dreams
+    ]
+
+def _dream_date(features: dict):
+    """Display date of a scored dream"""
+    return features['createdAt'] if features['createdAt'] is not None else 'Unknown'
+
+def new_dream_aggregate() -> dict:
+    """Empty running aggregate of a user's dream features"""
+    return {
+        'version': AGGREGATE_VERSION,
+        'dreams': {},
+        'last_created_at': '',
+        'dream_count': 0,
+        'content_length_total': 0,
+        'archetype_counts': {},
+        'archetype_appearances': {},
+        'recent_archetypes': [],
+        'emotions': {'counts': {}, 'total': 0, 'transitions': 0, 'head': [], 'tail': [], 'trigrams': {}},
+        'intensity': {'sum': 0.0, 'count': 0, 'min': None, 'max': None},
+        'temporal': {
+            'count': 0,
+            'distribution': {'past': 0, 'present': 0, 'future': 0},
+            'confidence_sum': 0.0,
+            'dreams': [],
+            'relationships': [],
+            'relationship_counts': {}
+        },
+        'symbols': {},
+        'themes': {},
+        'sentiments': {},
+        'archetype_mentions': {},
+        'pattern_emotions': {}
+    }
+
+def _increment(counts: dict, key, amount=1):
+    counts[key] = counts.get(key, 0) + amount
+
+def fold_dream_features(aggregate: dict, features: dict, key: str = None, etag: str = '') -> dict:
+    """Fold one dream's features into a running aggregate, in place.
+
+    Dreams must be folded oldest first; order-dependent statistics (emotion
+    transitions and trigrams, symbol timelines) assume chronological order.
+    """
+    date = _dream_date(features)
+    if key is not None:
+        aggregate['dreams'][key] = etag
+    aggregate['dream_count'] += 1
+    aggregate['content_length_total'] += features['content_length']
+    aggregate['last_created_at'] = max(aggregate['last_created_at'], features['createdAt'] or '')
+
+    # Archetypes
+    for archetype in features['archetypes']:
+        _increment(aggregate['archetype_counts'], archetype)
+        aggregate['archetype_appearances'].setdefault(archetype, []).append({
+            'date': date,
+            'context': features['archetype_context'] + '...'
+        })
+    aggregate['recent_archetypes'].insert(0, {
+        'date': date,
+        'context': features['archetype_context'] + '...',
+        'archetypes': features['archetypes']
+    })
+    del aggregate['recent_archetypes'][RECENT_ARCHETYPE_DREAMS:]
+
+    # Emotions, keeping just enough of the sequence for transitions, trigrams and trends
+    emotions = aggregate['emotions']
+    for emotion in features['emotions']:
+        _increment(emotions['counts'], emotion)
+        if emotions['tail'] and emotions['tail'][-1] != emotion:
+            emotions['transitions'] += 1
+        if len(emotions['tail']) >= 2:
+            _increment(emotions['trigrams'], '|'.join(emotions['tail'][-2:] + [emotion]))
+        if len(emotions['head']) < 3:
+            emotions['head'].append(emotion)
+        emotions['tail'] = (emotions['tail'] + [emotion])[-3:]
+        emotions['total'] += 1
+
+    intensity = aggregate['intensity']
+    intensity['sum'] += features['intensity']
+    intensity['count'] += 1
+    intensity['min'] = features['intensity'] if intensity['min'] is None else min(intensity['min'], features['intensity'])
+    intensity['max'] = features['intensity'] if intensity['max'] is None else max(intensity['max'], features['intensity'])
+
+    # Temporal patterns
+    temporal_analysis = features['temporal']
+    if temporal_analysis['has_temporal_content']:
+        temporal = aggregate['temporal']
+        primary_time_period = temporal_analysis['primary_time_period']
+        temporal['count'] += 1
+        temporal['confidence_sum'] += temporal_analysis['confidence']
+        if primary_time_period in temporal['distribution']:
+            temporal['distribution'][primary_time_period] += 1
+        if len(temporal['dreams']) < 10:
+            temporal['dreams'].append({
+                'date': date,
+                'time_period': primary_time_period,
+                'confidence': temporal_analysis['confidence'],
+                'keywords_found': temporal_analysis['keywords_found'],
+                'content': features['summary_excerpt'] + '...',
+                'temporal_context': temporal_analysis['context']
+            })
+        for relationship in features['temporal_relationships']:
+            _increment(temporal['relationship_counts'], relationship['type'])
+            if len(temporal['relationships']) < 10:
+                temporal['relationships'].append(relationship)
+
+    # Symbol timelines
+    dream_symbols = features['symbols']
+    token_count = features['token_count']
+    for symbol in dream_symbols:
+        timeline = aggregate['symbols'].setdefault(symbol, {'appearances': [], 'frequencies': [], 'contexts': []})
+        frequency = dream_symbols.count(symbol)
+        timeline['appearances'].append({
+            'date': date,
+            'context': features['summary_excerpt'] + '...',
+            'evolution_stage': len(timeline['appearances']) + 1,
+            'dream_length': token_count,
+            'symbol_frequency': frequency
+        })
+        timeline['frequencies'].append({
+            'date': date,
+            'frequency': frequency,
+            'relative_frequency': frequency / token_count if token_count else 0
+        })
+        context = features['symbol_contexts'].get(symbol, [])
+        timeline['contexts'].append({
+            'date': date,
+            'context_words': context,
+            'emotional_context': analyze_symbol_emotional_context(context)
+        })
+
+    # Themes, sentiment and simple counters
+    for theme in features['themes']:
+        _increment(aggregate['themes'], theme)
+    _increment(aggregate['sentiments'], features['sentiment'])
+    for archetype in features['archetype_mentions']:
+        _increment(aggregate['archetype_mentions'], archetype)
+    for emotion in features['pattern_emotions']:
+        _increment(aggregate['pattern_emotions'], emotion)
+
+    return aggregate
+
+def build_dream_aggregate(features_list: list) -> dict:
+    """Aggregate a list of feature records, oldest first"""
+    aggregate = new_dream_aggregate()
+    for features in sorted(features_list, key=lambda x: x['createdAt'] or ''):
+        fold_dream_features(aggregate, features, features.get('key'), features.get('etag', ''))
+    return aggregate
+
+def dream_aggregate(dreams) -> dict:
+    """Running aggregate for the analyzers: passed through as-is, or built from dreams/feature records"""
+    if isinstance(dreams, dict):
+        return dreams
+    return build_dream_aggregate(dream_features(dreams))
+
 # Premium decorator is now imported from premium module
 
 @dream_analysis_bp.route('/advanced/<phone_number>', methods=['GET'])
@@ -583,36 +1180,17 @@ def get_advanced_analysis(phone_number):
         if not S3_BUCKET_NAME:
             return jsonify({"error": "S3 bucket not configured"}), 500
 
-        # Get all dreams for the user
-        response = s3_client.list_objects_v2(
-            Bucket=S3_BUCKET_NAME,
-            Prefix=f'{phone_number}/'
-        )
+        # Get the running aggregate of the user's dreams
+        aggregate = get_dream_repository().load_aggregate(phone_number)
 
-        if 'Contents' not in response:
+        if aggregate is None:
             return jsonify({"error": "No dreams found"}), 404
 
-        # Filter dream files and get their content
-        dream_contents = []
-        for obj in response['Contents']:
-            key = obj['Key']
-            if not key.endswith('metadata') and not key.endswith('themes.txt'):
-                try:
-                    dream_response = s3_client.get_object(
-                        Bucket=S3_BUCKET_NAME,
-                        Key=key
-                    )
-                    dream_data = json.loads(dream_response['Body'].read().decode('utf-8'))
-                    dream_contents.append(dream_data)
-                except Exception as e:
-                    print(f"Error reading dream {key}: {e}")
-                    continue
-
-        if not dream_contents:
+        if not aggregate['dream_count']:
             return jsonify({"error": "No valid dreams found"}), 404
 
         # Perform advanced analysis
-        analysis = perform_advanced_analysis(dream_contents)
+        analysis = perform_advanced_analysis(aggregate)
 
         return jsonify(analysis), 200
 
@@ -629,30 +1207,14 @@ def get_dream_archetypes(phone_number):
         if not S3_BUCKET_NAME:
             return jsonify({"error": "S3 bucket not configured"}), 500
 
-        # Get recent dreams for archetype analysis
-        response = s3_client.list_objects_v2(
-            Bucket=S3_BUCKET_NAME,
-            Prefix=f'{phone_number}/'
-        )
+        # The aggregate keeps the most recent dreams for archetype analysis
+        aggregate = get_dream_repository().load_aggregate(phone_number)
 
-        if 'Contents' not in response:
+        if aggregate is None:
             return jsonify({"error": "No dreams found"}), 404
 
-        # Get the 10 most recent dreams
-        dream_keys = []
-        for obj in response['Contents']:
-            key = obj['Key']
-            if not key.endswith('metadata') and not key.endswith('themes.txt'):
-                dream_keys.append({
-                    'key': key,
-                    'lastModified': obj['LastModified']
-                })
-
-        dream_keys.sort(key=lambda x: x['lastModified'], reverse=True)
-        recent_dreams = dream_keys[:10]
-
         # Analyze archetypes in recent dreams
-        archetype_analysis = analyze_dream_archetypes(recent_dreams, phone_number)
+        archetype_analysis = analyze_dream_archetypes(aggregate)
 
         return jsonify(archetype_analysis), 200
 
@@ -669,35 +1231,17 @@ def get_dream_patterns(phone_number):
         if not S3_BUCKET_NAME:
             return jsonify({"error": "S3 bucket not configured"}), 500
 
-        # Get all dreams for pattern analysis
-        response = s3_client.list_objects_v2(
-            Bucket=S3_BUCKET_NAME,
-            Prefix=f'{phone_number}/'
-        )
+        # Get the running aggregate for pattern analysis
+        aggregate = get_dream_repository().load_aggregate(phone_number)
 
-        if 'Contents' not in response:
+        if aggregate is None:
             return jsonify({"error": "No dreams found"}), 404
 
-        # Get dream contents for pattern analysis
-        dream_contents = []
-        for obj in response['Contents']:
-            key = obj['Key']
-            if not key.endswith('metadata') and not key.endswith('themes.txt'):
-                try:
-                    dream_response = s3_client.get_object(
-                        Bucket=S3_BUCKET_NAME,
-                        Key=key
-                    )
-                    dream_data = json.loads(dream_response['Body'].read().decode('utf-8'))
-                    dream_contents.append(dream_data)
-                except Exception as e:
-                    continue
-
-        if not dream_contents:
+        if not aggregate['dream_count']:
             return jsonify({"error": "No valid dreams found"}), 404
 
         # Analyze psychological patterns
-        pattern_analysis = analyze_psychological_patterns(dream_contents)
+        pattern_analysis = analyze_psychological_patterns(aggregate)
 
         return jsonify(pattern_analysis), 200
 
@@ -715,48 +1259,36 @@ def get_premium_status(phone_number):
         return jsonify({"error": f"Failed to get premium status: {str(e)}"}), 500
 
 def perform_advanced_analysis(dreams):
-    """Perform comprehensive dream analysis"""
+    """Perform comprehensive dream analysis from dreams or a running aggregate"""
+    aggregate = dream_aggregate(dreams)
     analysis = {
-        'total_dreams': len(dreams),
+        'total_dreams': aggregate['dream_count'],
         'analysis_date': datetime.utcnow().isoformat(),
-        'archetype_analysis': analyze_archetypes_in_dreams(dreams),
-        'emotional_patterns': analyze_emotional_patterns(dreams),
-        'temporal_patterns': analyze_temporal_patterns(dreams),
-        'symbol_evolution': analyze_symbol_evolution(dreams),
-        'personal_insights': generate_personal_insights(dreams),
-        'recommendations': generate_recommendations(dreams)
+        'archetype_analysis': analyze_archetypes_in_dreams(aggregate),
+        'emotional_patterns': analyze_emotional_patterns(aggregate),
+        'temporal_patterns': analyze_temporal_patterns(aggregate),
+        'symbol_evolution': analyze_symbol_evolution(aggregate),
+        'personal_insights': generate_personal_insights(aggregate),
+        'recommendations': generate_recommendations(aggregate)
     }
 
     return analysis
 
 def analyze_archetypes_in_dreams(dreams):
     """Analyze dream archetypes across all dreams using keyword-based detection"""
-    archetype_counts = Counter()
+    aggregate = dream_aggregate(dreams)
+    archetype_counts = Counter(aggregate['archetype_counts'])
     archetype_details = {}
 
-    for dream in dreams:
-        dream_text = dream.get('dreamContent', '').lower()
-        dream_summary = dream.get('summary', '').lower()
-        combined_text = f"{dream_text} {dream_summary}"
-        
-        for archetype, info in DREAM_ARCHETYPES.items():
-            # Check if any keywords for this archetype appear in the dream
-            keywords = info.get('keywords', [archetype])  # Fallback to archetype name if no keywords
-            if any(keyword in combined_text for keyword in keywords):
-                archetype_counts[archetype] += 1
-                if archetype not in archetype_details:
-                    archetype_details[archetype] = {
-                        'count': 0,
-                        'meaning': info['meaning'],
-                        'positive_aspects': info['positive'],
-                        'negative_aspects': info['negative'],
-                        'appearances': []
-                    }
-                archetype_details[archetype]['count'] += 1
-                archetype_details[archetype]['appearances'].append({
-                    'date': dream.get('createdAt', 'Unknown'),
-                    'context': dream.get('summary', dream_text)[:100] + '...'
-                })
+    for archetype, count in aggregate['archetype_counts'].items():
+        info = DREAM_ARCHETYPES[archetype]
+        archetype_details[archetype] = {
+            'count': count,
+            'meaning': info['meaning'],
+            'positive_aspects': info['positive'],
+            'negative_aspects': info['negative'],
+            'appearances': aggregate['archetype_appearances'].get(archetype, [])
+        }
 
     return {
         'total_archetypes_found': len(archetype_details),
@@ -766,246 +1298,63 @@ def analyze_archetypes_in_dreams(dreams):
 
 def analyze_emotional_patterns(dreams):
     """Analyze emotional patterns in dreams"""
-    emotions = []
-    intensity_levels = []
-
-    for dream in dreams:
-        # Extract emotional content from dream text
-        dream_text = dream.get('dreamContent', '').lower()
-
-        # Enhanced emotion detection with more comprehensive word lists
-        emotional_words = {
-            'fear': ['afraid', 'scared', 'terrified', 'fear', 'panic', 'anxiety', 'worried', 'nervous', 'dread', 'frightened', 'alarmed', 'apprehensive'],
-            'joy': ['happy', 'joy', 'excited', 'elated', 'ecstatic', 'cheerful', 'delighted', 'thrilled', 'euphoric', 'blissful', 'jubilant', 'gleeful'],
-            'sadness': ['sad', 'depressed', 'melancholy', 'grief', 'sorrow', 'mourning', 'dejected', 'downcast', 'blue', 'gloomy', 'despondent', 'heartbroken'],
-            'anger': ['angry', 'furious', 'rage', 'irritated', 'mad', 'enraged', 'livid', 'outraged', 'fuming', 'incensed', 'wrathful', 'hostile'],
-            'peace': ['calm', 'peaceful', 'serene', 'tranquil', 'relaxed', 'content', 'satisfied', 'at ease', 'composed', 'placid', 'untroubled', 'harmonious'],
-            'love': ['love', 'loving', 'affectionate', 'caring', 'tender', 'romantic', 'passionate', 'devoted', 'adoring', 'fond', 'cherished', 'beloved'],
-            'surprise': ['surprised', 'shocked', 'amazed', 'astonished', 'startled', 'bewildered', 'stunned', 'astounded', 'flabbergasted', 'dumbfounded'],
-            'disgust': ['disgusted', 'repulsed', 'revolted', 'sickened', 'nauseated', 'appalled', 'horrified', 'repugnant', 'abhorrent', 'loathsome']
-        }
-
-        dream_emotions = []
-        for emotion, words in emotional_words.items():
-            if any(word in dream_text for word in words):
-                dream_emotions.append(emotion)
-
-        # If no specific emotions found, try broader sentiment analysis
-        if not dream_emotions:
-            # Expanded negative sentiment words
-            negative_words = [
-                'bad', 'terrible', 'awful', 'horrible', 'nightmare', 'scary', 'frightening',
-                'worried', 'anxious', 'stressed', 'troubled', 'disturbed', 'upset', 'concerned',
-                'difficult', 'hard', 'challenging', 'struggling', 'fighting', 'conflict',
-                'dark', 'cold', 'lonely', 'lost', 'confused', 'overwhelmed', 'trapped',
-                'hurt', 'pain', 'suffering', 'agony', 'torment', 'misery', 'despair',
-                'angry', 'frustrated', 'annoyed', 'irritated', 'mad', 'furious', 'rage',
-                'sad', 'depressed', 'gloomy', 'melancholy', 'sorrow', 'grief', 'mourning',
-                'disappointed', 'discouraged', 'hopeless', 'helpless', 'powerless'
-            ]
-            
-            # Expanded positive sentiment words
-            positive_words = [
-                'good', 'great', 'wonderful', 'amazing', 'beautiful', 'fantastic', 'excellent',
-                'happy', 'joyful', 'cheerful', 'delighted', 'pleased', 'content', 'satisfied',
-                'peaceful', 'calm', 'serene', 'tranquil', 'relaxed', 'comfortable', 'safe',
-                'bright', 'warm', 'sunny', 'light', 'clear', 'free', 'liberated',
-                'successful', 'achieving', 'winning', 'victorious', 'triumphant', 'accomplished',
-                'loved', 'cared', 'cherished', 'valued', 'appreciated', 'accepted', 'welcomed',
-                'excited', 'thrilled', 'enthusiastic', 'energetic', 'vibrant', 'alive', 'inspired',
-                'hopeful', 'optimistic', 'confident', 'strong', 'powerful', 'capable', 'able'
-            ]
-            
-            # Count sentiment words
-            negative_count = sum(1 for word in negative_words if word in dream_text)
-            positive_count = sum(1 for word in positive_words if word in dream_text)
-            
-            # Determine emotion based on sentiment word counts
-            if negative_count > positive_count and negative_count > 0:
-                dream_emotions.append('negative')
-            elif positive_count > negative_count and positive_count > 0:
-                dream_emotions.append('positive')
-            elif negative_count > 0 or positive_count > 0:
-                # If both are present, choose the stronger one
-                dream_emotions.append('positive' if positive_count >= negative_count else 'negative')
-            else:
-                # Only default to neutral if absolutely no emotional indicators found
-                dream_emotions.append('neutral')
-
-        emotions.extend(dream_emotions)
-
-        # Calculate emotional intensity based on emotional word density and strength
-        intensity = calculate_emotional_intensity(dream_text, dream_emotions)
-        intensity_levels.append(intensity)
-
-    emotion_counts = Counter(emotions)
+    aggregate = dream_aggregate(dreams)
+    emotion_counts = Counter(aggregate['emotions']['counts'])
+    intensity = aggregate['intensity']
 
     return {
         'dominant_emotions': emotion_counts.most_common(3),
         'emotional_intensity_trend': {
-            'average_intensity': sum(intensity_levels) / len(intensity_levels) if intensity_levels else 0,
+            'average_intensity': intensity['sum'] / intensity['count'] if intensity['count'] else 0,
             'intensity_range': {
-                'min': min(intensity_levels) if intensity_levels else 0,
-                'max': max(intensity_levels) if intensity_levels else 0
+                'min': intensity['min'] if intensity['count'] else 0,
+                'max': intensity['max'] if intensity['count'] else 0
             }
         },
-        'emotional_stability': analyze_emotional_stability(emotions)
+        'emotional_stability': analyze_emotional_stability(aggregate['emotions'])
     }
 
 def analyze_temporal_patterns(dreams):
     """Analyze temporal patterns in dreams with sophisticated NLP and context understanding"""
-    time_related_dreams = []
-    past_dreams = []
-    future_dreams = []
-    present_dreams = []
-    temporal_relationships = []
-    temporal_insights = []
-    
-    # Enhanced temporal keyword detection with context analysis
-    temporal_patterns = {
-        'past': {
-            'explicit': ['yesterday', 'childhood', 'old', 'remember', 'memory', 'ago', 'before', 'earlier', 'previously', 'once', 'used to', 'was', 'were'],
-            'implicit': ['former', 'ex', 'previous', 'last', 'past', 'ancient', 'historical', 'retro', 'vintage', 'nostalgic'],
-            'context': ['reminiscing', 'recalling', 'revisiting', 'looking back', 'in the past', 'back then']
-        },
-        'future': {
-            'explicit': ['tomorrow', 'next', 'will', 'going to', 'plan', 'soon', 'later', 'eventually', 'someday', 'shall', 'gonna'],
-            'implicit': ['upcoming', 'forthcoming', 'prospective', 'potential', 'anticipated', 'expected', 'predicted'],
-            'context': ['planning', 'preparing', 'anticipating', 'looking forward', 'in the future', 'ahead']
-        },
-        'present': {
-            'explicit': ['now', 'today', 'current', 'happening', 'currently', 'right now', 'at this moment', 'presently'],
-            'implicit': ['ongoing', 'active', 'live', 'real-time', 'immediate', 'instant', 'contemporary'],
-            'context': ['happening now', 'taking place', 'in progress', 'at present', 'currently']
-        }
-    }
-    
-    for dream in dreams:
-        dream_text = dream.get('dreamContent', '').lower()
-        dream_summary = dream.get('summary', '').lower()
-        combined_text = f"{dream_text} {dream_summary}"
-        
-        # Analyze temporal content with sophisticated detection
-        temporal_analysis = analyze_temporal_content(combined_text, temporal_patterns)
-        
-        if temporal_analysis['has_temporal_content']:
-            primary_time_period = temporal_analysis['primary_time_period']
-            confidence = temporal_analysis['confidence']
-            temporal_keywords_found = temporal_analysis['keywords_found']
-            
-            time_related_dreams.append({
-                'date': dream.get('createdAt', 'Unknown'),
-                'time_period': primary_time_period,
-                'confidence': confidence,
-                'keywords_found': temporal_keywords_found,
-                'content': dream.get('summary', '')[:100] + '...',
-                'temporal_context': temporal_analysis['context']
-            })
-            
-            # Categorize dreams
-            if primary_time_period == 'past':
-                past_dreams.append(dream)
-            elif primary_time_period == 'future':
-                future_dreams.append(dream)
-            elif primary_time_period == 'present':
-                present_dreams.append(dream)
-            
-            # Analyze temporal relationships
-            relationships = analyze_temporal_relationships(combined_text)
-            temporal_relationships.extend(relationships)
-    
-    # Generate temporal insights
-    temporal_insights = generate_temporal_insights(past_dreams, present_dreams, future_dreams, temporal_relationships)
-    
+    temporal = dream_aggregate(dreams)['temporal']
+
     return {
-        'time_related_dreams_count': len(time_related_dreams),
-        'temporal_distribution': {
-            'past': len(past_dreams),
-            'present': len(present_dreams),
-            'future': len(future_dreams)
-        },
-        'temporal_confidence': calculate_temporal_confidence(time_related_dreams),
-        'temporal_relationships': temporal_relationships[:10],
-        'temporal_insights': temporal_insights,
-        'time_related_dreams': time_related_dreams[:10]
+        'time_related_dreams_count': temporal['count'],
+        'temporal_distribution': dict(temporal['distribution']),
+        'temporal_confidence': calculate_temporal_confidence(temporal),
+        'temporal_relationships': temporal['relationships'][:10],
+        'temporal_insights': generate_temporal_insights(temporal['distribution'], temporal['relationship_counts']),
+        'time_related_dreams': temporal['dreams'][:10]
     }
 
 def analyze_symbol_evolution(dreams):
     """Analyze how dream symbols evolve over time with sophisticated extraction and analysis"""
-    # Sort dreams by date
-    sorted_dreams = sorted(dreams, key=lambda x: x.get('createdAt', ''))
-    
-    # Extract symbols dynamically from all dreams
-    all_symbols = extract_dream_symbols(sorted_dreams)
-    
-    # Analyze symbol evolution patterns
-    symbol_evolution = {}
-    symbol_frequency_tracking = {}
-    symbol_context_analysis = {}
-    
-    for dream in sorted_dreams:
-        dream_text = dream.get('dreamContent', '').lower()
-        dream_summary = dream.get('summary', '').lower()
-        date = dream.get('createdAt', 'Unknown')
-        combined_text = f"{dream_text} {dream_summary}"
-        
-        # Extract symbols present in this dream
-        dream_symbols = extract_symbols_from_text(combined_text, all_symbols)
-        
-        for symbol in dream_symbols:
-            if symbol not in symbol_evolution:
-                symbol_evolution[symbol] = []
-                symbol_frequency_tracking[symbol] = []
-                symbol_context_analysis[symbol] = []
-            
-            # Track symbol appearance
-            symbol_evolution[symbol].append({
-                'date': date,
-                'context': dream.get('summary', '')[:100] + '...',
-                'evolution_stage': len(symbol_evolution[symbol]) + 1,
-                'dream_length': len(dream_text.split()),
-                'symbol_frequency': dream_symbols.count(symbol)
-            })
-            
-            # Track frequency over time
-            symbol_frequency_tracking[symbol].append({
-                'date': date,
-                'frequency': dream_symbols.count(symbol),
-                'relative_frequency': dream_symbols.count(symbol) / len(dream_text.split()) if dream_text else 0
-            })
-            
-            # Analyze context around symbol
-            context = extract_symbol_context(combined_text, symbol)
-            symbol_context_analysis[symbol].append({
-                'date': date,
-                'context_words': context,
-                'emotional_context': analyze_symbol_emotional_context(context)
-            })
-    
+    symbols = dream_aggregate(dreams)['symbols']
+
     # Calculate evolution metrics for each symbol
     evolution_metrics = {}
-    for symbol, appearances in symbol_evolution.items():
-        if len(appearances) > 1:  # Only analyze symbols that appear multiple times
+    for symbol, timeline in symbols.items():
+        if len(timeline['appearances']) > 1:  # Only analyze symbols that appear multiple times
             evolution_metrics[symbol] = calculate_symbol_evolution_metrics(
-                symbol, appearances, symbol_frequency_tracking[symbol], symbol_context_analysis[symbol]
+                symbol, timeline['appearances'], timeline['frequencies'], timeline['contexts']
             )
-    
+
     return {
-        'symbols_tracked': len(symbol_evolution),
-        'symbol_evolution': symbol_evolution,
+        'symbols_tracked': len(symbols),
+        'symbol_evolution': {symbol: timeline['appearances'] for symbol, timeline in symbols.items()},
         'most_evolving_symbols': sorted(
             evolution_metrics.items(),
             key=lambda x: x[1]['evolution_score'],
             reverse=True
         )[:10],
-        'symbol_frequency_trends': symbol_frequency_tracking,
-        'symbol_context_evolution': symbol_context_analysis,
+        'symbol_frequency_trends': {symbol: timeline['frequencies'] for symbol, timeline in symbols.items()},
+        'symbol_context_evolution': {symbol: timeline['contexts'] for symbol, timeline in symbols.items()},
         'evolution_insights': generate_symbol_evolution_insights(evolution_metrics)
     }
 
 def analyze_emotional_stability(emotions):
-    """Analyze emotional stability based on dream emotions with sophisticated volatility and pattern analysis"""
-    if not emotions:
+    """Analyze emotional stability from an aggregate emotion summary with sophisticated volatility and pattern analysis"""
+    if not emotions['total']:
         return {
             'stability_level': "insufficient_data",
             'volatility_score': 0,
@@ -1015,8 +1364,8 @@ def analyze_emotional_stability(emotions):
             'stability_insights': ["Insufficient emotional data for analysis. Continue journaling to build emotional patterns."]
         }
 
-    emotion_counts = Counter(emotions)
-    total_emotions = len(emotions)
+    emotion_counts = Counter(emotions['counts'])
+    total_emotions = emotions['total']
     
     # Calculate emotional diversity
     diversity = len(emotion_counts) / total_emotions if total_emotions > 0 else 0
@@ -1045,23 +1394,20 @@ def analyze_emotional_stability(emotions):
 
 def generate_personal_insights(dreams):
     """Generate personalized insights based on dream analysis"""
+    aggregate = dream_aggregate(dreams)
+    dream_count = aggregate['dream_count']
     insights = []
 
     # Analyze dream frequency
-    if len(dreams) > 20:
+    if dream_count > 20:
         insights.append("You have a rich dream life with many recorded experiences, suggesting strong self-awareness and introspection.")
-    elif len(dreams) > 10:
+    elif dream_count > 10:
         insights.append("Your dream journal shows consistent engagement with your inner world, indicating good self-reflection habits.")
     else:
         insights.append("You're beginning your dream journey. Regular recording will reveal fascinating patterns over time.")
 
     # Analyze dream themes (filter out stopwords/punctuation)
-    themes: list[str] = []
-    for dream in dreams:
-        summary_text = dream.get('summary', '')
-        themes.extend(extract_meaningful_words(summary_text))
-
-    theme_counts = Counter(themes)
+    theme_counts = Counter(aggregate['themes'])
     common_themes = [theme for theme, count in theme_counts.most_common(10) if count > 1]
 
     if common_themes:
@@ -1070,8 +1416,7 @@ def generate_personal_insights(dreams):
         )
 
     # Analyze dream intensity
-    total_content_length = sum(len(dream.get('dreamContent', '')) for dream in dreams)
-    avg_length = total_content_length / len(dreams) if dreams else 0
+    avg_length = aggregate['content_length_total'] / dream_count if dream_count else 0
 
     if avg_length > 500:
         insights.append("Your dreams are detailed and vivid, suggesting strong imagination and emotional depth.")
@@ -1082,43 +1427,21 @@ def generate_personal_insights(dreams):
 
 def generate_recommendations(dreams):
     """Generate personalized recommendations based on dream analysis"""
+    aggregate = dream_aggregate(dreams)
     recommendations = []
 
     # Based on dream frequency
-    if len(dreams) < 10:
+    if aggregate['dream_count'] < 10:
         recommendations.append("Try to record your dreams more frequently to build a comprehensive understanding of your patterns.")
 
     # Based on emotional patterns
-    emotions = []
-    for dream in dreams:
-        dream_text = dream.get('dreamContent', '').lower()
-        
-        # Enhanced emotion detection
-        negative_words = ['fear', 'anxiety', 'stress', 'worried', 'scared', 'terrified', 'angry', 'sad', 'depressed', 'frustrated', 'hurt', 'pain', 'struggling', 'difficult', 'hard', 'bad', 'terrible', 'awful', 'nightmare']
-        positive_words = ['joy', 'peace', 'happiness', 'happy', 'calm', 'serene', 'content', 'satisfied', 'good', 'great', 'wonderful', 'amazing', 'beautiful', 'successful', 'achieving', 'loved', 'caring', 'safe', 'comfortable']
-        
-        negative_count = sum(1 for word in negative_words if word in dream_text)
-        positive_count = sum(1 for word in positive_words if word in dream_text)
-        
-        if negative_count > positive_count and negative_count > 0:
-            emotions.append('negative')
-        elif positive_count > negative_count and positive_count > 0:
-            emotions.append('positive')
-        elif negative_count > 0 or positive_count > 0:
-            emotions.append('positive' if positive_count >= negative_count else 'negative')
-        else:
-            emotions.append('neutral')
+    sentiments = aggregate['sentiments']
 
-    if emotions.count('negative') > emotions.count('positive'):
+    if sentiments.get('negative', 0) > sentiments.get('positive', 0):
         recommendations.append("Consider incorporating stress-reduction techniques like meditation or journaling into your daily routine.")
 
     # Based on archetype analysis
-    archetype_counts = Counter()
-    for dream in dreams:
-        dream_text = dream.get('dreamContent', '').lower()
-        for archetype in DREAM_ARCHETYPES:
-            if archetype in dream_text:
-                archetype_counts[archetype] += 1
+    archetype_counts = aggregate['archetype_mentions']
 
     if 'water' in archetype_counts and archetype_counts['water'] > 2:
         recommendations.append("Water appears frequently in your dreams. Consider exploring your emotional landscape through therapy or creative expression.")
@@ -1128,7 +1451,7 @@ def generate_recommendations(dreams):
 
     return recommendations
 
-def analyze_dream_archetypes(dream_keys, phone_number):
+def analyze_dream_archetypes(dreams):
     """Analyze archetypes in specific dreams"""
     archetype_analysis = {
         'archetypes_found': [],
@@ -1136,38 +1459,24 @@ def analyze_dream_archetypes(dream_keys, phone_number):
         'recommendations': []
     }
 
-    for dream_key in dream_keys[:5]:  # Analyze last 5 dreams
-        try:
-            dream_response = s3_client.get_object(
-                Bucket=S3_BUCKET_NAME,
-                Key=dream_key['key']
-            )
-            dream_data = json.loads(dream_response['Body'].read().decode('utf-8'))
-
-            dream_text = dream_data.get('dreamContent', '').lower()
-            dream_summary = dream_data.get('summary', '').lower()
-            combined_text = f"{dream_text} {dream_summary}"
-
-            for archetype, info in DREAM_ARCHETYPES.items():
-                keywords = info.get('keywords', [archetype])  # Fallback to archetype name if no keywords
-                if any(keyword in combined_text for keyword in keywords):
-                    if archetype not in archetype_analysis['archetypes_found']:
-                        archetype_analysis['archetypes_found'].append(archetype)
-
-                    if archetype not in archetype_analysis['archetype_details']:
-                        archetype_analysis['archetype_details'][archetype] = {
-                            'meaning': info['meaning'],
-                            'positive_aspects': info['positive'],
-                            'negative_aspects': info['negative'],
-                            'appearances': []
-                        }
-
-                    archetype_analysis['archetype_details'][archetype]['appearances'].append({
-                        'date': dream_data.get('createdAt', 'Unknown'),
-                        'context': dream_data.get('summary', dream_text)[:100] + '...'
-                    })
-        except Exception as e:
-            continue
+    for recent in dream_aggregate(dreams)['recent_archetypes']:  # Analyze last 5 dreams
+        for archetype in recent['archetypes']:
+            info = DREAM_ARCHETYPES[archetype]
+            if archetype not in archetype_analysis['archetypes_found']:
+                archetype_analysis['archetypes_found'].append(archetype)
+
+            if archetype not in archetype_analysis['archetype_details']:
+                archetype_analysis['archetype_details'][archetype] = {
+                    'meaning': info['meaning'],
+                    'positive_aspects': info['positive'],
+                    'negative_aspects': info['negative'],
+                    'appearances': []
+                }
+
+            archetype_analysis['archetype_details'][archetype]['appearances'].append({
+                'date': recent['date'],
+                'context': recent['context']
+            })
 
     # Generate recommendations based on found archetypes
     for archetype in archetype_analysis['archetypes_found']:
@@ -1192,6 +1501,7 @@ def analyze_dream_archetypes(dream_keys, phone_number):
 
 def analyze_psychological_patterns(dreams):
     """Analyze psychological patterns in dreams"""
+    aggregate = dream_aggregate(dreams)
     pattern_analysis = {
         'recurring_themes': {},
         'emotional_patterns': {},
@@ -1200,12 +1510,7 @@ def analyze_psychological_patterns(dreams):
     }
 
     # Analyze recurring themes
-    all_themes: list[str] = []
-    for dream in dreams:
-        if 'summary' in dream:
-            all_themes.extend(extract_meaningful_words(dream['summary']))
-
-    theme_counts = Counter(all_themes)
+    theme_counts = Counter(aggregate['themes'])
     recurring_themes = {theme: count for theme, count in theme_counts.items() if count > 1}
 
     pattern_analysis['recurring_themes'] = {
@@ -1214,72 +1519,7 @@ def analyze_psychological_patterns(dreams):
     }
 
     # Analyze emotional patterns using comprehensive emotion detection
-    emotions = []
-    for dream in dreams:
-        dream_text = dream.get('dreamContent', '').lower()
-        
-        # Comprehensive emotion detection
-        emotional_words = {
-            'fear': ['afraid', 'scared', 'terrified', 'fear', 'panic', 'anxiety', 'worried', 'nervous', 'dread'],
-            'joy': ['happy', 'joy', 'excited', 'elated', 'ecstatic', 'cheerful', 'delighted', 'thrilled', 'euphoric'],
-            'sadness': ['sad', 'depressed', 'melancholy', 'grief', 'sorrow', 'mourning', 'dejected', 'downcast', 'blue'],
-            'anger': ['angry', 'furious', 'rage', 'irritated', 'mad', 'enraged', 'livid', 'outraged', 'fuming'],
-            'peace': ['calm', 'peaceful', 'serene', 'tranquil', 'relaxed', 'content', 'satisfied', 'at ease', 'composed'],
-            'love': ['love', 'loving', 'affectionate', 'caring', 'tender', 'romantic', 'passionate', 'devoted'],
-            'surprise': ['surprised', 'shocked', 'amazed', 'astonished', 'startled', 'bewildered', 'stunned'],
-            'disgust': ['disgusted', 'repulsed', 'revolted', 'sickened', 'nauseated', 'appalled', 'horrified']
-        }
-        
-        dream_emotions = []
-        for emotion, words in emotional_words.items():
-            if any(word in dream_text for word in words):
-                dream_emotions.append(emotion)
-        
-        # If no specific emotions found, try broader sentiment analysis
-        if not dream_emotions:
-            # Expanded negative sentiment words
-            negative_words = [
-                'bad', 'terrible', 'awful', 'horrible', 'nightmare', 'scary', 'frightening',
-                'worried', 'anxious', 'stressed', 'troubled', 'disturbed', 'upset', 'concerned',
-                'difficult', 'hard', 'challenging', 'struggling', 'fighting', 'conflict',
-                'dark', 'cold', 'lonely', 'lost', 'confused', 'overwhelmed', 'trapped',
-                'hurt', 'pain', 'suffering', 'agony', 'torment', 'misery', 'despair',
-                'angry', 'frustrated', 'annoyed', 'irritated', 'mad', 'furious', 'rage',
-                'sad', 'depressed', 'gloomy', 'melancholy', 'sorrow', 'grief', 'mourning',
-                'disappointed', 'discouraged', 'hopeless', 'helpless', 'powerless'
-            ]
-            
-            # Expanded positive sentiment words
-            positive_words = [
-                'good', 'great', 'wonderful', 'amazing', 'beautiful', 'fantastic', 'excellent',
-                'happy', 'joyful', 'cheerful', 'delighted', 'pleased', 'content', 'satisfied',
-                'peaceful', 'calm', 'serene', 'tranquil', 'relaxed', 'comfortable', 'safe',
-                'bright', 'warm', 'sunny', 'light', 'clear', 'free', 'liberated',
-                'successful', 'achieving', 'winning', 'victorious', 'triumphant', 'accomplished',
-                'loved', 'cared', 'cherished', 'valued', 'appreciated', 'accepted', 'welcomed',
-                'excited', 'thrilled', 'enthusiastic', 'energetic', 'vibrant', 'alive', 'inspired',
-                'hopeful', 'optimistic', 'confident', 'strong', 'powerful', 'capable', 'able'
-            ]
-            
-            # Count sentiment words
-            negative_count = sum(1 for word in negative_words if word in dream_text)
-            positive_count = sum(1 for word in positive_words if word in dream_text)
-            
-            # Determine emotion based on sentiment word counts
-            if negative_count > positive_count and negative_count > 0:
-                dream_emotions.append('negative')
-            elif positive_count > negative_count and positive_count > 0:
-                dream_emotions.append('positive')
-            elif negative_count > 0 or positive_count > 0:
-                # If both are present, choose the stronger one
-                dream_emotions.append('positive' if positive_count >= negative_count else 'negative')
-            else:
-                # Only default to neutral if absolutely no emotional indicators found
-                dream_emotions.append('neutral')
-        
-        emotions.extend(dream_emotions)
-
-    emotion_counts = Counter(emotions)
+    emotion_counts = Counter(aggregate['pattern_emotions'])
     pattern_analysis['emotional_patterns'] = {
         'distribution': dict(emotion_counts),
         'dominant_emotion': emotion_counts.most_common(1)[0][0] if emotion_counts else 'neutral'
@@ -0,0 +1,365 @@
+import base64
+import json
+import os
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, wait
+import boto3
+from botocore.config import Config
+from datetime import datetime, timedelta
+
+# Per-user dream manifest: a compact, newest-first index of a user's dream
+# objects so listing a page is one GET and an in-memory slice instead of
+# LIST calls over the whole history.
+MANIFEST_VERSION = 1
+DREAM_MANIFEST_MAX_AGE = int(os.getenv('DREAM_MANIFEST_MAX_AGE', '300'))
+
+# Files stored alongside dreams in the user's root folder that are not dreams
+NON_DREAM_SUFFIXES = ('metadata.json', 'metadata', 'themes.txt')
+
+# S3 fan-out: concurrent GETs share one client whose connection pool matches
+# the worker count. DREAM_FETCH_TIMEOUT bounds each object's connect/read and
+# DREAM_FETCH_DEADLINE bounds a whole fan-out so it finishes inside the
+# Lambda timeout.
+DREAM_FETCH_WORKERS = int(os.getenv('DREAM_FETCH_WORKERS', '16'))
+DREAM_FETCH_TIMEOUT = float(os.getenv('DREAM_FETCH_TIMEOUT', '3'))
+DREAM_FETCH_DEADLINE = float(os.getenv('DREAM_FETCH_DEADLINE', '8'))
+
+_shared_s3_client = None
+_shared_s3_client_lock = threading.Lock()
+
+def get_shared_s3_client():
+    """S3 client shared by every fan-out path, pooled for DREAM_FETCH_WORKERS connections"""
+    global _shared_s3_client
+    with _shared_s3_client_lock:
+        if _shared_s3_client is None:
+            _shared_s3_client = boto3.client('s3', config=Config(
+                max_pool_connections=DREAM_FETCH_WORKERS,
+                connect_timeout=DREAM_FETCH_TIMEOUT,
+                read_timeout=DREAM_FETCH_TIMEOUT,
+                retries={'max_attempts': 2, 'mode': 'standard'}
+            ))
+        return _shared_s3_client
+
+def manifest_key(phone_number: str) -> str:
+    """S3 key of the user's dream manifest"""
+    return f'{phone_number}/_index/manifest.json'
+
+def features_key(phone_number: str) -> str:
+    """S3 key of the user's per-dream analysis features"""
+    return f'{phone_number}/_index/features.json'
+
+def aggregates_key(phone_number: str) -> str:
+    """S3 key of the user's running analysis aggregate"""
+    return f'{phone_number}/_index/aggregates.json'
+
+def load_index_document(s3_client, bucket: str, key: str):
+    """Load a JSON index document, returning None if missing or unreadable"""
+    try:
+        response = s3_client.get_object(Bucket=bucket, Key=key)
+        document = json.loads(response['Body'].read().decode('utf-8'))
+    except Exception as e:
+        print(f"Index document {key} unavailable: {e}")
+        return None
+
+    return document if isinstance(document, dict) else None
+
+def save_index_document(s3_client, bucket: str, key: str, document: dict) -> bool:
+    """Write a JSON index document; failures are logged since indexes can be rebuilt"""
+    try:
+        s3_client.put_object(
+            Bucket=bucket,
+            Key=key,
+            Body=json.dumps(document),
+            ContentType='application/json'
+        )
+        return True
+    except Exception as e:
+        print(f"Error saving index document {key}: {e}")
+        return False
+
+def is_dream_key(key: str, phone_number: str) -> bool:
+    """Check whether an S3 key is a dream object for the given user.
+
+    Dreams live either in the new `{phone}/dreams/` folder or at the root of
+    the legacy `{phone}/` folder. Other subfolders (such as `_index/`) and the
+    metadata/themes files are not dreams.
+    """
+    if key.endswith(NON_DREAM_SUFFIXES):
+        return False
+
+    if key.startswith(f'{phone_number}/dreams/'):
+        return len(key) > len(f'{phone_number}/dreams/')
+
+    root_prefix = f'{phone_number}/'
+    if not key.startswith(root_prefix):
+        return False
+
+    name = key[len(root_prefix):]
+    return bool(name) and '/' not in name
+
+def phone_number_from_key(key: str):
+    """Extract the owning phone number from a dream object key"""
+    phone_number, _, rest = key.partition('/')
+    if not phone_number or not rest:
+        return None
+    return phone_number
+
+def _timestamp(value) -> str:
+    """Normalise an S3 LastModified value (datetime or string) to ISO format"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value) if value is not None else ''
+
+def manifest_entry(obj: dict) -> dict:
+    """Build a manifest entry from a list_objects_v2/head_object style dict"""
+    return {
+        'key': obj['Key'],
+        'createdAt': _timestamp(obj.get('LastModified')),
+        'size': obj.get('Size', obj.get('ContentLength', 0)),
+        'etag': str(obj.get('ETag', '')).strip('"')
+    }
+
+def _sort_entries(entries: list) -> list:
+    """Sort manifest entries newest first"""
+    return sorted(entries, key=lambda entry: entry['createdAt'], reverse=True)
+
+def _dream_prefixes(phone_number: str) -> list:
+    """Prefixes (and delimiters) holding a user's dreams, new path first.
+
+    The legacy root listing uses a '/' delimiter so only root-level objects are
+    returned and the dreams/ and _index/ subfolders are not enumerated twice.
+    """
+    return [
+        (f'{phone_number}/dreams/', None),
+        (f'{phone_number}/', '/')
+    ]
+
+def iter_objects(s3_client, bucket: str, prefix: str, delimiter: str = None):
+    """Yield every object under a prefix, following continuation tokens"""
+    params = {'Bucket': bucket, 'Prefix': prefix}
+    if delimiter:
+        params['Delimiter'] = delimiter
+
+    while True:
+        response = s3_client.list_objects_v2(**params)
+        for obj in response.get('Contents', []):
+            yield obj
+
+        if not response.get('IsTruncated') or not response.get('NextContinuationToken'):
+            return
+        params['ContinuationToken'] = response['NextContinuationToken']
+
+def list_dream_objects(s3_client, bucket: str, phone_number: str) -> list:
+    """List all dream objects for a user across the new and legacy paths"""
+    objects = []
+    seen_keys = set()
+
+    for prefix, delimiter in _dream_prefixes(phone_number):
+        for obj in iter_objects(s3_client, bucket, prefix, delimiter):
+            key = obj['Key']
+            if key not in seen_keys and is_dream_key(key, phone_number):
+                objects.append(obj)
+                seen_keys.add(key)
+
+    return objects
+
+def encode_cursor(phone_number: str, phase: int, token: str = None) -> str:
+    """Encode a position in a user's listing as an opaque cursor string"""
+    payload = json.dumps({'u': phone_number, 'p': phase, 't': token}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor: str, phone_number: str) -> tuple:
+    """Decode a cursor produced by encode_cursor for phone_number; an empty cursor starts from the beginning"""
+    if not cursor:
+        return 0, None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8'))
+        owner, phase, token = payload['u'], int(payload['p']), payload.get('t')
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if phase < 0 or (token is not None and not isinstance(token, str)):
+        raise ValueError("Invalid cursor")
+    # A cursor only continues the listing it was issued for
+    if owner != phone_number:
+        raise ValueError("Invalid cursor")
+    return phase, token
+
+def list_dream_page(s3_client, bucket: str, phone_number: str, limit: int, cursor: str = None) -> tuple:
+    """List one page of a user's dreams straight from S3.
+
+    Pages are streamed in S3 key order (new path first, then the legacy root),
+    not newest first like the manifest, requesting at most `limit` keys per
+    call, so memory and latency scale with the page size rather than the
+    user's history. Returns (objects, next_cursor); next_cursor is None once
+    every dream has been listed. Raises ValueError for a malformed cursor or
+    one issued for another user.
+    """
+    phase, token = decode_cursor(cursor, phone_number)
+    prefixes = _dream_prefixes(phone_number)
+    objects = []
+
+    while phase < len(prefixes) and len(objects) < limit:
+        prefix, delimiter = prefixes[phase]
+        params = {'Bucket': bucket, 'Prefix': prefix, 'MaxKeys': limit - len(objects)}
+        if delimiter:
+            params['Delimiter'] = delimiter
+        if token:
+            params['ContinuationToken'] = token
+
+        response = s3_client.list_objects_v2(**params)
+        objects.extend(obj for obj in response.get('Contents', []) if is_dream_key(obj['Key'], phone_number))
+
+        if response.get('IsTruncated') and response.get('NextContinuationToken'):
+            token = response['NextContinuationToken']
+        else:
+            phase, token = phase + 1, None
+
+    next_cursor = encode_cursor(phone_number, phase, token) if phase < len(prefixes) else None
+    return objects, next_cursor
+
+def load_dream_manifest(s3_client, bucket: str, phone_number: str):
+    """Load the user's dream manifest, returning None if missing or unreadable"""
+    manifest = load_index_document(s3_client, bucket, manifest_key(phone_number))
+    if manifest is None or manifest.get('version') != MANIFEST_VERSION:
+        return None
+
+    return manifest
+
+def save_dream_manifest(s3_client, bucket: str, phone_number: str, entries: list) -> dict:
+    """Write the user's dream manifest and return it"""
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'generatedAt': datetime.utcnow().isoformat(),
+        'dreams': _sort_entries(entries)
+    }
+
+    # The manifest is only an index; serving the freshly built copy is fine
+    save_index_document(s3_client, bucket, manifest_key(phone_number), manifest)
+    return manifest
+
+def rebuild_dream_manifest(s3_client, bucket: str, phone_number: str) -> dict:
+    """Rebuild the user's dream manifest from an S3 listing"""
+    objects = list_dream_objects(s3_client, bucket, phone_number)
+    entries = [manifest_entry(obj) for obj in objects]
+    print(f"Rebuilt dream manifest for {phone_number} with {len(entries)} dreams")
+    return save_dream_manifest(s3_client, bucket, phone_number, entries)
+
+def manifest_is_stale(manifest: dict, max_age: int = None) -> bool:
+    """Check whether a manifest is older than the allowed maximum age"""
+    max_age = DREAM_MANIFEST_MAX_AGE if max_age is None else max_age
+    try:
+        generated_at = datetime.fromisoformat(manifest['generatedAt'])
+    except (KeyError, TypeError, ValueError):
+        return True
+    return datetime.utcnow() - generated_at > timedelta(seconds=max_age)
+
+def get_dream_manifest(s3_client, bucket: str, phone_number: str, refresh: bool = False) -> dict:
+    """Get the user's dream manifest, rebuilding it when missing, stale or requested"""
+    manifest = None if refresh else load_dream_manifest(s3_client, bucket, phone_number)
+    if manifest is None or manifest_is_stale(manifest):
+        manifest = rebuild_dream_manifest(s3_client, bucket, phone_number)
+    return manifest
+
+def record_dream_in_manifest(s3_client, bucket: str, phone_number: str, obj: dict) -> dict:
+    """Add or update a single dream in the user's manifest after it is written"""
+    manifest = load_dream_manifest(s3_client, bucket, phone_number)
+    if manifest is None:
+        # A rebuild lists the new object along with everything else
+        return rebuild_dream_manifest(s3_client, bucket, phone_number)
+
+    entry = manifest_entry(obj)
+    entries = [existing for existing in manifest['dreams'] if existing['key'] != entry['key']]
+    entries.append(entry)
+    return save_dream_manifest(s3_client, bucket, phone_number, entries)
+
+def remove_dream_from_manifest(s3_client, bucket: str, phone_number: str, key: str) -> dict:
+    """Drop a deleted dream from the user's manifest"""
+    manifest = load_dream_manifest(s3_client, bucket, phone_number)
+    if manifest is None:
+        return rebuild_dream_manifest(s3_client, bucket, phone_number)
+
+    entries = [entry for entry in manifest['dreams'] if entry['key'] != key]
+    return save_dream_manifest(s3_client, bucket, phone_number, entries)
+
+def iter_dream_events(event: dict):
+    """Yield (event_name, bucket, key, phone_number) for dream objects in an S3 notification"""
+    for record in event.get('Records', []):
+        bucket = record.get('s3', {}).get('bucket', {}).get('name')
+        key = urllib.parse.unquote_plus(record.get('s3', {}).get('object', {}).get('key', ''))
+        phone_number = phone_number_from_key(key)
+        if not bucket or not phone_number or not is_dream_key(key, phone_number):
+            continue
+        yield record.get('eventName', ''), bucket, key, phone_number
+
+def apply_s3_event(s3_client, event: dict) -> int:
+    """Keep manifests in sync from S3 ObjectCreated/ObjectRemoved notifications.
+
+    Returns the number of records that touched a manifest.
+    """
+    applied = 0
+    for event_name, bucket, key, phone_number in iter_dream_events(event):
+        try:
+            if event_name.startswith('ObjectRemoved'):
+                remove_dream_from_manifest(s3_client, bucket, phone_number, key)
+            else:
+                head = s3_client.head_object(Bucket=bucket, Key=key)
+                head['Key'] = key
+                record_dream_in_manifest(s3_client, bucket, phone_number, head)
+            applied += 1
+        except Exception as e:
+            print(f"Error updating dream manifest for {key}: {e}")
+
+    return applied
+
+def fetch_concurrently(fetch, items: list, max_workers: int = None, deadline: float = None, stats: dict = None) -> list:
+    """Run fetch(item) for each item on a bounded thread pool.
+
+    Returns (item, result, error) tuples in input order; a failing item carries
+    its exception instead of aborting the whole batch, and items still running
+    at the deadline carry a TimeoutError. When a stats dict is given it is
+    filled with requested/succeeded/failed/timedOut counts and elapsedMs.
+    """
+    if not items:
+        return []
+
+    def run(item):
+        try:
+            return item, fetch(item), None
+        except Exception as e:
+            return item, None, e
+
+    deadline = DREAM_FETCH_DEADLINE if deadline is None else deadline
+    workers = max(1, min(max_workers or DREAM_FETCH_WORKERS, len(items)))
+    started = time.monotonic()
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = [executor.submit(run, item) for item in items]
+    done, _ = wait(futures, timeout=deadline)
+    # Don't block on stragglers; their results are reported as timed out
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    results = []
+    timed_out = 0
+    for item, future in zip(items, futures):
+        if future in done:
+            results.append(future.result())
+        else:
+            timed_out += 1
+            results.append((item, None, TimeoutError(f"Timed out after {deadline}s")))
+
+    failed = sum(1 for _, _, error in results if error is not None) - timed_out
+    counts = {
+        'requested': len(items),
+        'succeeded': len(items) - failed - timed_out,
+        'failed': failed,
+        'timedOut': timed_out,
+        'elapsedMs': int((time.monotonic() - started) * 1000)
+    }
+    if failed or timed_out:
+        print(f"S3 fan-out finished with errors: {counts}")
+    if stats is not None:
+        stats.update(counts)
+
+    return results
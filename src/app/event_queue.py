@@ -0,0 +1,142 @@
+import time
+import queue
+import sqlite3
+import threading
+import boto3
+
+class InProcessEventQueue:
+    """Local stand-in for the event queue: applies events one at a time, in arrival order, on a background thread.
+
+    Events are lost if the process exits before they are applied.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self._pending = queue.Queue()
+        self._worker = None
+        self._worker_lock = threading.Lock()
+        # Set once an event cannot be applied; later events are then held back
+        self._halted = False
+
+    def put(self, event_id: str, payload: str, group: str = None):
+        """Queue an event payload for the handler"""
+        self._pending.put((event_id, payload))
+        self._start_worker()
+
+    def join(self):
+        """Block until every queued event has been applied"""
+        self._pending.join()
+
+    def _start_worker(self):
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            event_id, payload = self._pending.get()
+            try:
+                if not self._halted:
+                    self._apply(event_id, payload)
+            finally:
+                self._pending.task_done()
+
+    def _apply(self, event_id, payload):
+        try:
+            self.handler(payload)
+        except Exception as e:
+            print(f"Error applying queued event {event_id}: {str(e)}")
+
+class SQLiteEventQueue(InProcessEventQueue):
+    """Durable local stand-in: events are stored in SQLite before they are applied.
+
+    Events left over from a previous run are applied first, in the order they
+    were queued. A failed event is retried with backoff; if it still fails the
+    queue stops applying events, so nothing overtakes it, and it and every
+    later event are replayed in order on the next start.
+    """
+
+    def __init__(self, handler, path: str, attempts: int = 5, retry_delay: float = 1.0):
+        super().__init__(handler)
+        self.path = path
+        self.attempts = attempts
+        self.retry_delay = retry_delay
+        self._db_lock = threading.Lock()
+        with self._connect() as connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS events '
+                '(seq INTEGER PRIMARY KEY AUTOINCREMENT, event_id TEXT UNIQUE, payload TEXT NOT NULL)'
+            )
+            leftovers = connection.execute('SELECT event_id FROM events ORDER BY seq').fetchall()
+
+        for (event_id,) in leftovers:
+            self._pending.put((event_id, None))
+        if leftovers:
+            self._start_worker()
+
+    def put(self, event_id: str, payload: str, group: str = None):
+        """Store an event payload, then queue it for the handler"""
+        with self._db_lock, self._connect() as connection:
+            connection.execute('INSERT OR IGNORE INTO events (event_id, payload) VALUES (?, ?)', (event_id, payload))
+        super().put(event_id, payload, group)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, check_same_thread=False)
+
+    def _apply(self, event_id, payload):
+        with self._db_lock, self._connect() as connection:
+            row = connection.execute('SELECT payload FROM events WHERE event_id = ?', (event_id,)).fetchone()
+        if row is None:
+            return
+
+        for attempt in range(self.attempts):
+            try:
+                self.handler(row[0])
+                break
+            except Exception as e:
+                print(f"Error applying queued event {event_id} (attempt {attempt + 1}): {str(e)}")
+                if attempt + 1 < self.attempts:
+                    time.sleep(self.retry_delay * 2 ** attempt)
+        else:
+            print(f"Stopping the event queue at {event_id}; it and later events are replayed on the next start")
+            self._halted = True
+            return
+
+        with self._db_lock, self._connect() as connection:
+            connection.execute('DELETE FROM events WHERE event_id = ?', (event_id,))
+
+class SQSEventQueue:
+    """Event queue backed by SQS; FIFO queues keep each group's events in order and drop duplicate ids"""
+
+    def __init__(self, queue_url: str):
+        self.queue_url = queue_url
+        self._client = None
+
+    def put(self, event_id: str, payload: str, group: str = None):
+        """Send an event payload to the queue"""
+        if self._client is None:
+            self._client = boto3.client('sqs')
+
+        message = {'QueueUrl': self.queue_url, 'MessageBody': payload}
+        if self.queue_url.endswith('.fifo'):
+            message['MessageGroupId'] = group or 'default'
+            message['MessageDeduplicationId'] = event_id
+        self._client.send_message(**message)
+
+def apply_sqs_records(records: list, handler) -> dict:
+    """Apply SQS messages in order, reporting the first failure and everything after it for redelivery.
+
+    Returns the partial batch response Lambda expects from an SQS event source.
+    """
+    failures = []
+    for record in records:
+        if failures:
+            failures.append({'itemIdentifier': record['messageId']})
+            continue
+        try:
+            handler(record['body'])
+        except Exception as e:
+            print(f"Error applying queued event {record['messageId']}: {str(e)}")
+            failures.append({'itemIdentifier': record['messageId']})
+    return {'batchItemFailures': failures}
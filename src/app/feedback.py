@@ -6,7 +6,7 @@ import json
 import uuid
 from datetime import datetime
 from functools import wraps
-from .auth import require_cognito_auth, get_cognito_user_info
+from .auth import require_cognito_auth, get_auth_context
 
 feedback_bp = Blueprint('feedback_bp', __name__)
 
@@ -14,29 +14,24 @@ feedback_bp = Blueprint('feedback_bp', __name__)
 dynamodb = boto3.resource('dynamodb')
 feedback_table_name = os.getenv('FEEDBACK_TABLE_NAME', 'dream-companion-feedback')
 
+# Table handle resolved once per process (provisioned by `flask bootstrap`)
+_feedback_table = None
+
 def get_feedback_table():
     """Get the feedback table"""
-    try:
-        table = dynamodb.Table(feedback_table_name)
-        table.load()
-        return table
-    except Exception as e:
-        print(f"Error accessing table {feedback_table_name}: {str(e)}")
-        raise e
+    global _feedback_table
+    if _feedback_table is None:
+        _feedback_table = dynamodb.Table(feedback_table_name)
+    return _feedback_table
 
 def validate_user_access(user_id):
     """Validate that the user_id matches the authenticated user's phone number"""
-    user_info = get_cognito_user_info()
-    if not user_info:
+    context = get_auth_context()
+    if not context:
         return False
     
-    # Get the phone number from the token and remove the + prefix
-    phone_number = user_info.get('phone_number', '')
-    if phone_number.startswith('+'):
-        phone_number = phone_number[1:]
-    
-    # Compare with the user_id from the URL
-    return phone_number == user_id
+    # Compare the token's phone number (without the + prefix) with the user_id from the URL
+    return context.phone_number == user_id
 
 @feedback_bp.route('/submit', methods=['POST'])
 @cross_origin(supports_credentials=True)
@@ -44,15 +39,11 @@ def validate_user_access(user_id):
 def submit_feedback():
     """Submit user feedback"""
     try:
-        # Get user info from Cognito token
-        user_info = get_cognito_user_info()
-        if not user_info:
+        # Get the authenticated user's phone number
+        context = get_auth_context()
+        if not context:
             return jsonify({"error": "Invalid authentication token"}), 401
-
-        # Get phone number from user info
-        phone_number = user_info.get('phone_number', '')
-        if phone_number.startswith('+'):
-            phone_number = phone_number[1:]
+        phone_number = context.phone_number
 
         data = request.get_json()
         rating = data.get('rating')  # 'thumbs_up' or 'thumbs_down'
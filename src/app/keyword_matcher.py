@@ -0,0 +1,96 @@
+from collections import deque
+
+class KeywordMatcher:
+    """Aho-Corasick automaton that finds every lexicon keyword in one pass over a text.
+
+    Keywords are grouped under labels (a keyword may belong to several labels).
+    Matches may overlap, so by default a keyword is reported exactly when
+    `keyword in text` holds; with whole_words only matches bounded by non-word
+    characters are kept.
+    """
+
+    def __init__(self, lexicons: dict):
+        self.labels = {}
+        for label, keywords in lexicons.items():
+            for keyword in keywords:
+                if not keyword:
+                    continue
+                labels = self.labels.setdefault(keyword, [])
+                if label not in labels:
+                    labels.append(label)
+
+        self._build()
+
+    def _build(self):
+        """Compile the keyword trie into a complete transition table"""
+        transitions = [{}]
+        outputs = [[]]
+        for keyword in self.labels:
+            state = 0
+            for char in keyword:
+                next_state = transitions[state].get(char)
+                if next_state is None:
+                    next_state = len(transitions)
+                    transitions[state][char] = next_state
+                    transitions.append({})
+                    outputs.append([])
+                state = next_state
+            outputs[state].append(keyword)
+
+        # Breadth-first: a state's failure link is always shallower, so its
+        # transitions are complete by the time they are copied down.
+        failure = [0] * len(transitions)
+        trie = [dict(edges) for edges in transitions]
+        queue = deque(trie[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in trie[state].items():
+                failure[next_state] = transitions[failure[state]].get(char, 0)
+                outputs[next_state] = outputs[next_state] + outputs[failure[next_state]]
+                queue.append(next_state)
+            for char, target in transitions[failure[state]].items():
+                transitions[state].setdefault(char, target)
+
+        self._transitions = transitions
+        self._outputs = outputs
+
+    def find(self, text: str, whole_words: bool = False) -> list:
+        """Every keyword occurrence in text as (start, keyword), ordered by end position"""
+        transitions = self._transitions
+        outputs = self._outputs
+        matches = []
+        state = 0
+
+        for index, char in enumerate(text):
+            state = transitions[state].get(char, 0)
+            if outputs[state]:
+                for keyword in outputs[state]:
+                    start = index - len(keyword) + 1
+                    if whole_words and not _is_whole_word(text, start, index + 1):
+                        continue
+                    matches.append((start, keyword))
+
+        return matches
+
+    def group(self, matches: list, end: int = None) -> dict:
+        """Group (start, keyword) matches as {label: {keyword: [start, ...]}}.
+
+        With end, only matches lying entirely before that offset are kept.
+        """
+        hits = {}
+        for start, keyword in matches:
+            if end is not None and start + len(keyword) > end:
+                continue
+            for label in self.labels[keyword]:
+                hits.setdefault(label, {}).setdefault(keyword, []).append(start)
+        return hits
+
+    def match(self, text: str, whole_words: bool = False) -> dict:
+        """Lexicon hits in text as {label: {keyword: [start, ...]}}"""
+        return self.group(self.find(text, whole_words))
+
+def _is_whole_word(text: str, start: int, end: int) -> bool:
+    """Check that text[start:end] is not part of a longer word"""
+    before = text[start - 1] if start > 0 else ' '
+    after = text[end] if end < len(text) else ' '
+    return not (before.isalnum() or before == '_') and not (after.isalnum() or after == '_')
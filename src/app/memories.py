@@ -1,23 +1,333 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, g, make_response
 from flask_cors import cross_origin
 import boto3
 import os
 import json
+import time
 import uuid
+import random
 from datetime import datetime, timedelta
+from decimal import Decimal
 from functools import wraps
-from .auth import require_cognito_auth, get_cognito_user_info
-from .premium import require_premium
+from .auth import require_cognito_auth, get_auth_context
+from .premium import (
+    require_premium, premium_table_name, get_cached_entitlement, record_premium_item,
+    verify_entitlement_token, ENTITLEMENT_TOKEN_HEADER
+)
 
 memories_bp = Blueprint('memories_bp', __name__)
 
 # Initialize DynamoDB client for memory management
 dynamodb = boto3.resource('dynamodb')
-memories_table_name = os.getenv('MEMORIES_TABLE_NAME', 'dream-companion-memories')
+memories_table_name = os.getenv('MEMORIES_TABLE_NAME', 'dream-companion-memory-entries')
+
+# One item per entry: partition key user_id, sort key entry_key ('TYPE#id')
+PROFILE_KEY = 'PROFILE'
+TRAIT_PREFIX = 'TRAIT#'
+MEMORY_PREFIX = 'MEMORY#'
+LIFE_EVENT_PREFIX = 'LIFE_EVENT#'
+GOAL_PREFIX = 'GOAL#'
+CONTEXT_PREFIXES = {'life_event': LIFE_EVENT_PREFIX, 'goal': GOAL_PREFIX}
+SECTION_PREFIXES = {
+    'traits': [TRAIT_PREFIX],
+    'memories': [MEMORY_PREFIX],
+    'personal_context': [LIFE_EVENT_PREFIX, GOAL_PREFIX]
+}
+
+# Attributes a client update may never overwrite
+PROTECTED_ATTRIBUTES = ('user_id', 'entry_key', 'id', 'version')
+
+# Attempts and base delay (seconds) for writes whose version check fails
+MEMORY_WRITE_ATTEMPTS = int(os.getenv('MEMORY_WRITE_ATTEMPTS', '4'))
+MEMORY_RETRY_BASE_DELAY = float(os.getenv('MEMORY_RETRY_BASE_DELAY', '0.05'))
+
+# Table handle resolved once per process (provisioned by `flask bootstrap`)
+_memories_table = None
 
 def get_memories_table():
     """Get the memories table"""
-    return dynamodb.Table(memories_table_name)
+    global _memories_table
+    if _memories_table is None:
+        _memories_table = dynamodb.Table(memories_table_name)
+    return _memories_table
+
+def prefetch_memory_items(f):
+    """Decorator fetching the caller's premium record and the user's memory profile in one request.
+
+    Sits between require_cognito_auth and require_premium on routes that read
+    the profile: one BatchGetItem covers both tables, require_premium then
+    answers from the entitlement cache and the handler reads the profile item
+    via get_user_profile_item. Nothing is read for another user's memories.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        user_id = kwargs.get('user_id')
+        if user_id and validate_user_access(user_id):
+            prefetch_items(get_auth_context().phone_number, user_id)
+        return f(*args, **kwargs)
+    return decorated_function
+
+def prefetch_items(phone_number, user_id):
+    """BatchGetItem the profile item and, unless already known, the premium record"""
+    request_items = {memories_table_name: {'Keys': [profile_key(user_id)]}}
+    premium_needed = bool(phone_number) and get_cached_entitlement(phone_number) is None and not verify_entitlement_token(
+        request.headers.get(ENTITLEMENT_TOKEN_HEADER), phone_number
+    )
+    if premium_needed:
+        request_items[premium_table_name] = {'Keys': [{'phone_number': phone_number}]}
+
+    try:
+        response = dynamodb.batch_get_item(RequestItems=request_items)
+    except Exception as e:
+        # The handlers fall back to their own reads
+        print(f"Error prefetching memory items: {str(e)}")
+        return
+
+    # Keys DynamoDB did not process are simply read again later
+    responses = response.get('Responses', {})
+    unprocessed = response.get('UnprocessedKeys', {})
+    if memories_table_name not in unprocessed:
+        items = responses.get(memories_table_name, [])
+        g.prefetched_profiles = {user_id: items[0] if items else None}
+    if premium_needed and premium_table_name not in unprocessed:
+        items = responses.get(premium_table_name, [])
+        record_premium_item(phone_number, items[0] if items else None)
+
+def entry_key(prefix, entry_id):
+    """Primary key of one memory entry"""
+    return f"{prefix}{entry_id}"
+
+def profile_key(user_id):
+    """Primary key of a user's profile item"""
+    return {'user_id': user_id, 'entry_key': PROFILE_KEY}
+
+def get_user_profile_item(table, user_id):
+    """The user's profile item (None if the user has no memories yet), prefetched when possible"""
+    prefetched = g.get('prefetched_profiles', {})
+    if user_id in prefetched:
+        return prefetched.pop(user_id)
+
+    response = table.get_item(Key=profile_key(user_id))
+    return response.get('Item')
+
+def query_entries(table, user_id, prefix=None, **kwargs):
+    """All items in a user's partition, or only those whose sort key starts with prefix"""
+    if prefix:
+        kwargs['KeyConditionExpression'] = 'user_id = :user_id AND begins_with(entry_key, :prefix)'
+        kwargs['ExpressionAttributeValues'] = {':user_id': user_id, ':prefix': prefix}
+    else:
+        kwargs['KeyConditionExpression'] = 'user_id = :user_id'
+        kwargs['ExpressionAttributeValues'] = {':user_id': user_id}
+
+    items = []
+    while True:
+        response = table.query(**kwargs)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+def from_dynamodb_value(value):
+    """A DynamoDB value with Decimals turned back into JSON numbers"""
+    def decimal_to_number(number):
+        return int(number) if number == number.to_integral_value() else float(number)
+    return json.loads(json.dumps(value, default=decimal_to_number))
+
+def entry_fields(item):
+    """An entry item without its key attributes"""
+    return from_dynamodb_value({key: value for key, value in item.items() if key not in ('user_id', 'entry_key')})
+
+def assemble_user_memories(user_id, profile, entries):
+    """Build the memories document the API returns from a profile item and entry items"""
+    memories = get_default_user_memories(user_id)
+    for field in ('dream_patterns', 'created_at', 'last_updated', 'version'):
+        if field in profile:
+            memories[field] = from_dynamodb_value(profile[field])
+
+    for item in entries:
+        key = item['entry_key']
+        if key.startswith(TRAIT_PREFIX):
+            memories['traits'][key[len(TRAIT_PREFIX):]] = entry_fields(item)
+        elif key.startswith(MEMORY_PREFIX):
+            memories['memories'].append(entry_fields(item))
+        elif key.startswith(LIFE_EVENT_PREFIX):
+            memories['personal_context']['life_events'].append(entry_fields(item))
+        elif key.startswith(GOAL_PREFIX):
+            memories['personal_context']['goals'].append(entry_fields(item))
+
+    # Sort keys order entries by id; the API lists them oldest first
+    for entries_list in (memories['memories'], memories['personal_context']['life_events'], memories['personal_context']['goals']):
+        entries_list.sort(key=lambda entry: entry.get('created_at', ''))
+
+    return memories
+
+def touch_profile(table, user_id):
+    """Record a change to the user's memories, creating their profile item if needed.
+
+    Bumps the profile version, which is the ETag of the user's memories, with
+    one atomic ADD; concurrent writers each get their own version back.
+    """
+    now = datetime.utcnow().isoformat()
+    defaults = get_default_user_memories(user_id)
+    response = table.update_item(
+        Key=profile_key(user_id),
+        UpdateExpression='SET last_updated = :now, created_at = if_not_exists(created_at, :now), '
+                         'dream_patterns = if_not_exists(dream_patterns, :dream_patterns) ADD version :one',
+        ExpressionAttributeValues={':now': now, ':dream_patterns': defaults['dream_patterns'], ':one': 1},
+        ReturnValues='UPDATED_NEW'
+    )
+    g.memories_version = response['Attributes']['version']
+
+def create_profile(table, user_id, memories):
+    """Write a new user's profile item; returns False if one already exists"""
+    try:
+        table.put_item(
+            Item={
+                **profile_key(user_id),
+                'dream_patterns': memories['dream_patterns'],
+                'created_at': memories['created_at'],
+                'last_updated': memories['last_updated'],
+                'version': memories['version']
+            },
+            ConditionExpression='attribute_not_exists(entry_key)'
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+def put_new_entry(table, user_id, key, fields):
+    """Write a new entry at version 1 without overwriting an existing one"""
+    table.put_item(
+        Item={'user_id': user_id, 'entry_key': key, **fields, 'version': 1},
+        ConditionExpression='attribute_not_exists(entry_key)'
+    )
+    touch_profile(table, user_id)
+
+def version_condition(item):
+    """Condition arguments requiring an entry to still be at the version it was read at"""
+    if 'version' not in item:
+        # Entries written before versioning
+        return {
+            'ConditionExpression': 'attribute_exists(entry_key) AND attribute_not_exists(#version)',
+            'ExpressionAttributeNames': {'#version': 'version'}
+        }
+    return {
+        'ConditionExpression': '#version = :version',
+        'ExpressionAttributeNames': {'#version': 'version'},
+        'ExpressionAttributeValues': {':version': item['version']}
+    }
+
+def retry_on_version_conflict(table, operation):
+    """Run operation, retrying with jittered exponential backoff while a version check fails"""
+    for attempt in range(MEMORY_WRITE_ATTEMPTS):
+        try:
+            return operation()
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            if attempt == MEMORY_WRITE_ATTEMPTS - 1:
+                raise
+            time.sleep(random.uniform(0, MEMORY_RETRY_BASE_DELAY * 2 ** attempt))
+
+def is_expired_memory(memory, cutoff_date):
+    """Check whether cleanup may remove a memory"""
+    if memory['importance'] == 'high':
+        return False
+    return datetime.fromisoformat(memory['created_at'].replace('Z', '+00:00')) <= cutoff_date
+
+def delete_expired_memory(table, memory, cutoff_date):
+    """Delete a memory if it is still expired at the version last read; returns True if deleted"""
+    current = {'item': memory}
+    key = {'user_id': memory['user_id'], 'entry_key': memory['entry_key']}
+
+    def attempt():
+        item = current['item']
+        if item is None or not is_expired_memory(item, cutoff_date):
+            return False
+        try:
+            table.delete_item(Key=key, **version_condition(item))
+            return True
+        except table.meta.client.exceptions.ConditionalCheckFailedException:
+            # Changed (or deleted) since it was read: look again before retrying
+            current['item'] = table.get_item(Key=key, ConsistentRead=True).get('Item')
+            raise
+
+    return retry_on_version_conflict(table, attempt)
+
+def memories_etag(profile, section=None):
+    """ETag of a user's memories (or one section of them)"""
+    version = str(profile.get('version', 0))
+    return f"{version}-{section}" if section else version
+
+def to_dynamodb_value(value):
+    """A JSON value with floats converted to Decimal, which DynamoDB requires"""
+    return json.loads(json.dumps(value), parse_float=Decimal)
+
+def build_update_expression(data):
+    """SET the given fields (and updated_at), REMOVE the ones set to null.
+
+    Returns (UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues).
+    """
+    names = {'#updated_at': 'updated_at'}
+    values = {':updated_at': datetime.utcnow().isoformat()}
+    set_clauses = ['#updated_at = :updated_at']
+    remove_clauses = []
+
+    fields = [field for field in data if field not in PROTECTED_ATTRIBUTES and field != 'updated_at']
+    for index, field in enumerate(fields):
+        names[f'#f{index}'] = field
+        if data[field] is None:
+            remove_clauses.append(f'#f{index}')
+        else:
+            values[f':v{index}'] = to_dynamodb_value(data[field])
+            set_clauses.append(f'#f{index} = :v{index}')
+
+    expression = 'SET ' + ', '.join(set_clauses)
+    if remove_clauses:
+        expression += ' REMOVE ' + ', '.join(remove_clauses)
+
+    # Every write moves the entry to a new version
+    names['#version'] = 'version'
+    values[':one'] = 1
+    expression += ' ADD #version :one'
+    return expression, names, values
+
+def update_entry(table, user_id, key, data, create=False):
+    """Apply client fields to one entry in a single UpdateItem; returns the updated entry.
+
+    Only the named attributes are written. Unless create is set, a missing
+    entry is left alone and None is returned.
+    """
+    expression, names, values = build_update_expression(data)
+    kwargs = {}
+    if not create:
+        kwargs['ConditionExpression'] = 'attribute_exists(entry_key)'
+
+    try:
+        response = table.update_item(
+            Key={'user_id': user_id, 'entry_key': key},
+            UpdateExpression=expression,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=values,
+            ReturnValues='ALL_NEW',
+            **kwargs
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
+
+    touch_profile(table, user_id)
+    return entry_fields(response['Attributes'])
+
+def delete_entry(table, user_id, key):
+    """Delete an entry; returns False if there was no such entry"""
+    try:
+        table.delete_item(
+            Key={'user_id': user_id, 'entry_key': key},
+            ConditionExpression='attribute_exists(entry_key)'
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+
+    touch_profile(table, user_id)
+    return True
 
 def get_default_user_memories(user_id):
     """Get default user memories structure"""
@@ -35,44 +345,70 @@ def get_default_user_memories(user_id):
         },
         'memories': [],
         'created_at': datetime.utcnow().isoformat(),
-        'last_updated': datetime.utcnow().isoformat()
+        'last_updated': datetime.utcnow().isoformat(),
+        'version': 0
     }
 
 def validate_user_access(user_id):
     """Validate that the user_id matches the authenticated user's phone number"""
-    user_info = get_cognito_user_info()
-    if not user_info:
+    context = get_auth_context()
+    if not context:
         return False
     
-    # Get the phone number from the token and remove the + prefix
-    phone_number = user_info.get('phone_number', '')
-    if phone_number.startswith('+'):
-        phone_number = phone_number[1:]
-    
-    # Compare with the user_id from the URL
-    return phone_number == user_id
+    # Compare the token's phone number (without the + prefix) with the user_id from the URL
+    return context.phone_number == user_id
+
+def memories_response(response, profile, section=None):
+    """Tag a memories response with its version so clients can refresh conditionally"""
+    response.set_etag(memories_etag(profile, section))
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@memories_bp.after_request
+def add_memories_version(response):
+    """Hand the new version back after a write so clients need not refetch to learn it"""
+    version = g.get('memories_version')
+    if version is not None and response.status_code < 300:
+        response.headers['X-Memories-Version'] = str(version)
+    return response
 
 @memories_bp.route('/user/<user_id>', methods=['GET'])
 @cross_origin(supports_credentials=True)
 @require_cognito_auth
+@prefetch_memory_items
 @require_premium
 def get_user_memories(user_id):
-    """Get user memories"""
+    """Get user memories, optionally only one section (?section=traits|memories|personal_context)"""
     try:
         # Validate that the user can only access their own data
         if not validate_user_access(user_id):
             return jsonify({"error": "Access denied: You can only access your own memories"}), 403
+
+        section = request.args.get('section')
+        if section and section not in SECTION_PREFIXES:
+            return jsonify({"error": f"Invalid section. Must be one of: {', '.join(SECTION_PREFIXES)}"}), 400
         
         table = get_memories_table()
-        response = table.get_item(Key={'user_id': user_id})
+        profile = get_user_profile_item(table, user_id)
 
-        if 'Item' not in response:
+        if profile is None:
             # Create default memories for new user
             default_memories = get_default_user_memories(user_id)
-            table.put_item(Item=default_memories)
-            return jsonify(default_memories), 200
+            if create_profile(table, user_id, default_memories):
+                return memories_response(jsonify(default_memories), default_memories, section)
+            # A concurrent write created the profile first
+            profile = get_user_profile_item(table, user_id)
 
-        return jsonify(response['Item']), 200
+        # The profile version alone answers a conditional refresh
+        if request.if_none_match.contains(memories_etag(profile, section)):
+            return memories_response(make_response('', 304), profile, section)
+
+        if section:
+            entries = [item for prefix in SECTION_PREFIXES[section] for item in query_entries(table, user_id, prefix)]
+        else:
+            entries = query_entries(table, user_id)
+
+        return memories_response(jsonify(assemble_user_memories(user_id, profile, entries)), profile, section)
 
     except Exception as e:
         print(f"Error in get_user_memories: {str(e)}")
@@ -90,13 +426,16 @@ def get_user_memory_summary(user_id):
             return jsonify({"error": "Access denied: You can only access your own memories"}), 403
         
         table = get_memories_table()
-        response = table.get_item(Key={'user_id': user_id})
+        # Only the sort keys are needed to count entries
+        keys = [item['entry_key'] for item in query_entries(table, user_id, ProjectionExpression='entry_key')]
 
-        if 'Item' not in response:
+        if not keys:
             return jsonify({"summary": "No memory data available yet."}), 200
 
-        memories = response['Item']
-        summary = f"User has {len(memories.get('traits', {}))} traits, {len(memories.get('memories', []))} memories, and {len(memories.get('personal_context', {}).get('life_events', [])) + len(memories.get('personal_context', {}).get('goals', []))} context items."
+        def count(*prefixes):
+            return sum(1 for key in keys if key.startswith(prefixes))
+
+        summary = f"User has {count(TRAIT_PREFIX)} traits, {count(MEMORY_PREFIX)} memories, and {count(LIFE_EVENT_PREFIX, GOAL_PREFIX)} context items."
 
         return jsonify({"summary": summary}), 200
 
@@ -123,26 +462,13 @@ def add_trait(user_id):
             return jsonify({"error": "trait_type and trait_value are required"}), 400
 
         table = get_memories_table()
-        
-        # Get existing memories
-        response = table.get_item(Key={'user_id': user_id})
-        if 'Item' not in response:
-            memories = get_default_user_memories(user_id)
-        else:
-            memories = response['Item']
+        trait = update_entry(
+            table, user_id, entry_key(TRAIT_PREFIX, trait_type),
+            {'value': trait_value, 'confidence': confidence},
+            create=True
+        )
 
-        # Update trait
-        memories['traits'][trait_type] = {
-            'value': trait_value,
-            'confidence': confidence,
-            'updated_at': datetime.utcnow().isoformat()
-        }
-        memories['last_updated'] = datetime.utcnow().isoformat()
-
-        # Save back to DynamoDB
-        table.put_item(Item=memories)
-
-        return jsonify({"success": True, "message": "Trait added successfully"}), 200
+        return jsonify({"success": True, "message": "Trait added successfully", "trait": trait}), 200
 
     except Exception as e:
         return jsonify({"error": f"Failed to add trait: {str(e)}"}), 500
@@ -168,13 +494,6 @@ def add_memory(user_id):
             return jsonify({"error": "content and memory_type are required"}), 400
 
         table = get_memories_table()
-        
-        # Get existing memories
-        response = table.get_item(Key={'user_id': user_id})
-        if 'Item' not in response:
-            memories = get_default_user_memories(user_id)
-        else:
-            memories = response['Item']
 
         # Add new memory
         new_memory = {
@@ -185,12 +504,7 @@ def add_memory(user_id):
             'tags': tags,
             'created_at': datetime.utcnow().isoformat()
         }
-        
-        memories['memories'].append(new_memory)
-        memories['last_updated'] = datetime.utcnow().isoformat()
-
-        # Save back to DynamoDB
-        table.put_item(Item=memories)
+        put_new_entry(table, user_id, entry_key(MEMORY_PREFIX, new_memory['id']), new_memory)
 
         return jsonify({"success": True, "message": "Memory added successfully"}), 200
 
@@ -217,14 +531,10 @@ def add_context(user_id):
         if not context_type or not context_value:
             return jsonify({"error": "context_type and context_value are required"}), 400
 
+        if context_type not in CONTEXT_PREFIXES:
+            return jsonify({"error": "Invalid context_type. Must be 'life_event' or 'goal'"}), 400
+
         table = get_memories_table()
-        
-        # Get existing memories
-        response = table.get_item(Key={'user_id': user_id})
-        if 'Item' not in response:
-            memories = get_default_user_memories(user_id)
-        else:
-            memories = response['Item']
 
         # Add new context item
         new_context = {
@@ -234,18 +544,7 @@ def add_context(user_id):
             'source': source,
             'created_at': datetime.utcnow().isoformat()
         }
-        
-        if context_type == 'life_event':
-            memories['personal_context']['life_events'].append(new_context)
-        elif context_type == 'goal':
-            memories['personal_context']['goals'].append(new_context)
-        else:
-            return jsonify({"error": "Invalid context_type. Must be 'life_event' or 'goal'"}), 400
-
-        memories['last_updated'] = datetime.utcnow().isoformat()
-
-        # Save back to DynamoDB
-        table.put_item(Item=memories)
+        put_new_entry(table, user_id, entry_key(CONTEXT_PREFIXES[context_type], new_context['id']), new_context)
 
         return jsonify({"success": True, "message": "Context added successfully"}), 200
 
@@ -268,27 +567,19 @@ def cleanup_memories(user_id):
 
         table = get_memories_table()
         
-        # Get existing memories
-        response = table.get_item(Key={'user_id': user_id})
-        if 'Item' not in response:
+        # Only the memory entries are needed
+        memory_items = query_entries(table, user_id, MEMORY_PREFIX)
+        if not memory_items:
             return jsonify({"success": True, "message": "No memories to cleanup"}), 200
-
-        memories = response['Item']
         cutoff_date = datetime.utcnow() - timedelta(days=days_to_keep)
         
-        # Clean up old, low-importance memories
-        original_count = len(memories['memories'])
-        memories['memories'] = [
-            memory for memory in memories['memories']
-            if (memory['importance'] == 'high' or 
-                datetime.fromisoformat(memory['created_at'].replace('Z', '+00:00')) > cutoff_date)
-        ]
-        
-        cleaned_count = original_count - len(memories['memories'])
-        memories['last_updated'] = datetime.utcnow().isoformat()
-
-        # Save back to DynamoDB
-        table.put_item(Item=memories)
+        # Clean up old, low-importance memories; a memory edited meanwhile is re-checked, not lost
+        cleaned_count = sum(
+            1 for memory in memory_items
+            if is_expired_memory(memory, cutoff_date) and delete_expired_memory(table, memory, cutoff_date)
+        )
+        if cleaned_count:
+            touch_profile(table, user_id)
 
         return jsonify({
             "success": True, 
@@ -305,27 +596,18 @@ def cleanup_memories(user_id):
 def update_memory(user_id, memory_id):
     """Update a memory item"""
     try:
+        # Validate that the user can only access their own data
+        if not validate_user_access(user_id):
+            return jsonify({"error": "Access denied: You can only modify your own memories"}), 403
+
         data = request.get_json()
         
         table = get_memories_table()
-        response = table.get_item(Key={'user_id': user_id})
-        
-        if 'Item' not in response:
-            return jsonify({"error": "User memories not found"}), 404
+        memory = update_entry(table, user_id, entry_key(MEMORY_PREFIX, memory_id), data)
+        if memory is None:
+            return jsonify({"error": "Memory not found"}), 404
 
-        memories = response['Item']
-        
-        # Find and update memory
-        for i, memory in enumerate(memories['memories']):
-            if memory['id'] == memory_id:
-                memories['memories'][i].update(data)
-                memories['memories'][i]['updated_at'] = datetime.utcnow().isoformat()
-                memories['last_updated'] = datetime.utcnow().isoformat()
-                
-                table.put_item(Item=memories)
-                return jsonify({"success": True, "message": "Memory updated successfully"}), 200
-        
-        return jsonify({"error": "Memory not found"}), 404
+        return jsonify({"success": True, "message": "Memory updated successfully", "memory": memory}), 200
 
     except Exception as e:
         return jsonify({"error": f"Failed to update memory: {str(e)}"}), 500
@@ -337,23 +619,13 @@ def update_memory(user_id, memory_id):
 def delete_memory(user_id, memory_id):
     """Delete a memory item"""
     try:
-        table = get_memories_table()
-        response = table.get_item(Key={'user_id': user_id})
-        
-        if 'Item' not in response:
-            return jsonify({"error": "User memories not found"}), 404
+        # Validate that the user can only access their own data
+        if not validate_user_access(user_id):
+            return jsonify({"error": "Access denied: You can only modify your own memories"}), 403
 
-        memories = response['Item']
-        
-        # Find and remove memory
-        original_count = len(memories['memories'])
-        memories['memories'] = [memory for memory in memories['memories'] if memory['id'] != memory_id]
-        
-        if len(memories['memories']) == original_count:
+        table = get_memories_table()
+        if not delete_entry(table, user_id, entry_key(MEMORY_PREFIX, memory_id)):
             return jsonify({"error": "Memory not found"}), 404
-            
-        memories['last_updated'] = datetime.utcnow().isoformat()
-        table.put_item(Item=memories)
 
         return jsonify({"success": True, "message": "Memory deleted successfully"}), 200
 
@@ -367,27 +639,18 @@ def delete_memory(user_id, memory_id):
 def update_trait(user_id, trait_type):
     """Update a trait"""
     try:
+        # Validate that the user can only access their own data
+        if not validate_user_access(user_id):
+            return jsonify({"error": "Access denied: You can only modify your own memories"}), 403
+
         data = request.get_json()
         
         table = get_memories_table()
-        response = table.get_item(Key={'user_id': user_id})
-        
-        if 'Item' not in response:
-            return jsonify({"error": "User memories not found"}), 404
-
-        memories = response['Item']
-        
-        if trait_type not in memories['traits']:
+        trait = update_entry(table, user_id, entry_key(TRAIT_PREFIX, trait_type), data)
+        if trait is None:
             return jsonify({"error": "Trait not found"}), 404
 
-        # Update trait
-        memories['traits'][trait_type].update(data)
-        memories['traits'][trait_type]['updated_at'] = datetime.utcnow().isoformat()
-        memories['last_updated'] = datetime.utcnow().isoformat()
-        
-        table.put_item(Item=memories)
-
-        return jsonify({"success": True, "message": "Trait updated successfully"}), 200
+        return jsonify({"success": True, "message": "Trait updated successfully", "trait": trait}), 200
 
     except Exception as e:
         return jsonify({"error": f"Failed to update trait: {str(e)}"}), 500
@@ -399,22 +662,14 @@ def update_trait(user_id, trait_type):
 def delete_trait(user_id, trait_type):
     """Delete a trait"""
     try:
-        table = get_memories_table()
-        response = table.get_item(Key={'user_id': user_id})
-        
-        if 'Item' not in response:
-            return jsonify({"error": "User memories not found"}), 404
+        # Validate that the user can only access their own data
+        if not validate_user_access(user_id):
+            return jsonify({"error": "Access denied: You can only modify your own memories"}), 403
 
-        memories = response['Item']
-        
-        if trait_type not in memories['traits']:
+        table = get_memories_table()
+        if not delete_entry(table, user_id, entry_key(TRAIT_PREFIX, trait_type)):
             return jsonify({"error": "Trait not found"}), 404
 
-        del memories['traits'][trait_type]
-        memories['last_updated'] = datetime.utcnow().isoformat()
-        
-        table.put_item(Item=memories)
-
         return jsonify({"success": True, "message": "Trait deleted successfully"}), 200
 
     except Exception as e:
@@ -427,35 +682,18 @@ def delete_trait(user_id, trait_type):
 def update_context(user_id, context_id):
     """Update personal context"""
     try:
+        # Validate that the user can only access their own data
+        if not validate_user_access(user_id):
+            return jsonify({"error": "Access denied: You can only modify your own memories"}), 403
+
         data = request.get_json()
         
         table = get_memories_table()
-        response = table.get_item(Key={'user_id': user_id})
-        
-        if 'Item' not in response:
-            return jsonify({"error": "User memories not found"}), 404
-
-        memories = response['Item']
-        
-        # Find and update context in life_events
-        for i, event in enumerate(memories['personal_context']['life_events']):
-            if event['id'] == context_id:
-                memories['personal_context']['life_events'][i].update(data)
-                memories['personal_context']['life_events'][i]['updated_at'] = datetime.utcnow().isoformat()
-                memories['last_updated'] = datetime.utcnow().isoformat()
-                
-                table.put_item(Item=memories)
-                return jsonify({"success": True, "message": "Context updated successfully"}), 200
-        
-        # Find and update context in goals
-        for i, goal in enumerate(memories['personal_context']['goals']):
-            if goal['id'] == context_id:
-                memories['personal_context']['goals'][i].update(data)
-                memories['personal_context']['goals'][i]['updated_at'] = datetime.utcnow().isoformat()
-                memories['last_updated'] = datetime.utcnow().isoformat()
-                
-                table.put_item(Item=memories)
-                return jsonify({"success": True, "message": "Context updated successfully"}), 200
+        # The id does not say whether it is a life event or a goal
+        for prefix in CONTEXT_PREFIXES.values():
+            context = update_entry(table, user_id, entry_key(prefix, context_id), data)
+            if context is not None:
+                return jsonify({"success": True, "message": "Context updated successfully", "context": context}), 200
         
         return jsonify({"error": "Context not found"}), 404
 
@@ -469,37 +707,15 @@ def update_context(user_id, context_id):
 def delete_context(user_id, context_id):
     """Delete personal context"""
     try:
-        table = get_memories_table()
-        response = table.get_item(Key={'user_id': user_id})
-        
-        if 'Item' not in response:
-            return jsonify({"error": "User memories not found"}), 404
+        # Validate that the user can only access their own data
+        if not validate_user_access(user_id):
+            return jsonify({"error": "Access denied: You can only modify your own memories"}), 403
 
-        memories = response['Item']
-        
-        # Find and remove from life_events
-        original_count = len(memories['personal_context']['life_events'])
-        memories['personal_context']['life_events'] = [
-            event for event in memories['personal_context']['life_events'] 
-            if event['id'] != context_id
-        ]
-        
-        if len(memories['personal_context']['life_events']) < original_count:
-            memories['last_updated'] = datetime.utcnow().isoformat()
-            table.put_item(Item=memories)
-            return jsonify({"success": True, "message": "Context deleted successfully"}), 200
-        
-        # Find and remove from goals
-        original_count = len(memories['personal_context']['goals'])
-        memories['personal_context']['goals'] = [
-            goal for goal in memories['personal_context']['goals'] 
-            if goal['id'] != context_id
-        ]
-        
-        if len(memories['personal_context']['goals']) < original_count:
-            memories['last_updated'] = datetime.utcnow().isoformat()
-            table.put_item(Item=memories)
-            return jsonify({"success": True, "message": "Context deleted successfully"}), 200
+        table = get_memories_table()
+        # The id does not say whether it is a life event or a goal
+        for prefix in CONTEXT_PREFIXES.values():
+            if delete_entry(table, user_id, entry_key(prefix, context_id)):
+                return jsonify({"success": True, "message": "Context deleted successfully"}), 200
         
         return jsonify({"error": "Context not found"}), 404
 
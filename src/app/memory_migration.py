@@ -0,0 +1,95 @@
+import os
+import uuid
+import click
+import boto3
+from .memories import (
+    memories_table_name, profile_key, entry_key,
+    TRAIT_PREFIX, MEMORY_PREFIX, LIFE_EVENT_PREFIX, GOAL_PREFIX
+)
+
+# Single-item-per-user table the per-entry layout replaces
+legacy_memories_table_name = os.getenv('LEGACY_MEMORIES_TABLE_NAME', 'dream-companion-memories')
+
+def split_user_memories(document: dict) -> list:
+    """Per-entry items (profile, traits, memories, life events, goals) for one legacy memories document"""
+    user_id = document['user_id']
+    items = [{
+        **profile_key(user_id),
+        **{field: document[field] for field in ('dream_patterns', 'created_at', 'last_updated') if field in document}
+    }]
+
+    for trait_type, trait in document.get('traits', {}).items():
+        items.append({'user_id': user_id, 'entry_key': entry_key(TRAIT_PREFIX, trait_type), **trait})
+
+    personal_context = document.get('personal_context', {})
+    for prefix, entries in (
+        (MEMORY_PREFIX, document.get('memories', [])),
+        (LIFE_EVENT_PREFIX, personal_context.get('life_events', [])),
+        (GOAL_PREFIX, personal_context.get('goals', []))
+    ):
+        for entry in entries:
+            entry = {**entry, 'id': entry.get('id') or str(uuid.uuid4())}
+            items.append({'user_id': user_id, 'entry_key': entry_key(prefix, entry['id']), **entry})
+
+    return items
+
+def migrate_user(target_table, document: dict) -> int:
+    """Write one user's per-entry items unless the user is already in the target; returns items written.
+
+    The profile item is written last, so its presence marks a user whose
+    migration finished (or who has used the per-entry table since cutover,
+    which always writes the profile). Such users are skipped: copying the
+    snapshot again would undo edits and bring back deleted entries. Entries
+    are written with attribute_not_exists so a live write racing the copy
+    always wins.
+    """
+    profile, *entries = split_user_memories(document)
+    if 'Item' in target_table.get_item(Key=profile_key(document['user_id']), ConsistentRead=True):
+        return 0
+
+    written = 0
+    for item in entries + [profile]:
+        try:
+            target_table.put_item(Item=item, ConditionExpression='attribute_not_exists(entry_key)')
+            written += 1
+        except target_table.meta.client.exceptions.ConditionalCheckFailedException:
+            pass
+    return written
+
+def migrate_memories(dynamodb=None, source: str = None, target: str = None) -> dict:
+    """Copy every legacy memories document into per-entry items.
+
+    Safe to re-run, including after cutover: users already present in the
+    target are skipped and existing entries are never overwritten (see
+    migrate_user). Returns counts of users migrated, users skipped and items
+    written.
+    """
+    dynamodb = dynamodb or boto3.resource('dynamodb')
+    source_table = dynamodb.Table(source or legacy_memories_table_name)
+    target_table = dynamodb.Table(target or memories_table_name)
+    counts = {'users': 0, 'skipped': 0, 'items': 0}
+
+    scan_kwargs = {}
+    while True:
+        response = source_table.scan(**scan_kwargs)
+        for document in response.get('Items', []):
+            written = migrate_user(target_table, document)
+            if written:
+                counts['users'] += 1
+                counts['items'] += written
+            else:
+                counts['skipped'] += 1
+
+        if 'LastEvaluatedKey' not in response:
+            break
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+    return counts
+
+@click.command('migrate-memories')
+@click.option('--source', default=None, help="Legacy memories table (default: LEGACY_MEMORIES_TABLE_NAME)")
+@click.option('--target', default=None, help="Per-entry memories table (default: MEMORIES_TABLE_NAME)")
+def migrate_memories_command(source, target):
+    """Split legacy memories documents into per-entry items."""
+    counts = migrate_memories(source=source, target=target)
+    click.echo(f"Migrated {counts['users']} users ({counts['items']} items), skipped {counts['skipped']} already migrated")
@@ -2,9 +2,15 @@ from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
 import boto3
 import os
+import base64
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
-from .auth import require_cognito_auth, get_cognito_user_info
+from .auth import require_cognito_auth, get_cognito_user_info, get_auth_context, normalize_phone_number
 
 premium_bp = Blueprint('premium_bp', __name__)
 
@@ -19,32 +25,50 @@ def handle_premium_options(proxy):
 dynamodb = boto3.resource('dynamodb')
 premium_table_name = os.getenv('PREMIUM_TABLE_NAME', 'dream-companion-premium-users')
 
+# Entitlements only change when a subscription webhook fires, so
+# is_premium_user answers are kept per normalised phone for a short TTL.
+# The webhooks are applied by a separate worker (StripeEventsFunction), so
+# nothing invalidates the API containers' caches: a change shows once the
+# cached answer expires. Negative answers are therefore kept only briefly,
+# so a user who has just paid is let in almost at once. Positive answers are
+# kept for a minute on purpose: a cancelled subscription usually ends with
+# the paid period anyway, so at most a minute's extra access is an accepted
+# cost for skipping the premium read on nearly every premium request.
+ENTITLEMENT_CACHE_TTL = int(os.getenv('ENTITLEMENT_CACHE_TTL', '60'))
+ENTITLEMENT_NEGATIVE_CACHE_TTL = int(os.getenv('ENTITLEMENT_NEGATIVE_CACHE_TTL', '5'))
+ENTITLEMENT_CACHE_SIZE = int(os.getenv('ENTITLEMENT_CACHE_SIZE', '4096'))
+_entitlement_cache = OrderedDict()
+_entitlement_cache_lock = threading.Lock()
+
+# Every feature a subscription can grant; a feature's position is its bit in
+# the entitlement token's feature mask, so only append to this list
+PREMIUM_FEATURES = [
+    'basic_dream_storage',
+    'basic_interpretations',
+    'advanced_dream_analysis',
+    'psychological_patterns',
+    'dream_archetypes',
+    'historical_trends',
+    'personalized_reports'
+]
+
+# Signed entitlement tokens let require_premium skip the premium table: the
+# subscription status endpoint issues one to a premium caller, and the client
+# sends it back as X-Entitlement-Token. Disabled when no secret is set.
+ENTITLEMENT_TOKEN_SECRET = os.getenv('ENTITLEMENT_TOKEN_SECRET', '')
+ENTITLEMENT_TOKEN_TTL = int(os.getenv('ENTITLEMENT_TOKEN_TTL', '900'))
+ENTITLEMENT_TOKEN_HEADER = 'X-Entitlement-Token'
+
+# Table handle resolved once per process; the table itself is provisioned by
+# `flask bootstrap` (see bootstrap.py), not from the request path
+_premium_table = None
+
 def get_premium_table():
-    """Get or create the premium users table"""
-    try:
-        table = dynamodb.Table(premium_table_name)
-        table.load()
-        return table
-    except:
-        # Create table if it doesn't exist
-        table = dynamodb.create_table(
-            TableName=premium_table_name,
-            KeySchema=[
-                {
-                    'AttributeName': 'phone_number',
-                    'KeyType': 'HASH'
-                }
-            ],
-            AttributeDefinitions=[
-                {
-                    'AttributeName': 'phone_number',
-                    'AttributeType': 'S'
-                }
-            ],
-            BillingMode='PAY_PER_REQUEST'
-        )
-        table.wait_until_exists()
-        return table
+    """Get the premium users table"""
+    global _premium_table
+    if _premium_table is None:
+        _premium_table = dynamodb.Table(premium_table_name)
+    return _premium_table
 
 def require_premium(f):
     """Decorator to require premium subscription for protected routes"""
@@ -55,21 +79,32 @@ def require_premium(f):
         if not auth_header or not auth_header.startswith('Bearer '):
             return jsonify({"error": "Missing or invalid authorization header"}), 401
 
-        # Get user info from Cognito token
-        user_info = get_cognito_user_info()
-        if not user_info:
-            return jsonify({"error": "Invalid authentication token"}), 401
+        # Reuse the caller resolved by require_cognito_auth; routes without it
+        # fall back to reading the user info from the token
+        context = get_auth_context()
+        if context:
+            phone_number = context.phone_number
+        else:
+            user_info = get_cognito_user_info()
+            if not user_info:
+                return jsonify({"error": "Invalid authentication token"}), 401
+            phone_number = normalize_phone_number(user_info.get('phone_number'))
 
         # Get user phone number from Cognito user info or request args
-        phone_number = user_info.get('phone_number') or request.view_args.get('phone_number')
+        if not phone_number:
+            phone_number = normalize_phone_number(request.view_args.get('phone_number'))
         if not phone_number:
             return jsonify({"error": "Phone number required"}), 400
 
-        # Clean phone number (remove + if present)
-        phone_number = phone_number.replace('+', '')
-
-        # Check if user has premium access
-        if not is_premium_user(phone_number):
+        # Check if user has premium access, trusting a valid entitlement token
+        # for the caller before asking DynamoDB
+        if verify_entitlement_token(request.headers.get(ENTITLEMENT_TOKEN_HEADER), phone_number):
+            has_premium = True
+        elif context and phone_number == context.phone_number:
+            has_premium = context.has_premium()
+        else:
+            has_premium = is_premium_user(phone_number)
+        if not has_premium:
             return jsonify({
                 "error": "Premium subscription required",
                 "message": "This feature requires a premium subscription. Please upgrade to access advanced dream analysis.",
@@ -79,26 +114,132 @@ def require_premium(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def get_cached_entitlement(phone_number: str):
+    """Cached premium answer for a normalised phone number, or None"""
+    with _entitlement_cache_lock:
+        entry = _entitlement_cache.get(phone_number)
+        if entry is None:
+            return None
+        if time.time() >= entry['expires_at']:
+            del _entitlement_cache[phone_number]
+            return None
+        return entry['premium']
+
+def cache_entitlement(phone_number: str, premium: bool, ttl: float):
+    """Remember a premium answer for ttl seconds"""
+    with _entitlement_cache_lock:
+        _entitlement_cache[phone_number] = {'premium': premium, 'expires_at': time.time() + ttl}
+        _entitlement_cache.move_to_end(phone_number)
+        while len(_entitlement_cache) > ENTITLEMENT_CACHE_SIZE:
+            _entitlement_cache.popitem(last=False)
+
+def invalidate_entitlement(phone_number: str):
+    """Forget this process's cached premium answer after this process changed the user's subscription.
+
+    Other processes only see the change once their cached answer expires.
+    """
+    with _entitlement_cache_lock:
+        _entitlement_cache.pop(normalize_phone_number(phone_number), None)
+
+def clear_entitlement_cache():
+    """Forget every cached premium answer"""
+    with _entitlement_cache_lock:
+        _entitlement_cache.clear()
+
+def feature_bitmask(features: list) -> int:
+    """Encode known features as a bitmask over PREMIUM_FEATURES"""
+    mask = 0
+    for feature in features or []:
+        if feature in PREMIUM_FEATURES:
+            mask |= 1 << PREMIUM_FEATURES.index(feature)
+    return mask
+
+def features_from_bitmask(mask: int) -> list:
+    """Decode a feature bitmask back into feature names"""
+    return [feature for index, feature in enumerate(PREMIUM_FEATURES) if mask & (1 << index)]
+
+def _sign_entitlement(payload: bytes) -> bytes:
+    return hmac.new(ENTITLEMENT_TOKEN_SECRET.encode('utf-8'), payload, hashlib.sha256).digest()
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+def issue_entitlement_token(phone_number: str, subscription_type: str, features: list, subscription_end: str):
+    """Sign a short-lived entitlement for a premium user, or None when tokens are disabled.
+
+    The token is an HMAC-SHA256 over phone|tier|feature mask|expiry and never
+    outlives the subscription itself.
+    """
+    if not ENTITLEMENT_TOKEN_SECRET:
+        return None
+
+    expires_at = int(time.time()) + ENTITLEMENT_TOKEN_TTL
+    if subscription_end:
+        expires_at = min(expires_at, int((datetime.fromisoformat(subscription_end) - datetime(1970, 1, 1)).total_seconds()))
+
+    payload = '|'.join([
+        normalize_phone_number(phone_number), subscription_type or 'premium', format(feature_bitmask(features), 'x'), str(expires_at)
+    ]).encode('utf-8')
+    return f"{_b64encode(payload)}.{_b64encode(_sign_entitlement(payload))}"
+
+def verify_entitlement_token(token: str, phone_number: str):
+    """Claims of a valid, unexpired entitlement token issued for phone_number, or None"""
+    if not token or not ENTITLEMENT_TOKEN_SECRET:
+        return None
+
+    try:
+        encoded_payload, encoded_signature = token.split('.')
+        payload = _b64decode(encoded_payload)
+        if not hmac.compare_digest(_b64decode(encoded_signature), _sign_entitlement(payload)):
+            return None
+
+        token_phone, subscription_type, mask, expires_at = payload.decode('utf-8').split('|')
+        if token_phone != normalize_phone_number(phone_number) or int(expires_at) <= time.time():
+            return None
+
+        return {
+            'phone_number': token_phone,
+            'subscription_type': subscription_type,
+            'features': features_from_bitmask(int(mask, 16)),
+            'expires_at': int(expires_at)
+        }
+    except (ValueError, UnicodeDecodeError):
+        return None
+
 def is_premium_user(phone_number: str) -> bool:
     """Check if a user has an active premium subscription"""
+    # Clean phone number (remove + if present)
+    phone_number = normalize_phone_number(phone_number)
+
+    cached = get_cached_entitlement(phone_number)
+    if cached is not None:
+        return cached
+
     try:
-        # Clean phone number (remove + if present)
-        phone_number = phone_number.replace('+', '')
-        
         table = get_premium_table()
         response = table.get_item(Key={'phone_number': phone_number})
-
-        if 'Item' not in response:
-            return False
-
-        user_data = response['Item']
-        subscription_end = datetime.fromisoformat(user_data['subscription_end'])
-
-        return datetime.utcnow() < subscription_end
+        return record_premium_item(phone_number, response.get('Item'))
     except Exception as e:
         print(f"Error checking premium status: {e}")
         return False
 
+def record_premium_item(phone_number: str, user_data) -> bool:
+    """Derive a user's premium answer from their premium table item (None if absent) and cache it"""
+    if user_data is None:
+        cache_entitlement(phone_number, False, ENTITLEMENT_NEGATIVE_CACHE_TTL)
+        return False
+
+    subscription_end = datetime.fromisoformat(user_data['subscription_end'])
+    remaining = (subscription_end - datetime.utcnow()).total_seconds()
+
+    # An active subscription is never cached past its end
+    premium = remaining > 0
+    cache_entitlement(phone_number, premium, min(ENTITLEMENT_CACHE_TTL, remaining) if premium else ENTITLEMENT_NEGATIVE_CACHE_TTL)
+    return premium
+
 def check_premium_access(phone_number: str) -> dict:
     """Check premium access and return detailed status information"""
     try:
@@ -129,15 +270,7 @@ def check_premium_access(phone_number: str) -> dict:
             'subscription_type': user_data.get('subscription_type', 'premium'),
             'subscription_end': user_data['subscription_end'],
             'days_remaining': days_remaining,
-            'features': user_data.get('features', [
-                'basic_dream_storage',
-                'basic_interpretations',
-                'advanced_dream_analysis',
-                'psychological_patterns',
-                'dream_archetypes',
-                'historical_trends',
-                'personalized_reports'
-            ]) if has_premium else ['basic_dream_storage', 'basic_interpretations']
+            'features': user_data.get('features', list(PREMIUM_FEATURES)) if has_premium else ['basic_dream_storage', 'basic_interpretations']
         }
     except Exception as e:
         print(f"Error checking premium access: {e}")
@@ -156,14 +289,25 @@ def get_subscription_status(phone_number):
     """Get the current subscription status for a user"""
     try:
         premium_status = check_premium_access(phone_number)
-
-        return jsonify({
+        status = {
             'has_premium': premium_status['has_premium'],
             'subscription_type': premium_status['subscription_type'],
             'subscription_end': premium_status['subscription_end'],
             'days_remaining': premium_status['days_remaining'],
             'features': premium_status['features']
-        }), 200
+        }
+
+        # Premium callers asking about themselves get a signed entitlement to
+        # send with premium requests
+        context = get_auth_context()
+        if premium_status['has_premium'] and context and context.phone_number == normalize_phone_number(phone_number):
+            entitlement_token = issue_entitlement_token(
+                phone_number, premium_status['subscription_type'], premium_status['features'], premium_status['subscription_end']
+            )
+            if entitlement_token:
+                status['entitlement_token'] = entitlement_token
+
+        return jsonify(status), 200
 
     except Exception as e:
         return jsonify({"error": f"Failed to get subscription status: {str(e)}"}), 500
@@ -201,6 +345,7 @@ def create_subscription():
                 'personalized_reports'
             ]
         })
+        invalidate_entitlement(phone_number)
 
         return jsonify({
             "message": "Subscription created successfully",
@@ -220,6 +365,7 @@ def cancel_subscription(phone_number):
         
         table = get_premium_table()
         table.delete_item(Key={'phone_number': phone_number})
+        invalidate_entitlement(phone_number)
 
         return jsonify({"message": "Subscription cancelled successfully"}), 200
 
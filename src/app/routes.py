@@ -8,6 +8,7 @@ import urllib.parse
 from datetime import datetime
 from dotenv import load_dotenv
 from .auth import require_cognito_auth, get_cognito_user_info
+from .dream_store import get_dream_manifest, list_dream_page, fetch_concurrently, get_shared_s3_client
 
 load_dotenv()
 
@@ -16,6 +17,7 @@ routes_bp = Blueprint('routes_bp', __name__)
 # Constants
 S3_BUCKET_NAME = os.getenv('S3_BUCKET_NAME')
 FRONTEND_ORIGIN = 'https://clarasdreamguide.com'
+MAX_BATCH_DREAMS = 100
 
 # Use the new Cognito authentication decorator
 require_auth = require_cognito_auth
@@ -31,7 +33,7 @@ def add_cors_headers(response):
 # Initialize S3 client
 def get_s3_client():
     """Get S3 client - can be mocked for testing"""
-    return boto3.client('s3')
+    return get_shared_s3_client()
 
 @routes_bp.route('/', methods=['GET'])
 @cross_origin(supports_credentials=True)
@@ -218,7 +220,13 @@ def get_themes(phone_number):
 @require_auth
 @cross_origin(supports_credentials=True)
 def get_dreams(phone_number):
-    """Retrieve paginated list of dreams for a specific phone number"""
+    """Retrieve paginated list of dreams for a specific phone number.
+
+    By default pages (limit/offset) come from the manifest, newest first.
+    With ?cursor= pages are streamed from S3 in key order instead (new path,
+    then legacy root), which is not chronological; the cursor is bound to the
+    phone number it was issued for.
+    """
     try:
         if not S3_BUCKET_NAME:
             return jsonify({"error": "S3 bucket not configured"}), 500
@@ -226,126 +234,121 @@ def get_dreams(phone_number):
         # Get pagination parameters
         limit = request.args.get('limit', default=10, type=int)
         offset = request.args.get('offset', default=0, type=int)
+        refresh = request.args.get('refresh', default='false').lower() == 'true'
 
-        # List all objects in the user's S3 directory
         s3_client = get_s3_client()
-        
-        # Get dreams from new path structure (s3/user/dreams/)
-        new_response = s3_client.list_objects_v2(
-            Bucket=S3_BUCKET_NAME,
-            Prefix=f'{phone_number}/dreams/'
-        )
-        
-        # Get dreams from old path structure for backwards compatibility
-        old_response = s3_client.list_objects_v2(
-            Bucket=S3_BUCKET_NAME,
-            Prefix=f'{phone_number}/'
-        )
-        
-        # Debug logging to see what we found
-        new_count = len(new_response.get('Contents', []))
-        old_count = len(old_response.get('Contents', []))
-        print(f"DEBUG: Found {new_count} objects in new path ({phone_number}/dreams/)")
-        print(f"DEBUG: Found {old_count} objects in old path ({phone_number}/)")
-        
-        # Log some sample keys from each path
-        if new_response.get('Contents'):
-            print(f"DEBUG: Sample new path keys: {[obj['Key'] for obj in new_response['Contents'][:3]]}")
-        if old_response.get('Contents'):
-            print(f"DEBUG: Sample old path keys: {[obj['Key'] for obj in old_response['Contents'][:3]]}")
-        
-        # Combine dreams from both locations, avoiding duplicates
-        all_contents = []
-        seen_keys = set()
-        
-        # Add dreams from new path
-        if 'Contents' in new_response:
-            for obj in new_response['Contents']:
-                key = obj['Key']
-                if key not in seen_keys:
-                    all_contents.append(obj)
-                    seen_keys.add(key)
-        
-        # Add dreams from old path (only root-level dreams, not subdirectories)
-        if 'Contents' in old_response:
-            for obj in old_response['Contents']:
-                key = obj['Key']
-                # Only include root-level dreams (not in subdirectories) and not metadata/themes
-                if (key not in seen_keys and 
-                    not key.endswith('metadata.json') and 
-                    not key.endswith('metadata') and 
-                    not key.endswith('themes.txt') and
-                    not key.startswith(f'{phone_number}/dreams/')):
-                    all_contents.append(obj)
-                    seen_keys.add(key)
-        
-        # Create a mock response object with combined contents
-        response = {'Contents': all_contents}
-        print(f"DEBUG: Combined total objects: {len(all_contents)}")
-        print(f"DEBUG: Sample combined keys: {[obj['Key'] for obj in all_contents[:5]]}")
-
-        if 'Contents' in response:
-            # Filter out metadata and themes files, sort by S3 LastModified (newest first)
-            # 
-            # IMPORTANT: Due to a backfill script that modified all dreams recently, S3 LastModified 
-            # timestamps reflect the backfill date, not the original creation dates. 
-            # 
-            # SOLUTION: A new backfill will be run to restore chronological order by updating
-            # S3 LastModified timestamps to match the original creation dates from the dream content.
-            # This approach is much more efficient than runtime fetching and avoids Lambda timeout issues.
-            # 
-            # Current approach uses S3 LastModified for sorting (efficient and reliable).
-            # After the chronological backfill, dreams will be displayed in correct order.
-            #
-            dream_keys = []
-            for obj in response['Contents']:
-                key = obj['Key']
-                if not key.endswith('metadata.json') and not key.endswith('metadata') and not key.endswith('themes.txt'):
-                    dream_keys.append({
-                        'key': key,
-                        'lastModified': obj['LastModified']
-                    })
-
-            # Sort by S3 LastModified (newest first) - efficient and reliable
-            dream_keys.sort(key=lambda x: x['lastModified'], reverse=True)
-            print(f"DEBUG: Using S3 LastModified for sorting (backfill-aware, efficient approach)")
-
-            # Apply pagination
-            total_dreams = len(dream_keys)
-            paginated_dreams = dream_keys[offset:offset + limit]
-
-            dream_keys = [{'key': dream['key']} for dream in paginated_dreams]
-            print(f"DEBUG: Returning {len(dream_keys)} dreams for user {phone_number}")
-            print(f"DEBUG: Total dreams available: {total_dreams}")
-            print(f"DEBUG: Pagination: offset={offset}, limit={limit}")
-            
-            # Show first few and last few dreams to see the range
-            if len(paginated_dreams) > 0:
-                print(f"DEBUG: First dream modified: {paginated_dreams[0]['lastModified']}")
-                if len(paginated_dreams) > 1:
-                    print(f"DEBUG: Last dream modified: {paginated_dreams[-1]['lastModified']}")
-            
-            for i, dream in enumerate(paginated_dreams):
-                print(f"DEBUG: Dream {i+1}: {dream['key']} (modified: {dream['lastModified']})")
-            
-            return jsonify({
-                'dreams': dream_keys,
-                'total': total_dreams,
-                'limit': limit,
-                'offset': offset,
-                'hasMore': offset + limit < total_dreams
-            }), 200
-        else:
+
+        # Cursor mode streams pages straight from S3 (key order, not newest
+        # first) so clients can walk arbitrarily large histories one page at a time
+        if 'cursor' in request.args:
+            try:
+                objects, next_cursor = list_dream_page(
+                    s3_client, S3_BUCKET_NAME, phone_number, max(limit, 1), request.args.get('cursor')
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+
             return jsonify({
-                'dreams': [],
-                'total': 0,
+                'dreams': [{'key': obj['Key']} for obj in objects],
                 'limit': limit,
-                'offset': offset,
-                'hasMore': False
+                'nextCursor': next_cursor,
+                'hasMore': next_cursor is not None
             }), 200
+
+        # Serve the listing from the user's manifest (one GET) instead of
+        # listing S3; it is rebuilt when missing, stale or explicitly refreshed.
+        #
+        # Manifest entries are sorted by S3 LastModified (newest first). A
+        # chronological backfill aligned LastModified with the original dream
+        # creation dates, so this matches the order dreams were recorded.
+        manifest = get_dream_manifest(s3_client, S3_BUCKET_NAME, phone_number, refresh=refresh)
+
+        entries = manifest['dreams']
+        total_dreams = len(entries)
+        paginated_dreams = entries[offset:offset + limit]
+
+        dream_keys = [{'key': dream['key']} for dream in paginated_dreams]
+        print(f"DEBUG: Returning {len(dream_keys)} of {total_dreams} dreams for user {phone_number} (offset={offset}, limit={limit})")
+
+        return jsonify({
+            'dreams': dream_keys,
+            'total': total_dreams,
+            'limit': limit,
+            'offset': offset,
+            'hasMore': offset + limit < total_dreams
+        }), 200
     except Exception as e:
         return jsonify({"error": f"Failed to retrieve dreams: {str(e)}"}), 500
 
+def is_valid_dream_id(dream_id):
+    """Check that a dream id names a dream document, not a nested or internal key like _index/manifest"""
+    return bool(dream_id) and '/' not in dream_id and not dream_id.startswith('_')
+
+def load_dream(s3_client, phone_number, dream_id):
+    """Load a raw dream document, trying the new path before the legacy one"""
+    # Try new path structure first (s3/user/dreams/)
+    key = f'{phone_number}/dreams/{dream_id}.json'
+    try:
+        response = s3_client.get_object(
+            Bucket=S3_BUCKET_NAME,
+            Key=key
+        )
+    except s3_client.exceptions.NoSuchKey:
+        # Fallback to old path structure for backwards compatibility
+        key = f'{phone_number}/{dream_id}.json'
+        response = s3_client.get_object(
+            Bucket=S3_BUCKET_NAME,
+            Key=key
+        )
+
+    return json.loads(response['Body'].read().decode('utf-8'))
+
+def normalize_dream(dream_content, dream_id):
+    """Map a raw dream document onto the fields the frontend expects"""
+    # Handle response field safely - check multiple possible field names
+    response_text = ""
+    analysis_fields = ["response", "analysis", "interpretation", "ai_response", "dream_analysis", "insights"]
+
+    for field in analysis_fields:
+        if field in dream_content and dream_content[field]:
+            if isinstance(dream_content[field], list):
+                response_text = " ".join(dream_content[field])
+            else:
+                response_text = str(dream_content[field])
+            break  # Use the first non-empty field found
+
+    # Handle createdAt field - it might be missing or have different names
+    created_at = dream_content.get("createdAt") or dream_content.get("created_at") or dream_content.get("timestamp")
+    if not created_at:
+        # Fallback to current time if no creation date is found
+        created_at = datetime.utcnow().isoformat()
+
+    # Handle dream content field - it might have different names
+    dream_content_text = (
+        dream_content.get("dreamContent") or 
+        dream_content.get("dream_content") or 
+        dream_content.get("content") or 
+        dream_content.get("text") or 
+        dream_content.get("dream") or
+        dream_content.get("raw_text") or  # Add raw_text field
+        ""
+    )
+
+    # Try to decode URL encoding, but handle cases where it's not encoded
+    try:
+        decoded_content = urllib.parse.unquote_plus(dream_content_text)
+    except Exception as e:
+        print(f"DEBUG: URL decode failed: {e}, using original content")
+        decoded_content = dream_content_text
+
+    return {
+        "id": dream_content.get("id", dream_id),
+        "response": response_text,
+        "dream_content": decoded_content,
+        "summary": dream_content.get("summary", ""),
+        "createdAt": created_at
+    }
+
 @routes_bp.route('/dreams/<phone_number>/<dream_id>', methods=['GET'])
 @require_auth
 @cross_origin(supports_credentials=True)
@@ -354,92 +357,18 @@ def get_dream(phone_number, dream_id):
     try:
         if not S3_BUCKET_NAME:
             return jsonify({"error": "S3 bucket not configured"}), 500
+        if not is_valid_dream_id(dream_id):
+            return jsonify({"error": "Invalid dream id"}), 400
 
         # Retrieve the specific dream object from S3
         s3_client = get_s3_client()
-        
-        # Try new path structure first (s3/user/dreams/)
-        key = f'{phone_number}/dreams/{dream_id}.json'
-        try:
-            response = s3_client.get_object(
-                Bucket=S3_BUCKET_NAME,
-                Key=key
-            )
-        except s3_client.exceptions.NoSuchKey:
-            # Fallback to old path structure for backwards compatibility
-            key = f'{phone_number}/{dream_id}.json'
-            response = s3_client.get_object(
-                Bucket=S3_BUCKET_NAME,
-                Key=key
-            )
-
-        dream_content = json.loads(response['Body'].read().decode('utf-8'))
+        dream_content = load_dream(s3_client, phone_number, dream_id)
         
         # Debug logging to understand dream data structure
         print(f"DEBUG: Dream data keys: {list(dream_content.keys())}")
         print(f"DEBUG: Dream content sample: {str(dream_content)[:200]}...")
-        
-        # Debug specific fields we're looking for
-        for field in ["dreamContent", "dream_content", "content", "text", "dream"]:
-            if field in dream_content:
-                value = dream_content[field]
-                print(f"DEBUG: Found field '{field}': {str(value)[:100]}...")
-            else:
-                print(f"DEBUG: Field '{field}' not found")
 
-        # Handle response field safely - check multiple possible field names
-        response_text = ""
-        analysis_fields = ["response", "analysis", "interpretation", "ai_response", "dream_analysis", "insights"]
-        
-        print(f"DEBUG: Checking analysis fields for dream {dream_id}:")
-        for field in analysis_fields:
-            if field in dream_content and dream_content[field]:
-                print(f"DEBUG: Found analysis field '{field}': {str(dream_content[field])[:100]}...")
-                if isinstance(dream_content[field], list):
-                    response_text = " ".join(dream_content[field])
-                else:
-                    response_text = str(dream_content[field])
-                break  # Use the first non-empty field found
-            else:
-                print(f"DEBUG: Analysis field '{field}' not found or empty")
-        
-        print(f"DEBUG: Final response_text: '{response_text[:100]}...'")
-        
-        # Handle createdAt field - it might be missing or have different names
-        created_at = dream_content.get("createdAt") or dream_content.get("created_at") or dream_content.get("timestamp")
-        if not created_at:
-            # Fallback to current time if no creation date is found
-            from datetime import datetime
-            created_at = datetime.utcnow().isoformat()
-        
-        # Handle dream content field - it might have different names
-        dream_content_text = (
-            dream_content.get("dreamContent") or 
-            dream_content.get("dream_content") or 
-            dream_content.get("content") or 
-            dream_content.get("text") or 
-            dream_content.get("dream") or
-            dream_content.get("raw_text") or  # Add raw_text field
-            ""
-        )
-        
-        # Try to decode URL encoding, but handle cases where it's not encoded
-        try:
-            decoded_content = urllib.parse.unquote_plus(dream_content_text)
-        except Exception as e:
-            print(f"DEBUG: URL decode failed: {e}, using original content")
-            decoded_content = dream_content_text
-        
-        print(f"DEBUG: Original dream content: '{dream_content_text[:100]}...'")
-        print(f"DEBUG: Decoded dream content: '{decoded_content[:100]}...'")
-        
-        to_return = {
-            "id": dream_content.get("id", dream_id),
-            "response": response_text,
-            "dream_content": decoded_content,
-            "summary": dream_content.get("summary", ""),
-            "createdAt": created_at
-        }
+        to_return = normalize_dream(dream_content, dream_id)
         
         print(f"DEBUG: Final response dream_content: '{to_return['dream_content'][:100]}...'")
         
@@ -478,3 +407,57 @@ def get_dream(phone_number, dream_id):
     except Exception as e:
         return jsonify({"error": f"Failed to retrieve dream: {str(e)}"}), 500
 
+@routes_bp.route('/dreams/<phone_number>/batch', methods=['POST'])
+@require_auth
+@cross_origin(supports_credentials=True)
+def get_dreams_batch(phone_number):
+    """Retrieve several dreams by ID in one request"""
+    try:
+        if not S3_BUCKET_NAME:
+            return jsonify({"error": "S3 bucket not configured"}), 500
+
+        data = request.get_json(silent=True) or {}
+        dream_ids = data.get('ids')
+
+        if not isinstance(dream_ids, list) or not dream_ids:
+            return jsonify({"error": "ids must be a non-empty list"}), 400
+        if not all(isinstance(dream_id, str) and dream_id for dream_id in dream_ids):
+            return jsonify({"error": "ids must be non-empty strings"}), 400
+        invalid_ids = [dream_id for dream_id in dream_ids if not is_valid_dream_id(dream_id)]
+        if invalid_ids:
+            return jsonify({"error": f"Invalid dream ids: {', '.join(invalid_ids)}"}), 400
+
+        # Drop duplicates but keep the caller's order
+        dream_ids = list(dict.fromkeys(dream_ids))
+        if len(dream_ids) > MAX_BATCH_DREAMS:
+            return jsonify({"error": f"At most {MAX_BATCH_DREAMS} ids can be requested at once"}), 400
+
+        s3_client = get_s3_client()
+        stats = {}
+        results = fetch_concurrently(
+            lambda dream_id: normalize_dream(load_dream(s3_client, phone_number, dream_id), dream_id),
+            dream_ids,
+            stats=stats
+        )
+
+        dreams = []
+        errors = {}
+        for dream_id, dream, error in results:
+            if error is None:
+                dreams.append(dream)
+            elif isinstance(error, s3_client.exceptions.NoSuchKey):
+                errors[dream_id] = "Dream not found"
+            elif isinstance(error, json.JSONDecodeError):
+                errors[dream_id] = "Invalid dream data format"
+            else:
+                errors[dream_id] = f"Failed to retrieve dream: {str(error)}"
+
+        print(f"Batch fetched {len(dreams)} dreams for user {phone_number} ({len(errors)} errors, {stats.get('elapsedMs')}ms)")
+
+        return jsonify({
+            'dreams': dreams,
+            'errors': errors
+        }), 200
+
+    except Exception as e:
+        return jsonify({"error": f"Failed to retrieve dreams: {str(e)}"}), 500
@@ -2,13 +2,55 @@ from flask import Blueprint, request, jsonify
 from flask_cors import cross_origin
 import stripe
 import os
+import json
+import time
+import click
 import boto3
+import threading
+from botocore.exceptions import ClientError, BotoCoreError
 from datetime import datetime, timedelta
+from decimal import Decimal
 from functools import wraps
 from .auth import require_cognito_auth, get_cognito_user_info
+from .event_queue import InProcessEventQueue, SQLiteEventQueue, SQSEventQueue
 
 stripe_bp = Blueprint('stripe_bp', __name__)
 
+# Stripe configuration is resolved on first use of a Stripe route, not at import
+STRIPE_WEBHOOK_SECRET = None
+SUBSCRIPTION_PRICES = {}
+
+# Seconds before Secrets Manager is consulted again (picks up rotated keys)
+STRIPE_SECRETS_REFRESH_INTERVAL = int(os.getenv('STRIPE_SECRETS_REFRESH_INTERVAL', '3600'))
+# Minimum seconds between refreshes forced by a webhook signature mismatch
+STRIPE_SECRETS_FORCED_REFRESH_INTERVAL = int(os.getenv('STRIPE_SECRETS_FORCED_REFRESH_INTERVAL', '60'))
+# Optional JSON file with the same keys as the secret, for offline runs
+STRIPE_SECRETS_FILE = os.getenv('STRIPE_SECRETS_FILE')
+
+_stripe_config_loaded_at = None
+_stripe_config_lock = threading.Lock()
+
+def apply_stripe_secrets(secrets: dict, source: str):
+    """Configure the Stripe client, webhook secret and price ids from a secrets dict"""
+    global STRIPE_WEBHOOK_SECRET, SUBSCRIPTION_PRICES
+
+    stripe.api_key = secrets.get('STRIPE_SECRET_KEY')
+
+    # Configure Stripe for test mode if using test keys
+    if stripe.api_key and stripe.api_key.startswith('sk_test_'):
+        print(f"🧪 Stripe configured for TEST/SANDBOX mode ({source})")
+    elif stripe.api_key and stripe.api_key.startswith('sk_live_'):
+        print(f"🚀 Stripe configured for LIVE/PRODUCTION mode ({source})")
+    else:
+        print(f"⚠️  Warning: Unknown Stripe key format ({source})")
+
+    STRIPE_WEBHOOK_SECRET = secrets.get('STRIPE_WEBHOOK_SECRET')
+    SUBSCRIPTION_PRICES = {
+        'monthly': secrets.get('STRIPE_MONTHLY_PRICE_ID'),
+        'quarterly': secrets.get('STRIPE_QUARTERLY_PRICE_ID'),
+        'yearly': secrets.get('STRIPE_YEARLY_PRICE_ID')
+    }
+
 def load_stripe_secrets():
     """Load Stripe configuration from AWS Secrets Manager"""
     try:
@@ -25,28 +67,8 @@ def load_stripe_secrets():
         secret_string = response['SecretString']
 
         # Parse the secret (assuming it's JSON)
-        import json
         secrets = json.loads(secret_string)
-
-        # Set Stripe configuration
-        stripe.api_key = secrets.get('STRIPE_SECRET_KEY')
-
-        # Configure Stripe for test mode if using test keys
-        if stripe.api_key and stripe.api_key.startswith('sk_test_'):
-            print("🧪 Stripe configured for TEST/SANDBOX mode")
-        elif stripe.api_key and stripe.api_key.startswith('sk_live_'):
-            print("🚀 Stripe configured for LIVE/PRODUCTION mode")
-        else:
-            print("⚠️  Warning: Unknown Stripe key format")
-
-        global STRIPE_WEBHOOK_SECRET, SUBSCRIPTION_PRICES
-
-        STRIPE_WEBHOOK_SECRET = secrets.get('STRIPE_WEBHOOK_SECRET')
-        SUBSCRIPTION_PRICES = {
-            'monthly': secrets.get('STRIPE_MONTHLY_PRICE_ID'),
-            'quarterly': secrets.get('STRIPE_QUARTERLY_PRICE_ID'),
-            'yearly': secrets.get('STRIPE_YEARLY_PRICE_ID')
-        }
+        apply_stripe_secrets(secrets, 'Secrets Manager')
 
         print("✅ Stripe secrets loaded successfully from Secrets Manager")
         return True
@@ -55,32 +77,413 @@ def load_stripe_secrets():
         print(f"ERROR: Failed to load Stripe secrets: {str(e)}")
         return False
 
-# Initialize Stripe configuration
-if not load_stripe_secrets():
-    # Fallback to environment variables for local development
-    stripe.api_key = os.getenv('STRIPE_SECRET_KEY')
+def load_local_stripe_secrets():
+    """Load Stripe configuration from STRIPE_SECRETS_FILE, or else from environment variables"""
+    if STRIPE_SECRETS_FILE:
+        try:
+            with open(STRIPE_SECRETS_FILE) as secrets_file:
+                apply_stripe_secrets(json.load(secrets_file), 'secrets file')
+            return
+        except Exception as e:
+            print(f"ERROR: Failed to read Stripe secrets file {STRIPE_SECRETS_FILE}: {str(e)}")
+
+    keys = ('STRIPE_SECRET_KEY', 'STRIPE_WEBHOOK_SECRET', 'STRIPE_MONTHLY_PRICE_ID',
+            'STRIPE_QUARTERLY_PRICE_ID', 'STRIPE_YEARLY_PRICE_ID')
+    apply_stripe_secrets({key: os.getenv(key) for key in keys}, 'env vars')
+
+def ensure_stripe_configured(force: bool = False):
+    """Load the Stripe configuration on first use and refresh it once it is older than the refresh interval.
+
+    A failed refresh keeps the configuration already in use; a failed first
+    load falls back to the local secrets file or environment variables.
+    With force, reloads now unless the last load was very recent.
+    """
+    global _stripe_config_loaded_at
+
+    with _stripe_config_lock:
+        now = time.time()
+        if _stripe_config_loaded_at is not None:
+            age = now - _stripe_config_loaded_at
+            if age < (STRIPE_SECRETS_FORCED_REFRESH_INTERVAL if force else STRIPE_SECRETS_REFRESH_INTERVAL):
+                return
+
+        if not load_stripe_secrets() and _stripe_config_loaded_at is None:
+            # Fallback to a local file or environment variables for local development
+            load_local_stripe_secrets()
+        _stripe_config_loaded_at = now
+
+def reset_stripe_config():
+    """Forget the loaded Stripe configuration so the next Stripe route loads it again"""
+    global _stripe_config_loaded_at
+    with _stripe_config_lock:
+        _stripe_config_loaded_at = None
+
+def require_stripe_config(f):
+    """Decorator making sure the Stripe configuration is loaded before the route runs"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        ensure_stripe_configured()
+        return f(*args, **kwargs)
+    return decorated_function
 
-    # Configure Stripe for test mode if using test keys
-    if stripe.api_key and stripe.api_key.startswith('sk_test_'):
-        print("🧪 Stripe configured for TEST/SANDBOX mode (env vars)")
-    elif stripe.api_key and stripe.api_key.startswith('sk_live_'):
-        print("🚀 Stripe configured for LIVE/PRODUCTION mode (env vars)")
-    else:
-        print("⚠️  Warning: Unknown Stripe key format (env vars)")
+# Use the new Cognito authentication decorator
+require_auth = require_cognito_auth
 
-    STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET')
-    SUBSCRIPTION_PRICES = {
-        'monthly': os.getenv('STRIPE_MONTHLY_PRICE_ID'),
-        'quarterly': os.getenv('STRIPE_QUARTERLY_PRICE_ID'),
-        'yearly': os.getenv('STRIPE_YEARLY_PRICE_ID')
+# Phone number -> Stripe customer and subscription, kept current by the webhooks
+dynamodb = boto3.resource('dynamodb')
+stripe_customers_table_name = os.getenv('STRIPE_CUSTOMERS_TABLE_NAME', 'dream-companion-stripe-customers')
+# The index entry also holds the phone number's subscription status, written by the
+# subscription webhooks. Seconds before a status is refreshed from Stripe in the
+# background anyway (a safety net for missed webhooks).
+STRIPE_STATUS_TTL = int(os.getenv('STRIPE_STATUS_TTL', '900'))
+# Seconds a read waits for Stripe when refreshing a stale status before serving it as is
+STRIPE_STATUS_REFRESH_TIMEOUT = float(os.getenv('STRIPE_STATUS_REFRESH_TIMEOUT', '2'))
+
+# Subscription id -> phone number, plan and state, written from the subscription webhooks
+stripe_subscriptions_table_name = os.getenv('STRIPE_SUBSCRIPTIONS_TABLE_NAME', 'dream-companion-stripe-subscriptions')
+
+# Webhooks are acknowledged once recorded and queued; a worker applies them.
+# Received event ids are kept (with a DynamoDB TTL) to drop Stripe's redeliveries.
+stripe_events_table_name = os.getenv('STRIPE_EVENTS_TABLE_NAME', 'dream-companion-stripe-events')
+STRIPE_EVENT_RETENTION_DAYS = int(os.getenv('STRIPE_EVENT_RETENTION_DAYS', '30'))
+STRIPE_EVENTS_QUEUE_URL = os.getenv('STRIPE_EVENTS_QUEUE_URL')
+# Without a queue URL, events go to a SQLite file when set, else an in-process queue
+STRIPE_EVENTS_SQLITE_PATH = os.getenv('STRIPE_EVENTS_SQLITE_PATH')
+
+# DynamoDB error codes worth retrying; any other failure will fail again on redelivery
+TRANSIENT_DYNAMODB_ERRORS = {
+    'ProvisionedThroughputExceededException', 'ThrottlingException', 'RequestLimitExceeded',
+    'InternalServerError', 'ServiceUnavailable', 'TransactionConflictException'
+}
+
+# Table handles resolved once per process (provisioned by `flask bootstrap`)
+_stripe_customers_table = None
+_stripe_events_table = None
+_stripe_subscriptions_table = None
+_stripe_event_queue = None
+_stripe_event_queue_lock = threading.Lock()
+
+# Subscription status reads by outcome, and the oldest status served
+_subscription_status_stats = {
+    'fresh': 0, 'refreshed': 0, 'stale': 0, 'misses': 0,
+    'refresh_errors': 0, 'refresh_timeouts': 0, 'max_age_seconds': 0.0
+}
+_subscription_status_lock = threading.Lock()
+
+def get_stripe_customers_table():
+    """Get the phone number -> Stripe customer index table"""
+    global _stripe_customers_table
+    if _stripe_customers_table is None:
+        _stripe_customers_table = dynamodb.Table(stripe_customers_table_name)
+    return _stripe_customers_table
+
+def record_stripe_customer(phone_number, customer_id=None, subscription_id=None):
+    """Point a phone number at its Stripe customer and/or subscription"""
+    if not phone_number:
+        return
+
+    names = {'#updated_at': 'updated_at'}
+    values = {':updated_at': datetime.utcnow().isoformat()}
+    for field, value in (('customer_id', customer_id), ('subscription_id', subscription_id)):
+        if value:
+            names[f'#{field}'] = field
+            values[f':{field}'] = value
+
+    get_stripe_customers_table().update_item(
+        Key={'phone_number': phone_number},
+        UpdateExpression='SET ' + ', '.join(f'{name} = :{name[1:]}' for name in names),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values
+    )
+
+def event_order_condition(attribute, event_created, allow_equal=True):
+    """Condition arguments rejecting a write from an event older than the one attribute records"""
+    operator = '<=' if allow_equal else '<'
+    return {
+        'ConditionExpression': f'attribute_not_exists({attribute}) OR {attribute} {operator} :event_created',
+        'ExpressionAttributeValues': {':event_created': event_created}
     }
 
-# Use the new Cognito authentication decorator
-require_auth = require_cognito_auth
+def forget_stripe_subscription(phone_number, subscription_id, event_created=None):
+    """Drop a phone number's subscription id if it still points at subscription_id (and no newer event was applied)"""
+    if not phone_number or not subscription_id:
+        return
+
+    update = 'SET status_synced_at = :now'
+    condition = 'subscription_id = :subscription_id'
+    values = {':subscription_id': subscription_id, ':now': datetime.utcnow().isoformat()}
+    if event_created is not None:
+        ordering = event_order_condition('status_event_created', event_created)
+        update += ', status_event_created = :event_created'
+        condition += f" AND ({ordering['ConditionExpression']})"
+        values.update(ordering['ExpressionAttributeValues'])
+
+    table = get_stripe_customers_table()
+    try:
+        table.update_item(
+            Key={'phone_number': phone_number},
+            UpdateExpression=update + ' REMOVE subscription_id, subscription_status',
+            ConditionExpression=condition,
+            ExpressionAttributeValues=values
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        pass
+
+def lookup_stripe_customer(phone_number):
+    """Index entry ({customer_id, subscription_id}) for a phone number, or None"""
+    try:
+        response = get_stripe_customers_table().get_item(Key={'phone_number': phone_number})
+        return response.get('Item')
+    except Exception as e:
+        print(f"Error looking up Stripe customer for {phone_number}: {e}")
+        return None
+
+def find_stripe_customer_id(phone_number):
+    """Stripe customer id for a phone number from the index, searching Stripe once on a miss"""
+    entry = lookup_stripe_customer(phone_number)
+    if entry and entry.get('customer_id'):
+        return entry['customer_id']
+
+    escaped = phone_number.replace('\\', '\\\\').replace("'", "\\'")
+    customers = stripe.Customer.search(query=f"metadata['phone_number']:'{escaped}'", limit=1)
+    if not customers.data:
+        return None
+
+    try:
+        record_stripe_customer(phone_number, customer_id=customers.data[0].id)
+    except Exception as e:
+        print(f"Error recording Stripe customer for {phone_number}: {e}")
+    return customers.data[0].id
+
+def get_stripe_subscriptions_table():
+    """Get the subscription id -> metadata table"""
+    global _stripe_subscriptions_table
+    if _stripe_subscriptions_table is None:
+        _stripe_subscriptions_table = dynamodb.Table(stripe_subscriptions_table_name)
+    return _stripe_subscriptions_table
+
+def record_stripe_subscription(subscription, event_created=None) -> dict:
+    """Store a subscription's phone number, plan and state; returns the stored record.
+
+    With the created time of the event carrying the subscription, a record
+    already written from a newer event is kept and None is returned: Stripe
+    does not deliver webhooks in order.
+    """
+    record = {
+        'subscription_id': subscription.id,
+        'phone_number': subscription.metadata.get('phone_number'),
+        'plan_type': subscription.metadata.get('plan_type'),
+        'customer_id': getattr(subscription, 'customer', None),
+        'status': getattr(subscription, 'status', None),
+        'current_period_end': getattr(subscription, 'current_period_end', None),
+        'cancel_at_period_end': getattr(subscription, 'cancel_at_period_end', None),
+        'event_created': event_created,
+        'updated_at': datetime.utcnow().isoformat()
+    }
+    record = {field: value for field, value in record.items() if value is not None}
+
+    table = get_stripe_subscriptions_table()
+    if event_created is None:
+        table.put_item(Item=record)
+        return record
+
+    try:
+        table.put_item(Item=record, **event_order_condition('event_created', event_created))
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
+    return record
+
+def get_subscription_metadata(subscription_id) -> dict:
+    """Phone number and plan of a subscription from the local store, asking Stripe only on a miss"""
+    try:
+        response = get_stripe_subscriptions_table().get_item(Key={'subscription_id': subscription_id})
+        if 'Item' in response and response['Item'].get('phone_number'):
+            return response['Item']
+    except Exception as e:
+        print(f"Error reading Stripe subscription {subscription_id}: {e}")
+
+    return record_stripe_subscription(stripe.Subscription.retrieve(subscription_id))
+
+def subscription_summary(subscription) -> dict:
+    """The subscription fields served by the subscription status route"""
+    return {
+        'id': subscription.id,
+        'status': subscription.status,
+        'current_period_end': subscription.current_period_end,
+        'plan_type': subscription.metadata.get('plan_type'),
+        'cancel_at_period_end': subscription.cancel_at_period_end
+    }
+
+def record_subscription_status(phone_number, summary=None, event_created=None, allow_equal=True) -> str:
+    """Store a phone number's subscription status (None for no subscription); returns the sync time.
+
+    With the created time of the event carrying the status (or of a read from
+    Stripe), a status already written from a newer event is kept and None is
+    returned. Without allow_equal, an event from the same second also wins.
+    """
+    synced_at = datetime.utcnow().isoformat()
+    if not phone_number:
+        return synced_at
+
+    sets = ['status_synced_at = :now']
+    values = {':now': synced_at}
+    kwargs = {}
+    if summary:
+        sets.append('subscription_status = :status')
+        values[':status'] = summary
+    if event_created is not None:
+        sets.append('status_event_created = :event_created')
+        kwargs = event_order_condition('status_event_created', event_created, allow_equal)
+        values.update(kwargs.pop('ExpressionAttributeValues'))
+
+    update = 'SET ' + ', '.join(sets) + ('' if summary else ' REMOVE subscription_status')
+    table = get_stripe_customers_table()
+    try:
+        table.update_item(
+            Key={'phone_number': phone_number},
+            UpdateExpression=update,
+            ExpressionAttributeValues=values,
+            **kwargs
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return None
+    return synced_at
+
+def active_subscription(status):
+    """A stored subscription status if it is active, with DynamoDB numbers as ints"""
+    if not status or status.get('status') != 'active':
+        return None
+    return {field: int(value) if isinstance(value, Decimal) else value for field, value in status.items()}
+
+def refresh_subscription_status(phone_number):
+    """Read a phone number's active subscription from Stripe into the projection; returns (status, synced_at).
+
+    The write is conditional on the time the read started, so a refresh that
+    finishes late never overwrites a status from a webhook event created in
+    the meantime; the stored status is returned instead.
+    """
+    ensure_stripe_configured()
+    read_at = int(time.time())
+    customer_id = find_stripe_customer_id(phone_number)
+
+    summary = None
+    if customer_id:
+        subscriptions = stripe.Subscription.list(customer=customer_id, status='active')
+        if subscriptions.data:
+            summary = subscription_summary(subscriptions.data[0])
+
+    try:
+        synced_at = record_subscription_status(phone_number, summary, read_at, allow_equal=False)
+        if synced_at is None:
+            entry = lookup_stripe_customer(phone_number) or {}
+            return active_subscription(entry.get('subscription_status')), entry.get('status_synced_at')
+        return summary, synced_at
+    except Exception as e:
+        print(f"Error recording subscription status for {phone_number}: {e}")
+        return summary, datetime.utcnow().isoformat()
+
+def refresh_subscription_status_within(phone_number, timeout: float):
+    """Refresh a phone number's status, waiting at most timeout seconds; returns (status, synced_at) or None.
+
+    A refresh that misses the timeout is abandoned and the next stale read
+    tries again. Its thread may still finish while the container is warm, but
+    its write is conditional (see refresh_subscription_status) and cannot
+    replace a status written by the webhook worker since the read started.
+    """
+    result = {}
+
+    def refresh():
+        try:
+            result['status'] = refresh_subscription_status(phone_number)
+        except Exception as e:
+            result['error'] = e
+
+    thread = threading.Thread(target=refresh, daemon=True)
+    thread.start()
+    thread.join(timeout)
+
+    if 'status' in result:
+        return result['status']
+
+    with _subscription_status_lock:
+        if 'error' in result:
+            print(f"Error refreshing subscription status for {phone_number}: {result['error']}")
+            _subscription_status_stats['refresh_errors'] += 1
+        else:
+            print(f"Refreshing subscription status for {phone_number} timed out after {timeout}s")
+            _subscription_status_stats['refresh_timeouts'] += 1
+    return None
+
+def get_subscription_status(phone_number):
+    """(active subscription or None, synced_at) for a phone number from the local projection.
+
+    A phone number with no projection yet is read through from Stripe. One
+    synced longer than STRIPE_STATUS_TTL ago is refreshed inline, waiting at
+    most STRIPE_STATUS_REFRESH_TIMEOUT seconds, and served as is if Stripe is
+    slow or failing.
+    """
+    entry = lookup_stripe_customer(phone_number)
+    synced_at = entry.get('status_synced_at') if entry else None
+
+    if synced_at is None:
+        with _subscription_status_lock:
+            _subscription_status_stats['misses'] += 1
+        return refresh_subscription_status(phone_number)
+
+    age = (datetime.utcnow() - datetime.fromisoformat(synced_at)).total_seconds()
+    if age > STRIPE_STATUS_TTL:
+        refreshed = refresh_subscription_status_within(phone_number, STRIPE_STATUS_REFRESH_TIMEOUT)
+        if refreshed is not None:
+            with _subscription_status_lock:
+                _subscription_status_stats['refreshed'] += 1
+            return refreshed
+        print(f"Serving subscription status for {phone_number} synced {age:.0f}s ago")
+
+    with _subscription_status_lock:
+        _subscription_status_stats['stale' if age > STRIPE_STATUS_TTL else 'fresh'] += 1
+        _subscription_status_stats['max_age_seconds'] = max(_subscription_status_stats['max_age_seconds'], age)
+    return active_subscription(entry.get('subscription_status')), synced_at
+
+def get_subscription_status_stats() -> dict:
+    """Subscription status reads by outcome (fresh, refreshed, stale, misses), failed or timed out refreshes and the oldest status served"""
+    with _subscription_status_lock:
+        return dict(_subscription_status_stats)
+
+def clear_subscription_status_stats():
+    """Reset the subscription status counters"""
+    with _subscription_status_lock:
+        for name in _subscription_status_stats:
+            _subscription_status_stats[name] = 0.0 if name == 'max_age_seconds' else 0
+
+def sync_stripe_customers() -> dict:
+    """Backfill the customer index from every Stripe customer and active subscription"""
+    counts = {'customers': 0, 'subscriptions': 0}
+
+    for customer in stripe.Customer.list(limit=100).auto_paging_iter():
+        phone_number = customer.metadata.get('phone_number')
+        if phone_number:
+            record_stripe_customer(phone_number, customer_id=customer.id)
+            counts['customers'] += 1
+
+    for subscription in stripe.Subscription.list(limit=100, status='active').auto_paging_iter():
+        phone_number = subscription.metadata.get('phone_number')
+        if phone_number:
+            record_stripe_customer(phone_number, customer_id=subscription.customer, subscription_id=subscription.id)
+            counts['subscriptions'] += 1
+
+    return counts
+
+@click.command('sync-stripe-customers')
+def sync_stripe_customers_command():
+    """Backfill the phone number -> Stripe customer index."""
+    ensure_stripe_configured()
+    counts = sync_stripe_customers()
+    click.echo(f"Indexed {counts['customers']} customers and {counts['subscriptions']} subscriptions")
 
 @stripe_bp.route('/create-checkout-session', methods=['POST'])
 @cross_origin(supports_credentials=True)
 @require_auth
+@require_stripe_config
 def create_checkout_session():
     """Create a Stripe Checkout session for subscription"""
     try:
@@ -156,6 +559,7 @@ def create_checkout_session():
 @stripe_bp.route('/create-portal-session', methods=['POST'])
 @cross_origin(supports_credentials=True)
 @require_auth
+@require_stripe_config
 def create_portal_session():
     """Create a Stripe Customer Portal session for subscription management"""
     try:
@@ -166,21 +570,13 @@ def create_portal_session():
         if not phone_number:
             return jsonify({"error": "Missing phone_number"}), 400
 
-        # Find customer by phone number in metadata
-        customers = stripe.Customer.list(limit=100)
-        customer = None
-
-        for cust in customers.data:
-            if cust.metadata.get('phone_number') == phone_number:
-                customer = cust
-                break
-
-        if not customer:
+        customer_id = find_stripe_customer_id(phone_number)
+        if not customer_id:
             return jsonify({"error": "Customer not found"}), 404
 
         # Create portal session
         portal_session = stripe.billing_portal.Session.create(
-            customer=customer.id,
+            customer=customer_id,
             return_url=return_url
         )
 
@@ -191,8 +587,115 @@ def create_portal_session():
     except Exception as e:
         return jsonify({"error": f"Failed to create portal session: {str(e)}"}), 500
 
+def get_stripe_events_table():
+    """Get the table of received webhook event ids"""
+    global _stripe_events_table
+    if _stripe_events_table is None:
+        _stripe_events_table = dynamodb.Table(stripe_events_table_name)
+    return _stripe_events_table
+
+def record_stripe_event(event_id, event_type) -> bool:
+    """Record a webhook event id; returns False if it was already received"""
+    table = get_stripe_events_table()
+    try:
+        table.put_item(
+            Item={
+                'event_id': event_id,
+                'event_type': event_type,
+                'received_at': datetime.utcnow().isoformat(),
+                'expires_at': int(time.time()) + STRIPE_EVENT_RETENTION_DAYS * 86400
+            },
+            ConditionExpression='attribute_not_exists(event_id)'
+        )
+    except table.meta.client.exceptions.ConditionalCheckFailedException:
+        return False
+    return True
+
+def forget_stripe_event(event_id):
+    """Drop a recorded event id so a redelivery of the event is accepted"""
+    try:
+        get_stripe_events_table().delete_item(Key={'event_id': event_id})
+    except Exception as e:
+        print(f"Error forgetting Stripe event {event_id}: {e}")
+
+def get_stripe_event_queue():
+    """The queue webhook events are handed to: SQS when configured, else a SQLite or in-process stand-in"""
+    global _stripe_event_queue
+    with _stripe_event_queue_lock:
+        if _stripe_event_queue is None:
+            if STRIPE_EVENTS_QUEUE_URL:
+                _stripe_event_queue = SQSEventQueue(STRIPE_EVENTS_QUEUE_URL)
+            elif STRIPE_EVENTS_SQLITE_PATH:
+                _stripe_event_queue = SQLiteEventQueue(apply_stripe_event_payload, STRIPE_EVENTS_SQLITE_PATH)
+            else:
+                _stripe_event_queue = InProcessEventQueue(apply_stripe_event_payload)
+        return _stripe_event_queue
+
+def stripe_event_group(event) -> str:
+    """Ordering group for an event: events for the same customer are applied in order"""
+    obj = event['data']['object']
+    return str(getattr(obj, 'customer', None) or getattr(obj, 'id', None) or 'default')
+
+def is_transient_error(error) -> bool:
+    """Check whether a failure may succeed on retry (throttling, timeouts, 5xx) rather than fail again"""
+    if isinstance(error, ClientError):
+        return (error.response.get('Error', {}).get('Code') in TRANSIENT_DYNAMODB_ERRORS
+                or error.response.get('ResponseMetadata', {}).get('HTTPStatusCode', 0) >= 500)
+    if isinstance(error, stripe.error.StripeError):
+        return isinstance(error, (stripe.error.APIConnectionError, stripe.error.RateLimitError)) or (error.http_status or 0) >= 500
+    return isinstance(error, (BotoCoreError, ConnectionError, TimeoutError))
+
+def process_stripe_event(event):
+    """Apply one verified webhook event.
+
+    Raises on transient failures so the queue retries the event; other
+    failures are logged and the event dropped, since redelivering it would
+    only fail again until it reached the dead-letter queue.
+    """
+    try:
+        apply_stripe_event(event)
+    except Exception as e:
+        if is_transient_error(e):
+            raise
+        print(f"Dropping Stripe event {event['id']} ({event['type']}) after a permanent error: {e}")
+
+def apply_stripe_event(event):
+    """Dispatch a webhook event to its handler"""
+    # Subscription handlers use the event's creation time to drop out-of-order deliveries
+    event_created = event['created'] if 'created' in event else None
+    if event['type'] == 'checkout.session.completed':
+        handle_checkout_completed(event['data']['object'])
+    elif event['type'] == 'customer.subscription.created':
+        handle_subscription_created(event['data']['object'], event_created)
+    elif event['type'] == 'customer.subscription.updated':
+        handle_subscription_updated(event['data']['object'], event_created)
+    elif event['type'] == 'customer.subscription.deleted':
+        handle_subscription_deleted(event['data']['object'], event_created)
+    elif event['type'] == 'invoice.payment_succeeded':
+        handle_payment_succeeded(event['data']['object'])
+    elif event['type'] == 'invoice.payment_failed':
+        handle_payment_failed(event['data']['object'])
+
+def apply_stripe_event_payload(payload: str):
+    """Queue worker entry point: apply a webhook payload whose signature was verified on receipt"""
+    ensure_stripe_configured()
+    event = stripe.Event.construct_from(json.loads(payload), stripe.api_key)
+    process_stripe_event(event)
+
+def construct_webhook_event(payload, sig_header):
+    """Verify and parse a webhook, re-reading the secrets once if the signing secret may have rotated"""
+    try:
+        return stripe.Webhook.construct_event(payload, sig_header, STRIPE_WEBHOOK_SECRET)
+    except stripe.error.SignatureVerificationError:
+        previous_secret = STRIPE_WEBHOOK_SECRET
+        ensure_stripe_configured(force=True)
+        if STRIPE_WEBHOOK_SECRET == previous_secret:
+            raise
+        return stripe.Webhook.construct_event(payload, sig_header, STRIPE_WEBHOOK_SECRET)
+
 @stripe_bp.route('/webhook', methods=['POST'])
 @cross_origin(supports_credentials=True)
+@require_stripe_config
 def stripe_webhook():
     """Handle Stripe webhooks for subscription events"""
     try:
@@ -204,27 +707,22 @@ def stripe_webhook():
 
         # Verify webhook signature
         try:
-            event = stripe.Webhook.construct_event(
-                payload, sig_header, STRIPE_WEBHOOK_SECRET
-            )
+            event = construct_webhook_event(payload, sig_header)
         except ValueError as e:
             return jsonify({"error": "Invalid payload"}), 400
         except stripe.error.SignatureVerificationError as e:
             return jsonify({"error": "Invalid signature"}), 400
 
-        # Handle the event
-        if event['type'] == 'checkout.session.completed':
-            handle_checkout_completed(event['data']['object'])
-        elif event['type'] == 'customer.subscription.created':
-            handle_subscription_created(event['data']['object'])
-        elif event['type'] == 'customer.subscription.updated':
-            handle_subscription_updated(event['data']['object'])
-        elif event['type'] == 'customer.subscription.deleted':
-            handle_subscription_deleted(event['data']['object'])
-        elif event['type'] == 'invoice.payment_succeeded':
-            handle_payment_succeeded(event['data']['object'])
-        elif event['type'] == 'invoice.payment_failed':
-            handle_payment_failed(event['data']['object'])
+        # Stripe retries deliveries; each event is queued only once
+        if not record_stripe_event(event['id'], event['type']):
+            return jsonify({"status": "duplicate"}), 200
+
+        try:
+            get_stripe_event_queue().put(event['id'], payload, stripe_event_group(event))
+        except Exception:
+            # Let Stripe's retry queue it again
+            forget_stripe_event(event['id'])
+            raise
 
         return jsonify({"status": "success"}), 200
 
@@ -237,14 +735,20 @@ def handle_checkout_completed(session):
     plan_type = session.metadata.get('plan_type')
 
     print(f"Checkout completed for {phone_number} with plan {plan_type}")
+    record_stripe_customer(phone_number, customer_id=getattr(session, 'customer', None), subscription_id=getattr(session, 'subscription', None))
     # You can add additional logic here, like sending welcome emails
 
-def handle_subscription_created(subscription):
+def handle_subscription_created(subscription, event_created=None):
     """Handle new subscription creation"""
     phone_number = subscription.metadata.get('phone_number')
     plan_type = subscription.metadata.get('plan_type')
 
     print(f"Subscription created for {phone_number} with plan {plan_type}")
+    if record_stripe_subscription(subscription, event_created) is None:
+        print(f"Skipping subscription.created for {subscription.id}: a newer event was already applied")
+        return
+    record_stripe_customer(phone_number, customer_id=getattr(subscription, 'customer', None), subscription_id=subscription.id)
+    record_subscription_status(phone_number, subscription_summary(subscription), event_created)
 
     # Update premium status in DynamoDB
     try:
@@ -285,20 +789,31 @@ def handle_subscription_created(subscription):
         print(f"Premium status updated for {phone_number}")
     except Exception as e:
         print(f"Error updating premium status: {e}")
+        # Fail the event so the queue retries it
+        raise
 
-def handle_subscription_updated(subscription):
+def handle_subscription_updated(subscription, event_created=None):
     """Handle subscription updates"""
     phone_number = subscription.metadata.get('phone_number')
     status = subscription.status
 
     print(f"Subscription updated for {phone_number}: {status}")
+    if record_stripe_subscription(subscription, event_created) is None:
+        print(f"Skipping subscription.updated for {subscription.id}: a newer event was already applied")
+        return
+    record_stripe_customer(phone_number, customer_id=getattr(subscription, 'customer', None), subscription_id=subscription.id)
+    record_subscription_status(phone_number, subscription_summary(subscription), event_created)
     # Update subscription status in your database
 
-def handle_subscription_deleted(subscription):
+def handle_subscription_deleted(subscription, event_created=None):
     """Handle subscription cancellation"""
     phone_number = subscription.metadata.get('phone_number')
 
     print(f"Subscription deleted for {phone_number}")
+    if record_stripe_subscription(subscription, event_created) is None:
+        print(f"Skipping subscription.deleted for {subscription.id}: a newer event was already applied")
+        return
+    forget_stripe_subscription(phone_number, subscription.id, event_created)
 
     # Remove premium status from DynamoDB
     try:
@@ -310,12 +825,29 @@ def handle_subscription_deleted(subscription):
         print(f"Premium status removed for {phone_number}")
     except Exception as e:
         print(f"Error removing premium status: {e}")
+        # Fail the event so the queue retries it
+        raise
+
+def invoice_subscription(invoice):
+    """Stored metadata of an invoice's subscription, or None for one-off invoices and subscriptions without a phone number"""
+    subscription_id = getattr(invoice, 'subscription', None)
+    if not subscription_id:
+        print(f"Ignoring invoice {getattr(invoice, 'id', None)} without a subscription")
+        return None
+
+    subscription = get_subscription_metadata(subscription_id)
+    if not subscription.get('phone_number'):
+        print(f"Ignoring invoice {getattr(invoice, 'id', None)}: subscription {subscription_id} has no phone number")
+        return None
+    return subscription
 
 def handle_payment_succeeded(invoice):
     """Handle successful payment"""
+    subscription = invoice_subscription(invoice)
+    if subscription is None:
+        return
     subscription_id = invoice.subscription
-    subscription = stripe.Subscription.retrieve(subscription_id)
-    phone_number = subscription.metadata.get('phone_number')
+    phone_number = subscription['phone_number']
 
     print(f"Payment succeeded for {phone_number}")
 
@@ -325,7 +857,7 @@ def handle_payment_succeeded(invoice):
         from datetime import datetime, timedelta
 
         table = get_premium_table()
-        plan_type = subscription.metadata.get('plan_type', 'monthly')
+        plan_type = subscription.get('plan_type') or 'monthly'
 
         # Calculate new subscription end date
         if plan_type == 'monthly':
@@ -344,7 +876,7 @@ def handle_payment_succeeded(invoice):
             'subscription_type': plan_type,
             'subscription_start': datetime.utcnow().isoformat(),
             'subscription_end': subscription_end.isoformat(),
-            'stripe_subscription_id': subscription.id,
+            'stripe_subscription_id': subscription_id,
             'features': [
                 'basic_dream_storage',
                 'basic_interpretations',
@@ -359,12 +891,15 @@ def handle_payment_succeeded(invoice):
         print(f"Premium access extended for {phone_number}")
     except Exception as e:
         print(f"Error extending premium access: {e}")
+        # Fail the event so the queue retries it
+        raise
 
 def handle_payment_failed(invoice):
     """Handle failed payment"""
-    subscription_id = invoice.subscription
-    subscription = stripe.Subscription.retrieve(subscription_id)
-    phone_number = subscription.metadata.get('phone_number')
+    subscription = invoice_subscription(invoice)
+    if subscription is None:
+        return
+    phone_number = subscription['phone_number']
 
     print(f"Payment failed for {phone_number}")
     # Handle failed payment (send email, mark for review, etc.)
@@ -373,46 +908,14 @@ def handle_payment_failed(invoice):
 @cross_origin(supports_credentials=True)
 @require_auth
 def get_stripe_subscription_status(phone_number):
-    """Get subscription status from Stripe"""
+    """Get subscription status from the webhook-maintained projection (Stripe only on first read)"""
     try:
-        # Find customer by phone number
-        customers = stripe.Customer.list(limit=100)
-        customer = None
-
-        for cust in customers.data:
-            if cust.metadata.get('phone_number') == phone_number:
-                customer = cust
-                break
-
-        if not customer:
-            return jsonify({
-                'has_subscription': False,
-                'subscription': None
-            }), 200
-
-        # Get active subscriptions
-        subscriptions = stripe.Subscription.list(
-            customer=customer.id,
-            status='active'
-        )
-
-        if not subscriptions.data:
-            return jsonify({
-                'has_subscription': False,
-                'subscription': None
-            }), 200
-
-        subscription = subscriptions.data[0]
+        subscription, synced_at = get_subscription_status(phone_number)
 
         return jsonify({
-            'has_subscription': True,
-            'subscription': {
-                'id': subscription.id,
-                'status': subscription.status,
-                'current_period_end': subscription.current_period_end,
-                'plan_type': subscription.metadata.get('plan_type'),
-                'cancel_at_period_end': subscription.cancel_at_period_end
-            }
+            'has_subscription': subscription is not None,
+            'subscription': subscription,
+            'synced_at': synced_at
         }), 200
 
     except Exception as e:
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the dream analysis pipeline.
+
+Generates deterministic synthetic dream corpora from the analysis lexicons,
+times each analyzer and the end-to-end advanced analysis, records peak
+memory, and compares the results against a stored baseline.
+
+Usage (from src/):
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --sizes 10 100 --repeat 5
+    python benchmarks/run_benchmarks.py --update-baseline
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+from app import dream_analysis  # noqa: E402
+
+DEFAULT_SIZES = [10, 100, 1000, 10000]
+DEFAULT_BASELINE = Path(__file__).resolve().parent / 'baseline.json'
+SEED = 20240101
+
+# Differences below these are timer and allocator noise, not regressions
+MIN_SECONDS_DELTA = 0.001
+MIN_PEAK_KB_DELTA = 64
+
+FILLER_WORDS = [
+    'i', 'was', 'the', 'a', 'and', 'in', 'my', 'with', 'then', 'there', 'we', 'it',
+    'old', 'strange', 'somewhere', 'suddenly', 'looked', 'went', 'saw', 'felt', 'because', 'but'
+]
+
+def build_vocabulary():
+    """Word pools drawn from the analysis lexicons"""
+    archetype_words = sorted({keyword for info in dream_analysis.DREAM_ARCHETYPES.values() for keyword in info['keywords']})
+    emotion_words = sorted({word for words in dream_analysis.EMOTION_WORDS.values() for word in words})
+    temporal_words = sorted({
+        word
+        for patterns in dream_analysis.TEMPORAL_PATTERNS.values()
+        for word in patterns['explicit'] + patterns['implicit']
+    })
+    return {
+        'archetype': archetype_words,
+        'emotion': emotion_words,
+        'symbol': sorted(dream_analysis.DREAM_SYMBOLS),
+        'temporal': temporal_words,
+        'filler': FILLER_WORDS
+    }
+
+def generate_corpus(size: int, seed: int = SEED) -> list:
+    """Deterministic synthetic dreams, oldest first, shaped like stored dream documents"""
+    rng = random.Random(seed + size)
+    vocabulary = build_vocabulary()
+    # Mostly filler with a sprinkling of lexicon words, like real dream text
+    pools = ['filler'] * 12 + ['symbol'] * 3 + ['emotion'] * 2 + ['archetype'] * 2 + ['temporal']
+    start = datetime(2023, 1, 1)
+
+    dreams = []
+    for index in range(size):
+        words = [rng.choice(vocabulary[rng.choice(pools)]) for _ in range(rng.randint(40, 160))]
+        summary = [rng.choice(vocabulary[rng.choice(pools)]) for _ in range(rng.randint(8, 24))]
+        dreams.append({
+            'id': f'dream-{index}',
+            'dreamContent': ' '.join(words).capitalize() + '.',
+            'summary': ' '.join(summary).capitalize() + '.',
+            'response': 'Synthetic interpretation.',
+            'createdAt': (start + timedelta(hours=7 * index)).isoformat()
+        })
+    return dreams
+
+def benchmark_stages(dreams: list) -> dict:
+    """Stage name -> callable, each running one part of the pipeline on the corpus"""
+    features = dream_analysis.dream_features(dreams)
+    aggregate = dream_analysis.build_dream_aggregate(features)
+    return {
+        'extract_dream_features': lambda: dream_analysis.dream_features(dreams),
+        'build_dream_aggregate': lambda: dream_analysis.build_dream_aggregate(features),
+        'analyze_archetypes_in_dreams': lambda: dream_analysis.analyze_archetypes_in_dreams(aggregate),
+        'analyze_emotional_patterns': lambda: dream_analysis.analyze_emotional_patterns(aggregate),
+        'analyze_temporal_patterns': lambda: dream_analysis.analyze_temporal_patterns(aggregate),
+        'analyze_symbol_evolution': lambda: dream_analysis.analyze_symbol_evolution(aggregate),
+        'generate_personal_insights': lambda: dream_analysis.generate_personal_insights(aggregate),
+        'generate_recommendations': lambda: dream_analysis.generate_recommendations(aggregate),
+        'analyze_dream_archetypes': lambda: dream_analysis.analyze_dream_archetypes(aggregate),
+        'analyze_psychological_patterns': lambda: dream_analysis.analyze_psychological_patterns(aggregate),
+        'perform_advanced_analysis': lambda: dream_analysis.perform_advanced_analysis(dreams)
+    }
+
+def measure(stage, repeat: int) -> dict:
+    """Best wall time over repeat runs, then peak traced memory from one more run"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        stage()
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        stage()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': round(min(timings), 6), 'peak_kb': round(peak / 1024, 1)}
+
+def run_benchmarks(sizes: list, repeat: int) -> dict:
+    """Results as {size: {stage: {seconds, peak_kb}}}"""
+    results = {}
+    for size in sizes:
+        dreams = generate_corpus(size)
+        # Large corpora are slow end to end; a single timed run is enough there
+        runs = repeat if size < 10000 else 1
+        print(f"📊 {size} dreams ({runs} run{'s' if runs != 1 else ''} per stage)")
+        results[str(size)] = {}
+        for name, stage in benchmark_stages(dreams).items():
+            result = measure(stage, runs)
+            results[str(size)][name] = result
+            print(f"   {name:<32} {result['seconds'] * 1000:>10.2f} ms {result['peak_kb']:>12.1f} KB")
+    return results
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions as human readable lines; stages or sizes missing from the baseline are skipped"""
+    regressions = []
+    for size, stages in results.items():
+        for name, result in stages.items():
+            expected = baseline.get(size, {}).get(name)
+            if not expected:
+                continue
+            for metric, unit, scale, noise in (
+                ('seconds', 'ms', 1000, MIN_SECONDS_DELTA),
+                ('peak_kb', 'KB', 1, MIN_PEAK_KB_DELTA)
+            ):
+                limit = max(expected[metric] * (1 + tolerance), expected[metric] + noise)
+                if result[metric] > limit:
+                    regressions.append(
+                        f"{size} dreams / {name}: {result[metric] * scale:.2f} {unit} "
+                        f"(baseline {expected[metric] * scale:.2f} {unit})"
+                    )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dream analysis pipeline")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="Corpus sizes to benchmark")
+    parser.add_argument('--repeat', type=int, default=3, help="Timed runs per stage (the best is kept)")
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE, help="Baseline results file")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown over the baseline (0.25 = 25%%)")
+    parser.add_argument('--update-baseline', action='store_true', help="Store these results as the new baseline")
+    parser.add_argument('--output', type=Path, help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.repeat)
+    document = {
+        'generatedAt': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results
+    }
+
+    if args.output:
+        args.output.write_text(json.dumps(document, indent=2) + '\n')
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(document, indent=2) + '\n')
+        print(f"✅ Baseline written to {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print(f"⚠️  No baseline at {args.baseline}; run with --update-baseline to create one")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare_to_baseline(results, baseline.get('results', {}), args.tolerance)
+    if regressions:
+        print(f"❌ {len(regressions)} regression(s) against the baseline:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+
+    print("✅ No regressions against the baseline")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -37,6 +37,14 @@ def app():
     with app.app_context():
         yield app
 
+@pytest.fixture(autouse=True)
+def clear_entitlement_cache():
+    """Keep cached premium answers from leaking between tests that reuse a phone number."""
+    from app.premium import clear_entitlement_cache
+    clear_entitlement_cache()
+    yield
+    clear_entitlement_cache()
+
 @pytest.fixture
 def client(app):
     """Create a test client for the Flask application."""
@@ -150,7 +158,7 @@ def mock_s3_client():
     mock_client.get_object = Mock(side_effect=mock_get_object)
     
     # Mock the list_objects_v2 method
-    def mock_list_objects_v2(Bucket, Prefix, MaxKeys=1000, ContinuationToken=None):
+    def mock_list_objects_v2(Bucket, Prefix, MaxKeys=1000, ContinuationToken=None, Delimiter=None):
         # Return different results based on the prefix
         if '1234567890' in Prefix:
             # Return a list of dream objects - return 15 for pagination tests, 2 for others
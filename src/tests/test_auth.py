@@ -0,0 +1,216 @@
+"""
+Tests for Cognito token verification.
+"""
+
+import json
+import time
+import pytest
+import jwt
+from unittest.mock import Mock, patch
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+
+@pytest.fixture
+def signing_key():
+    """An RSA key pair standing in for a Cognito signing key."""
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(autouse=True)
+def reset_auth_caches():
+    """Start every test with empty JWKS and verified token caches."""
+    import app.auth as auth
+
+    auth.clear_cognito_public_keys()
+    auth.clear_verified_token_cache()
+    with patch.object(auth, 'COGNITO_JWKS_SNAPSHOT', ''):
+        yield
+    auth.clear_cognito_public_keys()
+    auth.clear_verified_token_cache()
+
+
+def make_jwks(private_key, kid):
+    """JWKS document publishing the public half of private_key under kid."""
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({'kid': kid, 'alg': 'RS256', 'use': 'sig'})
+    return {'keys': [jwk]}
+
+
+def make_token(private_key, kid, expires_in=3600):
+    """Cognito-shaped ID token signed with private_key."""
+    from app.auth import COGNITO_REGION, COGNITO_USER_POOL_ID, COGNITO_APP_CLIENT_ID
+
+    claims = {
+        'sub': 'user-1',
+        'phone_number': '+1234567890',
+        'aud': COGNITO_APP_CLIENT_ID,
+        'iss': f'https://cognito-idp.{COGNITO_REGION}.amazonaws.com/{COGNITO_USER_POOL_ID}',
+        'exp': int(time.time()) + expires_in
+    }
+    return jwt.encode(claims, private_key, algorithm='RS256', headers={'kid': kid})
+
+
+class TestVerifiedTokenCache:
+    """Test caching of verified token claims."""
+
+    def test_repeat_verification_skips_signature_check(self, signing_key):
+        from app.auth import verify_cognito_token, get_verified_token_cache_stats
+
+        token = make_token(signing_key, 'key-1')
+        with patch('app.auth.requests.get', return_value=Mock(json=Mock(return_value=make_jwks(signing_key, 'key-1')))):
+            first = verify_cognito_token(token)
+            with patch('app.auth.jwt.decode') as mock_decode:
+                second = verify_cognito_token(token)
+
+        assert first['sub'] == 'user-1'
+        assert second == first
+        mock_decode.assert_not_called()
+        assert get_verified_token_cache_stats() == {'hits': 1, 'misses': 1, 'size': 1}
+
+    def test_expired_entries_are_not_served(self, signing_key):
+        from app.auth import verify_cognito_token, cache_verified_token, get_cached_token_claims, token_digest
+
+        token = make_token(signing_key, 'key-1')
+        cache_verified_token(token_digest(token), 'key-1', {'sub': 'user-1', 'exp': time.time() + 60})
+
+        with patch('app.auth.time.time', return_value=time.time() + 120):
+            assert get_cached_token_claims(token_digest(token)) is None
+
+        assert verify_cognito_token('not-a-token') is None
+
+    def test_rotated_keys_purge_their_tokens(self, signing_key):
+        from app.auth import cache_verified_token, get_cached_token_claims, get_cognito_public_keys
+
+        exp = time.time() + 3600
+        cache_verified_token('old', 'key-1', {'sub': 'user-1', 'exp': exp})
+        cache_verified_token('current', 'key-2', {'sub': 'user-2', 'exp': exp})
+
+        with patch('app.auth.requests.get', return_value=Mock(json=Mock(return_value=make_jwks(signing_key, 'key-2')))):
+            get_cognito_public_keys()
+
+        assert get_cached_token_claims('old') is None
+        assert get_cached_token_claims('current')['sub'] == 'user-2'
+
+    def test_cache_is_bounded(self):
+        import app.auth as auth
+
+        exp = time.time() + 3600
+        with patch.object(auth, 'VERIFIED_TOKEN_CACHE_SIZE', 2):
+            for digest in ('a', 'b', 'c'):
+                auth.cache_verified_token(digest, 'key-1', {'exp': exp})
+
+        assert auth.get_cached_token_claims('a') is None
+        assert auth.get_cached_token_claims('c') is not None
+
+
+def jwks_response(jwks):
+    """Mock requests.get response carrying a JWKS document."""
+    return Mock(json=Mock(return_value=jwks))
+
+
+class TestCognitoKeyIndex:
+    """Test the parsed JWKS key index and its refresh policy."""
+
+    def test_keys_are_parsed_once_per_fetch(self, signing_key):
+        from app.auth import get_public_key
+
+        token = make_token(signing_key, 'key-1')
+        with patch('app.auth.requests.get', return_value=jwks_response(make_jwks(signing_key, 'key-1'))) as mock_get, \
+             patch('app.auth.jwt.algorithms.RSAAlgorithm.from_jwk', wraps=jwt.algorithms.RSAAlgorithm.from_jwk) as mock_from_jwk:
+            first = get_public_key(token)
+            second = get_public_key(token)
+
+        assert first is second
+        assert mock_get.call_count == 1
+        assert mock_from_jwk.call_count == 1
+
+    def test_expiring_keys_are_served_while_refreshing(self, signing_key):
+        import app.auth as auth
+        from datetime import datetime
+
+        token = make_token(signing_key, 'key-1')
+        auth.install_cognito_jwks(make_jwks(signing_key, 'key-1'), datetime.utcnow())
+
+        with patch('app.auth.requests.get', return_value=jwks_response(make_jwks(signing_key, 'key-1'))) as mock_get:
+            assert auth.get_public_key(token) is not None
+            auth._jwks_refresh_thread.join(5)
+
+        mock_get.assert_called_once()
+        assert auth._jwks_cache_expiry > datetime.utcnow()
+
+    def test_unknown_kid_forces_rate_limited_refresh(self, signing_key):
+        from app.auth import get_public_key
+
+        rotated_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        responses = [jwks_response(make_jwks(signing_key, 'key-1')), jwks_response(make_jwks(rotated_key, 'key-2'))]
+        with patch('app.auth.requests.get', side_effect=responses) as mock_get:
+            assert get_public_key(make_token(signing_key, 'key-1')) is not None
+            assert get_public_key(make_token(rotated_key, 'key-2')) is not None
+            assert get_public_key(make_token(rotated_key, 'key-3')) is None
+
+        assert mock_get.call_count == 2
+
+    def test_cold_start_uses_bundled_snapshot(self, signing_key, tmp_path):
+        import app.auth as auth
+
+        snapshot = tmp_path / 'cognito_jwks.json'
+        snapshot.write_text(json.dumps(make_jwks(signing_key, 'key-1')))
+
+        with patch.object(auth, 'COGNITO_JWKS_SNAPSHOT', str(snapshot)), \
+             patch.object(auth, 'refresh_cognito_public_keys_in_background') as mock_refresh, \
+             patch('app.auth.requests.get') as mock_get:
+            assert auth.verify_cognito_token(make_token(signing_key, 'key-1'))['sub'] == 'user-1'
+
+        mock_get.assert_not_called()
+        mock_refresh.assert_called_once()
+
+
+class TestAuthContext:
+    """Test the request-scoped auth context."""
+
+    def make_app(self):
+        from flask import Flask
+        from app.auth import require_cognito_auth, get_auth_context
+        from app.premium import require_premium
+
+        test_app = Flask(__name__)
+
+        @test_app.route('/premium/<phone_number>')
+        @require_cognito_auth
+        @require_premium
+        def premium_route(phone_number):
+            context = get_auth_context()
+            return {'phone_number': context.phone_number, 'premium': context.has_premium(), 'groups': context.groups}
+
+        return test_app
+
+    def test_decorators_share_one_context(self):
+        claims = {'sub': 'user-1', 'phone_number': '+1234567890', 'cognito:groups': ['beta']}
+        with patch('app.auth.verify_cognito_token', return_value=claims), \
+             patch('app.premium.is_premium_user', return_value=True) as mock_premium, \
+             patch('app.premium.get_cognito_user_info') as mock_user_info:
+            response = self.make_app().test_client().get('/premium/1234567890', headers={'Authorization': 'Bearer token'})
+
+        assert response.status_code == 200
+        assert response.get_json() == {'phone_number': '1234567890', 'premium': True, 'groups': ['beta']}
+        mock_premium.assert_called_once_with('1234567890')
+        mock_user_info.assert_not_called()
+
+    def test_user_info_comes_from_context(self):
+        from flask import Flask
+        from app.auth import require_cognito_auth, get_cognito_user_info
+
+        test_app = Flask(__name__)
+
+        @test_app.route('/me')
+        @require_cognito_auth
+        def me():
+            first = get_cognito_user_info()
+            assert get_cognito_user_info() is first
+            return first
+
+        with patch('app.auth.verify_cognito_token', return_value={'sub': 'user-1', 'phone_number': '+1234567890'}):
+            response = test_app.test_client().get('/me', headers={'Authorization': 'Bearer token'})
+
+        assert response.get_json()['phone_number'] == '+1234567890'
+        assert response.get_json()['cognito_groups'] == []
@@ -0,0 +1,39 @@
+"""
+Tests for DynamoDB table provisioning.
+"""
+
+import boto3
+from moto import mock_aws
+
+
+@mock_aws
+class TestBootstrap:
+    """Test the explicit table bootstrap."""
+
+    def test_missing_tables_are_created_once(self):
+        from app.bootstrap import ensure_tables
+
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+
+        first = ensure_tables(dynamodb)
+        second = ensure_tables(dynamodb)
+
+        assert set(first.values()) == {'created'}
+        assert set(second.values()) == {'exists'}
+        assert sorted(first) == sorted(table.name for table in dynamodb.tables.all())
+
+    def test_bootstrap_cli_command(self, app):
+        from unittest.mock import patch
+
+        with patch('app.bootstrap.ensure_tables', return_value={'dream-companion-premium-users': 'created'}):
+            result = app.test_cli_runner().invoke(args=['bootstrap'])
+
+        assert result.exit_code == 0
+        assert 'dream-companion-premium-users: created' in result.output
+
+    def test_table_handles_are_reused(self):
+        from app.premium import get_premium_table
+        from app.feedback import get_feedback_table
+
+        assert get_premium_table() is get_premium_table()
+        assert get_feedback_table() is get_feedback_table()
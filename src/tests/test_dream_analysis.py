@@ -0,0 +1,287 @@
+"""
+Tests for the dream analysis repository and aggregate.
+"""
+
+import json
+import pytest
+from unittest.mock import Mock
+from datetime import datetime
+
+from tests.test_dream_store import make_s3_client
+
+
+@pytest.fixture(autouse=True)
+def clear_corpus_cache():
+    """Start every test with an empty corpus cache."""
+    from app.dream_analysis import clear_dream_corpus_cache
+    clear_dream_corpus_cache()
+    yield
+    clear_dream_corpus_cache()
+
+
+def make_corpus_client(count=3):
+    """Mock S3 client holding `count` dreams under the new and legacy paths."""
+    objects = []
+    stored = {}
+    for i in range(count):
+        key = f'1234567890/dreams/d{i}.json' if i % 2 else f'1234567890/d{i}.json'
+        objects.append({'Key': key, 'LastModified': datetime(2024, 1, i + 1), 'Size': 1, 'ETag': f'"{i}"'})
+        stored[key] = json.dumps({'id': f'd{i}', 'dreamContent': f'dream {i}'})
+    client = make_s3_client({
+        '1234567890/dreams/': [obj for obj in objects if '/dreams/' in obj['Key']],
+        '1234567890/': [obj for obj in objects if '/dreams/' not in obj['Key']]
+                       + [{'Key': '1234567890/metadata.json', 'LastModified': datetime(2024, 6, 1)}]
+    }, stored)
+    return client
+
+
+class TestDreamRepository:
+    """Test loading and sharing a user's analysis aggregate."""
+
+    def test_aggregate_is_shared_between_loads(self):
+        from app.dream_analysis import DreamRepository
+
+        client = make_corpus_client(3)
+        DreamRepository(client, 'bucket').load_aggregate('1234567890')
+        calls = client.get_object.call_count
+
+        aggregate = DreamRepository(client, 'bucket').load_aggregate('1234567890')
+
+        assert client.get_object.call_count == calls
+        assert aggregate['dream_count'] == 3
+
+    def test_aggregate_is_shared_within_a_request(self, app):
+        from app.dream_analysis import DreamRepository, clear_dream_corpus_cache
+
+        client = make_corpus_client(2)
+        with app.test_request_context():
+            first = DreamRepository(client, 'bucket').load_aggregate('1234567890')
+            clear_dream_corpus_cache()
+            calls = client.get_object.call_count
+            second = DreamRepository(client, 'bucket').load_aggregate('1234567890')
+
+        assert second is first
+        assert client.get_object.call_count == calls
+
+    def test_expired_aggregate_is_reloaded(self):
+        from app.dream_analysis import DreamRepository
+
+        client = make_corpus_client(2)
+        DreamRepository(client, 'bucket', ttl=0).load_aggregate('1234567890')
+        calls = client.get_object.call_count
+
+        DreamRepository(client, 'bucket', ttl=-1).load_aggregate('1234567890')
+
+        assert client.get_object.call_count > calls
+
+    def test_features_are_fetched_only_for_the_given_entries(self):
+        from app.dream_analysis import DreamRepository
+
+        client = make_corpus_client(5)
+        repository = DreamRepository(client, 'bucket')
+        entries = repository.list_dream_entries('1234567890')[:2]
+        features = repository._features_for('1234567890', entries, prune=False)
+
+        assert [record['key'] for record in features] == ['1234567890/d4.json', '1234567890/dreams/d3.json']
+        fetched = [call.kwargs['Key'] for call in client.get_object.call_args_list]
+        assert '1234567890/d0.json' not in fetched
+
+    def test_unreadable_dreams_are_skipped_and_not_refetched(self):
+        from app.dream_analysis import DreamRepository, clear_dream_corpus_cache
+
+        client = make_corpus_client(2)
+        client.stored['1234567890/d0.json'] = 'not json'
+
+        aggregate = DreamRepository(client, 'bucket').load_aggregate('1234567890')
+        assert list(aggregate['dreams']) == ['1234567890/dreams/d1.json']
+
+        clear_dream_corpus_cache()
+        client.get_object.reset_mock()
+        DreamRepository(client, 'bucket').load_aggregate('1234567890')
+
+        fetched = [call.kwargs['Key'] for call in client.get_object.call_args_list]
+        assert '1234567890/d0.json' not in fetched
+
+    def test_user_without_dreams(self):
+        from app.dream_analysis import DreamRepository
+
+        assert DreamRepository(make_s3_client(), 'bucket').load_aggregate('1234567890') is None
+
+
+def load_features(client):
+    """Feature records for every dream in a corpus client, newest first."""
+    from app.dream_analysis import DreamRepository
+
+    repository = DreamRepository(client, 'bucket')
+    return repository._features_for('1234567890', repository.list_dream_entries('1234567890'), prune=True)
+
+
+class TestDreamFeatures:
+    """Test per-dream feature records and their persisted cache."""
+
+    def test_features_match_raw_analysis(self):
+        from app.dream_analysis import extract_dream_features, analyze_archetypes_in_dreams, analyze_emotional_patterns
+
+        dreams = [
+            {'dreamContent': 'I was swimming in the ocean and felt scared', 'summary': 'Ocean swim', 'createdAt': '2024-01-01'},
+            {'dreamContent': 'Flying above the clouds, so happy', 'summary': 'Flight', 'createdAt': '2024-01-02'}
+        ]
+        features = [extract_dream_features(dream) for dream in dreams]
+
+        assert analyze_archetypes_in_dreams(features) == analyze_archetypes_in_dreams(dreams)
+        assert analyze_emotional_patterns(features) == analyze_emotional_patterns(dreams)
+        assert features[0]['archetypes'] == ['water']
+        assert features[0]['emotions'] == ['fear']
+        assert json.loads(json.dumps(features[0])) == features[0]
+
+    def test_features_are_persisted_and_reused(self):
+        from app.dream_store import features_key
+
+        client = make_corpus_client(3)
+        features = load_features(client)
+        assert [record['key'] for record in features] == [
+            '1234567890/d2.json', '1234567890/dreams/d1.json', '1234567890/d0.json'
+        ]
+        assert features_key('1234567890') in client.stored
+
+        client.get_object.reset_mock()
+        load_features(client)
+
+        fetched = [call.kwargs['Key'] for call in client.get_object.call_args_list]
+        assert not [key for key in fetched if key.endswith(('d0.json', 'd1.json', 'd2.json'))]
+
+    def test_changed_dreams_are_rescored(self):
+        from app.dream_store import features_key
+
+        client = make_corpus_client(2)
+        load_features(client)
+
+        document = json.loads(client.stored[features_key('1234567890')])
+        document['features']['1234567890/d0.json']['etag'] = 'old'
+        client.stored[features_key('1234567890')] = json.dumps(document)
+
+        client.get_object.reset_mock()
+        load_features(client)
+
+        fetched = [call.kwargs['Key'] for call in client.get_object.call_args_list]
+        assert '1234567890/d0.json' in fetched
+        assert '1234567890/dreams/d1.json' not in fetched
+
+
+class TestTokenizedDream:
+    """Test the shared per-dream tokenisation."""
+
+    def test_tokens_and_content_boundary(self):
+        from app.dream_analysis import TokenizedDream
+
+        dream_tokens = TokenizedDream({'dreamContent': 'I was Flying, then fell!', 'summary': 'A falling dream'})
+
+        assert dream_tokens.tokens == ['i', 'was', 'flying,', 'then', 'fell!', 'a', 'falling', 'dream']
+        assert dream_tokens.content_token_count == 5
+        assert dream_tokens.content_words() == ['i', 'was', 'flying', 'then', 'fell']
+        assert 'fall' in dream_tokens.hits[('archetype', 'falling')]
+        assert ('archetype', 'falling') not in dream_tokens.content_hits
+
+    def test_token_indices_cover_matched_and_unknown_keywords(self):
+        from app.dream_analysis import TokenizedDream
+
+        dream_tokens = TokenizedDream({'dreamContent': 'the catcat sat by a cat door', 'summary': ''})
+
+        assert dream_tokens.token_indices('cat') == [1, 5]
+        assert dream_tokens.token_indices('at') == [1, 2, 5]
+
+    def test_stages_share_one_tokenisation(self):
+        from app.dream_analysis import TokenizedDream, analyze_temporal_relationships, extract_symbol_context
+
+        dream_tokens = TokenizedDream({'dreamContent': 'we ran to the house then the house vanished', 'summary': ''})
+
+        relationships = analyze_temporal_relationships(dream_tokens)
+        assert [(r['type'], r['connector']) for r in relationships] == [('sequence', 'then')]
+        assert relationships[0]['context'] == 'to the house then the house vanished'
+        assert set(extract_symbol_context(dream_tokens, 'house')) == {'ran', 'house', 'vanished'}
+
+
+def add_dream(client, key, created_at, content):
+    """Store a new dream in a corpus client and refresh its manifest entry."""
+    from app.dream_store import record_dream_in_manifest
+
+    client.stored[key] = json.dumps({'id': key, 'dreamContent': content, 'createdAt': created_at})
+    obj = {'Key': key, 'LastModified': datetime(2024, 2, 1), 'ContentLength': 1, 'ETag': f'"{key}"'}
+    client.head_object = Mock(return_value=dict(obj))
+    record_dream_in_manifest(client, 'bucket', '1234567890', obj)
+
+
+class TestDreamAggregate:
+    """Test the running per-user analysis aggregate."""
+
+    def test_rendering_from_aggregate_matches_dreams(self):
+        from app.dream_analysis import build_dream_aggregate, dream_features, perform_advanced_analysis, analyze_psychological_patterns
+
+        dreams = [
+            {'dreamContent': 'I was swimming in the ocean and felt scared', 'summary': 'Ocean swim', 'createdAt': '2024-01-01'},
+            {'dreamContent': 'Flying above the clouds, so happy', 'summary': 'Flight over the ocean', 'createdAt': '2024-01-02'},
+            {'dreamContent': 'Then the house fell and I was angry', 'summary': 'Falling house', 'createdAt': '2024-01-03'}
+        ]
+        aggregate = json.loads(json.dumps(build_dream_aggregate(dream_features(dreams))))
+
+        from_dreams = perform_advanced_analysis(dreams)
+        from_aggregate = perform_advanced_analysis(aggregate)
+        from_dreams.pop('analysis_date')
+        from_aggregate.pop('analysis_date')
+
+        assert json.dumps(from_aggregate, sort_keys=True) == json.dumps(from_dreams, sort_keys=True)
+        assert analyze_psychological_patterns(aggregate) == analyze_psychological_patterns(dreams)
+        assert aggregate['dream_count'] == 3
+
+    def test_new_dream_is_folded_without_refetching_history(self):
+        from app.dream_analysis import DreamRepository, clear_dream_corpus_cache
+
+        client = make_corpus_client(3)
+        aggregate = DreamRepository(client, 'bucket').load_aggregate('1234567890')
+        assert aggregate['dream_count'] == 3
+
+        add_dream(client, '1234567890/dreams/new.json', '2025-01-01', 'A flood of water everywhere')
+        clear_dream_corpus_cache()
+        client.get_object.reset_mock()
+
+        aggregate = DreamRepository(client, 'bucket').load_aggregate('1234567890')
+
+        fetched = [call.kwargs['Key'] for call in client.get_object.call_args_list]
+        assert '1234567890/dreams/new.json' in fetched
+        assert not [key for key in fetched if key.endswith(('d0.json', 'd1.json', 'd2.json'))]
+        assert aggregate['dream_count'] == 4
+        assert aggregate['archetype_counts'].get('water') == 1
+        assert aggregate['recent_archetypes'][0]['archetypes'] == ['water']
+
+    def test_deleted_dream_triggers_rebuild(self):
+        from app.dream_analysis import DreamRepository, clear_dream_corpus_cache
+        from app.dream_store import remove_dream_from_manifest
+
+        client = make_corpus_client(3)
+        DreamRepository(client, 'bucket').load_aggregate('1234567890')
+
+        remove_dream_from_manifest(client, 'bucket', '1234567890', '1234567890/d0.json')
+        clear_dream_corpus_cache()
+
+        aggregate = DreamRepository(client, 'bucket').load_aggregate('1234567890')
+
+        assert aggregate['dream_count'] == 2
+        assert '1234567890/d0.json' not in aggregate['dreams']
+
+    def test_s3_event_updates_stored_aggregate_in_place(self):
+        from app.dream_analysis import DreamRepository, apply_dream_analysis_event
+        from app.dream_store import aggregates_key
+
+        client = make_corpus_client(2)
+        DreamRepository(client, 'bucket').load_aggregate('1234567890')
+        add_dream(client, '1234567890/dreams/new.json', '2025-01-01', 'Flying like a bird')
+
+        event = {'Records': [
+            {'eventName': 'ObjectCreated:Put', 's3': {'bucket': {'name': 'bucket'}, 'object': {'key': '1234567890/dreams/new.json'}}}
+        ]}
+
+        assert apply_dream_analysis_event(client, event) == 1
+        stored = json.loads(client.stored[aggregates_key('1234567890')])
+        assert stored['dream_count'] == 3
+        assert '1234567890/dreams/new.json' in stored['dreams']
+        assert apply_dream_analysis_event(client, event) == 0
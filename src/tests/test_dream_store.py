@@ -0,0 +1,263 @@
+"""
+Tests for the dream storage helpers (S3 key layout and per-user manifest).
+"""
+
+import json
+import pytest
+from unittest.mock import Mock
+from datetime import datetime, timedelta
+
+
+def make_s3_client(objects_by_prefix=None, stored=None):
+    """Create a mock S3 client backed by an in-memory object store."""
+    objects_by_prefix = objects_by_prefix or {}
+    stored = {} if stored is None else stored
+    client = Mock()
+
+    class NoSuchKey(Exception):
+        pass
+
+    client.exceptions.NoSuchKey = NoSuchKey
+
+    def get_object(Bucket, Key):
+        if Key not in stored:
+            raise NoSuchKey()
+        return {'Body': Mock(read=Mock(return_value=stored[Key].encode('utf-8')))}
+
+    def put_object(Bucket, Key, Body, **kwargs):
+        stored[Key] = Body
+
+    def list_objects_v2(Bucket, Prefix, **kwargs):
+        return {'Contents': objects_by_prefix.get(Prefix, []), 'IsTruncated': False}
+
+    client.get_object = Mock(side_effect=get_object)
+    client.put_object = Mock(side_effect=put_object)
+    client.list_objects_v2 = Mock(side_effect=list_objects_v2)
+    client.stored = stored
+    return client
+
+
+class TestDreamKeys:
+    """Test dream key classification."""
+
+    def test_new_and_legacy_dreams_are_dreams(self):
+        from app.dream_store import is_dream_key
+
+        assert is_dream_key('1234567890/dreams/abc.json', '1234567890')
+        assert is_dream_key('1234567890/abc.json', '1234567890')
+
+    def test_non_dream_objects_are_excluded(self):
+        from app.dream_store import is_dream_key
+
+        assert not is_dream_key('1234567890/metadata.json', '1234567890')
+        assert not is_dream_key('1234567890/metadata', '1234567890')
+        assert not is_dream_key('1234567890/themes.txt', '1234567890')
+        assert not is_dream_key('1234567890/_index/manifest.json', '1234567890')
+        assert not is_dream_key('1234567890/dreams/', '1234567890')
+        assert not is_dream_key('9999999999/abc.json', '1234567890')
+
+
+class TestDreamManifest:
+    """Test building, loading and updating the dream manifest."""
+
+    def test_rebuild_dedups_and_sorts_newest_first(self):
+        from app.dream_store import rebuild_dream_manifest, manifest_key
+
+        new_dream = {'Key': '1234567890/dreams/new.json', 'LastModified': datetime(2024, 3, 1), 'Size': 10, 'ETag': '"n"'}
+        old_dream = {'Key': '1234567890/old.json', 'LastModified': datetime(2024, 1, 1), 'Size': 20, 'ETag': '"o"'}
+        client = make_s3_client({
+            '1234567890/dreams/': [new_dream],
+            '1234567890/': [new_dream, old_dream,
+                            {'Key': '1234567890/themes.txt', 'LastModified': datetime(2024, 5, 1)},
+                            {'Key': '1234567890/_index/manifest.json', 'LastModified': datetime(2024, 5, 1)}]
+        })
+
+        manifest = rebuild_dream_manifest(client, 'bucket', '1234567890')
+
+        assert [entry['key'] for entry in manifest['dreams']] == ['1234567890/dreams/new.json', '1234567890/old.json']
+        assert manifest['dreams'][0]['etag'] == 'n'
+        assert manifest['dreams'][1]['size'] == 20
+        assert manifest_key('1234567890') in client.stored
+
+    def test_fresh_manifest_is_served_without_listing(self):
+        from app.dream_store import get_dream_manifest, manifest_key
+
+        manifest = {
+            'version': 1,
+            'generatedAt': datetime.utcnow().isoformat(),
+            'dreams': [{'key': '1234567890/a.json', 'createdAt': '2024-01-01T00:00:00', 'size': 1, 'etag': 'a'}]
+        }
+        client = make_s3_client(stored={manifest_key('1234567890'): json.dumps(manifest)})
+
+        result = get_dream_manifest(client, 'bucket', '1234567890')
+
+        assert result['dreams'] == manifest['dreams']
+        client.list_objects_v2.assert_not_called()
+
+    def test_stale_manifest_is_rebuilt(self):
+        from app.dream_store import get_dream_manifest, manifest_key
+
+        manifest = {
+            'version': 1,
+            'generatedAt': (datetime.utcnow() - timedelta(days=1)).isoformat(),
+            'dreams': []
+        }
+        client = make_s3_client(
+            {'1234567890/': [{'Key': '1234567890/a.json', 'LastModified': datetime(2024, 1, 1), 'Size': 1}]},
+            stored={manifest_key('1234567890'): json.dumps(manifest)}
+        )
+
+        result = get_dream_manifest(client, 'bucket', '1234567890')
+
+        assert [entry['key'] for entry in result['dreams']] == ['1234567890/a.json']
+
+    def test_record_and_remove_dream(self):
+        from app.dream_store import rebuild_dream_manifest, record_dream_in_manifest, remove_dream_from_manifest
+
+        client = make_s3_client({
+            '1234567890/': [{'Key': '1234567890/a.json', 'LastModified': datetime(2024, 1, 1), 'Size': 1}]
+        })
+        rebuild_dream_manifest(client, 'bucket', '1234567890')
+
+        manifest = record_dream_in_manifest(client, 'bucket', '1234567890', {
+            'Key': '1234567890/dreams/b.json', 'LastModified': datetime(2024, 2, 1), 'ContentLength': 5, 'ETag': '"b"'
+        })
+        assert [entry['key'] for entry in manifest['dreams']] == ['1234567890/dreams/b.json', '1234567890/a.json']
+        assert manifest['dreams'][0]['size'] == 5
+
+        manifest = remove_dream_from_manifest(client, 'bucket', '1234567890', '1234567890/a.json')
+        assert [entry['key'] for entry in manifest['dreams']] == ['1234567890/dreams/b.json']
+
+    def test_apply_s3_event_ignores_non_dream_keys(self):
+        from app.dream_store import apply_s3_event
+
+        client = make_s3_client()
+        client.head_object = Mock(return_value={'LastModified': datetime(2024, 1, 1), 'ContentLength': 3, 'ETag': '"x"'})
+        event = {'Records': [
+            {'eventName': 'ObjectCreated:Put', 's3': {'bucket': {'name': 'bucket'}, 'object': {'key': '1234567890/dreams/x.json'}}},
+            {'eventName': 'ObjectCreated:Put', 's3': {'bucket': {'name': 'bucket'}, 'object': {'key': '1234567890/_index/manifest.json'}}}
+        ]}
+
+        assert apply_s3_event(client, event) == 1
+        client.head_object.assert_called_once_with(Bucket='bucket', Key='1234567890/dreams/x.json')
+
+
+def make_paginated_s3_client(keys_by_prefix):
+    """Create a mock S3 client whose list_objects_v2 honours MaxKeys and continuation tokens."""
+    client = Mock()
+
+    def list_objects_v2(Bucket, Prefix, MaxKeys=1000, ContinuationToken=None, Delimiter=None):
+        keys = keys_by_prefix.get(Prefix, [])
+        start = int(ContinuationToken) if ContinuationToken else 0
+        page = keys[start:start + MaxKeys]
+        response = {
+            'Contents': [{'Key': key, 'LastModified': datetime(2024, 1, 1), 'Size': 1} for key in page],
+            'IsTruncated': start + MaxKeys < len(keys)
+        }
+        if response['IsTruncated']:
+            response['NextContinuationToken'] = str(start + MaxKeys)
+        return response
+
+    client.list_objects_v2 = Mock(side_effect=list_objects_v2)
+    return client
+
+
+class TestDreamListing:
+    """Test continuation-aware and cursor-based dream listing."""
+
+    def test_list_dream_objects_follows_continuation_tokens(self):
+        from app.dream_store import list_dream_objects
+
+        keys = [f'1234567890/dreams/{i:04d}.json' for i in range(2500)]
+        client = make_paginated_s3_client({'1234567890/dreams/': keys})
+
+        objects = list_dream_objects(client, 'bucket', '1234567890')
+
+        assert len(objects) == 2500
+        assert client.list_objects_v2.call_count == 4  # three pages of dreams/ plus the legacy root
+
+    def test_list_dream_page_walks_both_prefixes_with_cursor(self):
+        from app.dream_store import list_dream_page
+
+        client = make_paginated_s3_client({
+            '1234567890/dreams/': [f'1234567890/dreams/{i}.json' for i in range(5)],
+            '1234567890/': ['1234567890/legacy1.json', '1234567890/themes.txt', '1234567890/legacy2.json']
+        })
+
+        seen = []
+        cursor = ''
+        pages = 0
+        while cursor is not None:
+            objects, cursor = list_dream_page(client, 'bucket', '1234567890', 3, cursor)
+            assert len(objects) <= 3
+            seen.extend(obj['Key'] for obj in objects)
+            pages += 1
+
+        assert seen == [f'1234567890/dreams/{i}.json' for i in range(5)] + ['1234567890/legacy1.json', '1234567890/legacy2.json']
+        assert pages == 3
+
+    def test_invalid_cursor_is_rejected(self):
+        from app.dream_store import decode_cursor
+
+        with pytest.raises(ValueError):
+            decode_cursor('not-a-cursor', '1234567890')
+
+    def test_cursor_for_another_phone_is_rejected(self):
+        from app.dream_store import encode_cursor, list_dream_page
+
+        s3 = Mock()
+        with pytest.raises(ValueError):
+            list_dream_page(s3, 'bucket', '1234567890', 10, encode_cursor('5555555555', 0, 'token'))
+        s3.list_objects_v2.assert_not_called()
+
+
+class TestFetchConcurrently:
+    """Test the bounded S3 fan-out helper."""
+
+    def test_results_keep_input_order_and_record_errors(self):
+        from app.dream_store import fetch_concurrently
+
+        def fetch(item):
+            if item == 'bad':
+                raise ValueError('boom')
+            return item.upper()
+
+        stats = {}
+        results = fetch_concurrently(fetch, ['a', 'bad', 'c'], max_workers=2, stats=stats)
+
+        assert [(item, result) for item, result, _ in results] == [('a', 'A'), ('bad', None), ('c', 'C')]
+        assert isinstance(results[1][2], ValueError)
+        assert stats['requested'] == 3
+        assert stats['succeeded'] == 2
+        assert stats['failed'] == 1
+        assert stats['timedOut'] == 0
+
+    def test_items_past_the_deadline_time_out(self):
+        import threading
+        from app.dream_store import fetch_concurrently
+
+        release = threading.Event()
+
+        def fetch(item):
+            if item == 'slow':
+                release.wait(5)
+            return item
+
+        stats = {}
+        try:
+            results = fetch_concurrently(fetch, ['fast', 'slow'], max_workers=2, deadline=0.2, stats=stats)
+        finally:
+            release.set()
+
+        assert results[0] == ('fast', 'fast', None)
+        assert isinstance(results[1][2], TimeoutError)
+        assert stats['timedOut'] == 1
+        assert stats['failed'] == 0
+
+    def test_shared_client_pool_matches_worker_count(self):
+        from app.dream_store import get_shared_s3_client, DREAM_FETCH_WORKERS
+
+        client = get_shared_s3_client()
+
+        assert client is get_shared_s3_client()
+        assert client.meta.config.max_pool_connections == DREAM_FETCH_WORKERS
@@ -0,0 +1,107 @@
+"""
+Tests for the webhook event queues.
+"""
+
+from unittest.mock import Mock
+
+
+class TestLocalEventQueues:
+    """Test the in-process and SQLite stand-ins."""
+
+    def test_events_are_applied_in_order(self):
+        from app.event_queue import InProcessEventQueue
+
+        applied = []
+        event_queue = InProcessEventQueue(applied.append)
+        for index in range(20):
+            event_queue.put(f'evt_{index}', f'payload-{index}')
+        event_queue.join()
+
+        assert applied == [f'payload-{index}' for index in range(20)]
+
+    def test_sqlite_queue_replays_unapplied_events(self, tmp_path):
+        from app.event_queue import SQLiteEventQueue
+
+        path = str(tmp_path / 'events.db')
+
+        def fail(payload):
+            raise RuntimeError('worker crashed')
+
+        failing = SQLiteEventQueue(fail, path, retry_delay=0)
+        failing.put('evt_1', 'first')
+        failing.put('evt_1', 'first')
+        failing.put('evt_2', 'second')
+        failing.join()
+
+        applied = []
+        restarted = SQLiteEventQueue(applied.append, path)
+        restarted.join()
+
+        assert applied == ['first', 'second']
+
+    def test_sqlite_queue_retries_before_moving_on(self, tmp_path):
+        from app.event_queue import SQLiteEventQueue
+
+        applied = []
+        failures = ['throttled', 'throttled']
+
+        def flaky(payload):
+            if payload == 'first' and failures:
+                raise RuntimeError(failures.pop())
+            applied.append(payload)
+
+        event_queue = SQLiteEventQueue(flaky, str(tmp_path / 'events.db'), retry_delay=0)
+        event_queue.put('evt_1', 'first')
+        event_queue.put('evt_2', 'second')
+        event_queue.join()
+
+        assert applied == ['first', 'second']
+
+    def test_sqlite_queue_holds_back_events_after_a_failure(self, tmp_path):
+        from app.event_queue import SQLiteEventQueue
+
+        applied = []
+
+        def handler(payload):
+            if payload == 'bad':
+                raise ValueError('cannot apply')
+            applied.append(payload)
+
+        event_queue = SQLiteEventQueue(handler, str(tmp_path / 'events.db'), attempts=2, retry_delay=0)
+        for index, payload in enumerate(['ok', 'bad', 'later']):
+            event_queue.put(f'evt_{index}', payload)
+        event_queue.join()
+
+        assert applied == ['ok']
+
+
+class TestSQSEventQueue:
+    """Test the SQS queue and its Lambda consumer."""
+
+    def test_fifo_messages_are_grouped_and_deduplicated(self):
+        from app.event_queue import SQSEventQueue
+
+        event_queue = SQSEventQueue('https://sqs.us-east-1.amazonaws.com/123/stripe-events.fifo')
+        event_queue._client = Mock()
+        event_queue.put('evt_1', '{}', 'cus_1')
+
+        event_queue._client.send_message.assert_called_once_with(
+            QueueUrl='https://sqs.us-east-1.amazonaws.com/123/stripe-events.fifo',
+            MessageBody='{}', MessageGroupId='cus_1', MessageDeduplicationId='evt_1'
+        )
+
+    def test_failure_holds_back_the_rest_of_the_batch(self):
+        from app.event_queue import apply_sqs_records
+
+        applied = []
+
+        def handler(body):
+            if body == 'bad':
+                raise ValueError('cannot apply')
+            applied.append(body)
+
+        records = [{'messageId': str(index), 'body': body} for index, body in enumerate(['ok', 'bad', 'later'])]
+        result = apply_sqs_records(records, handler)
+
+        assert applied == ['ok']
+        assert result == {'batchItemFailures': [{'itemIdentifier': '1'}, {'itemIdentifier': '2'}]}
@@ -0,0 +1,49 @@
+"""
+Tests for the single-pass lexicon matcher.
+"""
+
+import random
+
+
+class TestKeywordMatcher:
+    """Test the Aho-Corasick keyword matcher."""
+
+    def test_overlapping_keywords_are_all_found(self):
+        from app.keyword_matcher import KeywordMatcher
+
+        matcher = KeywordMatcher({'a': ['he', 'she', 'hers'], 'b': ['his', 'she']})
+
+        hits = matcher.match('ushers')
+
+        assert hits == {'a': {'she': [1], 'he': [2], 'hers': [2]}, 'b': {'she': [1]}}
+
+    def test_whole_words_skips_matches_inside_words(self):
+        from app.keyword_matcher import KeywordMatcher
+
+        matcher = KeywordMatcher({'symbol': ['car', 'cat']})
+
+        assert matcher.match('a scary cat', whole_words=True) == {'symbol': {'cat': [8]}}
+        assert matcher.match('a scary cat') == {'symbol': {'car': [3], 'cat': [8]}}
+
+    def test_group_can_stop_at_an_offset(self):
+        from app.keyword_matcher import KeywordMatcher
+
+        matcher = KeywordMatcher({'emotion': ['fear', 'joy']})
+        text = 'fear then joy'
+
+        matches = matcher.find(text)
+
+        assert matcher.group(matches, end=len('fear then jo')) == {'emotion': {'fear': [0]}}
+        assert matcher.group(matches) == {'emotion': {'fear': [0], 'joy': [10]}}
+
+    def test_matches_agree_with_substring_search(self):
+        from app.keyword_matcher import KeywordMatcher
+
+        rng = random.Random(1)
+        keywords = [''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(20)]
+        matcher = KeywordMatcher({'all': keywords})
+
+        for _ in range(50):
+            text = ''.join(rng.choice('abc ') for _ in range(30))
+            found = matcher.match(text).get('all', {})
+            assert set(found) == {keyword for keyword in keywords if keyword in text}
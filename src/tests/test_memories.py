@@ -0,0 +1,313 @@
+"""
+Tests for the memory management routes.
+"""
+
+import boto3
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from moto import mock_aws
+
+
+@pytest.fixture
+def memory_tables():
+    """Moto-backed premium and memories tables wired into the memories module."""
+    import app.memories as memories
+    from app.bootstrap import ensure_tables
+
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        ensure_tables(dynamodb)
+        with patch.object(memories, 'dynamodb', dynamodb), patch.object(memories, '_memories_table', None):
+            yield dynamodb
+
+
+@pytest.fixture
+def signed_in():
+    """Authenticate requests as +1234567890."""
+    with patch('app.auth.verify_cognito_token', return_value={'sub': 'user-1', 'phone_number': '+1234567890'}):
+        yield
+
+
+class TestMemoryPrefetch:
+    """Test the batched premium and memories read on memory routes."""
+
+    def test_one_batch_read_serves_premium_check_and_handler(self, client, memory_tables, signed_in):
+        from app.premium import premium_table_name
+        from app.memories import memories_table_name
+
+        subscription_end = (datetime.utcnow() + timedelta(days=30)).isoformat()
+        memory_tables.Table(premium_table_name).put_item(Item={'phone_number': '1234567890', 'subscription_end': subscription_end})
+        memories_table = memory_tables.Table(memories_table_name)
+        memories_table.put_item(Item={'user_id': '1234567890', 'entry_key': 'PROFILE', 'created_at': '2024-01-01T00:00:00'})
+        memories_table.put_item(Item={'user_id': '1234567890', 'entry_key': 'TRAIT#mood', 'value': 'calm'})
+
+        with patch.object(memory_tables, 'batch_get_item', wraps=memory_tables.batch_get_item) as mock_batch, \
+             patch('app.premium.get_premium_table') as mock_premium_table:
+            response = client.get('/api/memories/user/1234567890', headers={'Authorization': 'Bearer token'})
+
+        assert response.status_code == 200
+        assert response.get_json()['traits'] == {'mood': {'value': 'calm'}}
+        mock_batch.assert_called_once()
+        mock_premium_table.assert_not_called()
+
+    def test_non_premium_caller_is_rejected(self, client, memory_tables, signed_in):
+        response = client.get('/api/memories/user/1234567890', headers={'Authorization': 'Bearer token'})
+
+        assert response.status_code == 403
+
+    def test_routes_that_do_not_read_the_profile_skip_the_batch(self, client, memory_tables, signed_in):
+        with patch('app.memories.prefetch_items') as mock_prefetch, \
+             patch('app.premium.is_premium_user', return_value=True):
+            client.post('/api/memories/user/1234567890/trait', json={'trait_type': 'mood', 'trait_value': 'calm'},
+                        headers={'Authorization': 'Bearer token'})
+            client.get('/api/memories/user/1234567890/summary', headers={'Authorization': 'Bearer token'})
+            denied = client.get('/api/memories/user/999', headers={'Authorization': 'Bearer token'})
+
+        assert denied.status_code == 403
+        mock_prefetch.assert_not_called()
+
+    def test_failed_prefetch_falls_back_to_direct_reads(self, client, memory_tables, signed_in):
+        from app.memories import memories_table_name
+
+        memory_tables.Table(memories_table_name).put_item(Item={'user_id': '1234567890', 'entry_key': 'PROFILE'})
+
+        with patch.object(memory_tables, 'batch_get_item', side_effect=Exception('throttled')), \
+             patch('app.premium.is_premium_user', return_value=True):
+            response = client.get('/api/memories/user/1234567890', headers={'Authorization': 'Bearer token'})
+
+        assert response.status_code == 200
+        assert response.get_json()['memories'] == []
+
+
+@pytest.fixture
+def premium_caller(signed_in):
+    """Authenticate requests as a premium +1234567890."""
+    with patch('app.premium.is_premium_user', return_value=True):
+        yield
+
+
+AUTH = {'Authorization': 'Bearer token'}
+
+
+class TestMemoryEntries:
+    """Test the per-entry memories layout."""
+
+    def test_entries_round_trip_through_the_document_api(self, client, memory_tables, premium_caller):
+        client.post('/api/memories/user/1234567890/trait', json={'trait_type': 'mood', 'trait_value': 'calm'}, headers=AUTH)
+        client.post('/api/memories/user/1234567890/memory', json={'content': 'first', 'memory_type': 'dream'}, headers=AUTH)
+        client.post('/api/memories/user/1234567890/memory', json={'content': 'second', 'memory_type': 'dream'}, headers=AUTH)
+        client.post('/api/memories/user/1234567890/context', json={'context_type': 'goal', 'context_value': 'lucid'}, headers=AUTH)
+
+        memories = client.get('/api/memories/user/1234567890', headers=AUTH).get_json()
+        assert memories['traits']['mood']['value'] == 'calm'
+        assert [memory['content'] for memory in memories['memories']] == ['first', 'second']
+        assert memories['personal_context']['goals'][0]['value'] == 'lucid'
+
+        summary = client.get('/api/memories/user/1234567890/summary', headers=AUTH).get_json()
+        assert summary['summary'] == "User has 1 traits, 2 memories, and 1 context items."
+
+        section = client.get('/api/memories/user/1234567890?section=traits', headers=AUTH).get_json()
+        assert section['memories'] == [] and 'mood' in section['traits']
+
+    def test_mutations_touch_single_entries(self, client, memory_tables, premium_caller):
+        client.post('/api/memories/user/1234567890/context', json={'context_type': 'life_event', 'context_value': 'moved'}, headers=AUTH)
+        context_id = client.get('/api/memories/user/1234567890', headers=AUTH).get_json()['personal_context']['life_events'][0]['id']
+
+        response = client.put(f'/api/memories/user/1234567890/context/{context_id}', json={'value': 'moved city', 'id': 'x'}, headers=AUTH)
+        assert response.status_code == 200
+        event = client.get('/api/memories/user/1234567890', headers=AUTH).get_json()['personal_context']['life_events'][0]
+        assert event['value'] == 'moved city' and event['id'] == context_id
+
+        assert client.delete(f'/api/memories/user/1234567890/context/{context_id}', headers=AUTH).status_code == 200
+        assert client.delete(f'/api/memories/user/1234567890/context/{context_id}', headers=AUTH).status_code == 404
+        assert client.put('/api/memories/user/1234567890/trait/missing', json={'value': 'x'}, headers=AUTH).status_code == 404
+
+    def test_updates_write_only_the_named_attributes(self, client, memory_tables, premium_caller):
+        client.post('/api/memories/user/1234567890/trait', json={'trait_type': 'mood', 'trait_value': 'calm', 'confidence': 0.8}, headers=AUTH)
+
+        with patch.object(memory_tables.meta.client, 'put_item') as mock_put:
+            response = client.put('/api/memories/user/1234567890/trait/mood', json={'value': 'restless', 'confidence': None}, headers=AUTH)
+
+        trait = response.get_json()['trait']
+        assert trait['value'] == 'restless'
+        assert 'confidence' not in trait
+        mock_put.assert_not_called()
+
+    def test_other_users_entries_are_not_writable(self, client, memory_tables, premium_caller):
+        response = client.delete('/api/memories/user/999/memory/abc', headers=AUTH)
+
+        assert response.status_code == 403
+
+
+class TestMemoryVersions:
+    """Test memory versions, conditional refreshes and conflict retries."""
+
+    def test_unchanged_memories_revalidate_without_a_query(self, client, memory_tables, premium_caller):
+        client.post('/api/memories/user/1234567890/memory', json={'content': 'first', 'memory_type': 'dream'}, headers=AUTH)
+        first = client.get('/api/memories/user/1234567890', headers=AUTH)
+        etag = first.headers['ETag']
+
+        with patch('app.memories.query_entries') as mock_query:
+            revalidated = client.get('/api/memories/user/1234567890', headers={**AUTH, 'If-None-Match': etag})
+        assert revalidated.status_code == 304
+        mock_query.assert_not_called()
+
+        written = client.post('/api/memories/user/1234567890/trait', json={'trait_type': 'mood', 'trait_value': 'calm'}, headers=AUTH)
+        refreshed = client.get('/api/memories/user/1234567890', headers={**AUTH, 'If-None-Match': etag})
+        assert refreshed.status_code == 200
+        assert refreshed.headers['ETag'] == f'"{written.headers["X-Memories-Version"]}"'
+        assert refreshed.get_json()['version'] == int(written.headers['X-Memories-Version'])
+
+    def test_each_mutation_is_one_entry_write_and_a_version_bump(self, client, memory_tables, premium_caller):
+        client_api = memory_tables.meta.client
+        client.post('/api/memories/user/1234567890/trait', json={'trait_type': 'mood', 'trait_value': 'calm'}, headers=AUTH)
+
+        with patch.object(client_api, 'transact_write_items') as mock_transact, \
+             patch.object(memory_tables, 'batch_get_item') as mock_batch, \
+             patch.object(client_api, 'get_item') as mock_get, \
+             patch.object(client_api, 'update_item', wraps=client_api.update_item) as mock_update:
+            written = client.post('/api/memories/user/1234567890/memory', json={'content': 'first', 'memory_type': 'dream'}, headers=AUTH)
+            updated = client.put('/api/memories/user/1234567890/trait/mood', json={'value': 'restless'}, headers=AUTH)
+
+        mock_transact.assert_not_called()
+        mock_batch.assert_not_called()
+        mock_get.assert_not_called()
+        # The trait update returns its own item; each write bumps the profile once
+        assert [call.kwargs['ReturnValues'] for call in mock_update.call_args_list] == ['UPDATED_NEW', 'ALL_NEW', 'UPDATED_NEW']
+        assert updated.get_json()['trait']['value'] == 'restless'
+        assert int(updated.headers['X-Memories-Version']) == int(written.headers['X-Memories-Version']) + 1
+
+    def test_write_racing_another_tab_succeeds(self, client, memory_tables, premium_caller):
+        import app.memories as memories
+
+        table = memories.get_memories_table()
+        client_api = memory_tables.meta.client
+        put_item = client_api.put_item
+
+        def put_while_another_tab_writes(**kwargs):
+            # Another tab's write lands between this entry write and its version bump
+            put_item(TableName=table.name, Item={'user_id': '1234567890', 'entry_key': 'TRAIT#mood', 'value': 'calm', 'version': 1})
+            memories.touch_profile(table, '1234567890')
+            return put_item(**kwargs)
+
+        with patch.object(client_api, 'put_item', side_effect=put_while_another_tab_writes):
+            response = client.post('/api/memories/user/1234567890/memory', json={'content': 'first', 'memory_type': 'dream'}, headers=AUTH)
+
+        assert response.status_code == 200
+        assert response.headers['X-Memories-Version'] == '2'
+        current = client.get('/api/memories/user/1234567890', headers=AUTH).get_json()
+        assert current['version'] == 2
+        assert len(current['memories']) == 1 and current['traits']['mood']['value'] == 'calm'
+
+    def test_cleanup_rechecks_memories_changed_since_read(self, client, memory_tables, premium_caller):
+        import app.memories as memories
+
+        table = memories.get_memories_table()
+        table.put_item(Item={
+            'user_id': '1234567890', 'entry_key': 'MEMORY#old', 'id': 'old', 'importance': 'low',
+            'created_at': '2020-01-01T00:00:00', 'version': 1
+        })
+        stale = table.get_item(Key={'user_id': '1234567890', 'entry_key': 'MEMORY#old'})['Item']
+        # Another tab marks the memory important after cleanup has read it
+        table.update_item(
+            Key={'user_id': '1234567890', 'entry_key': 'MEMORY#old'},
+            UpdateExpression='SET importance = :high ADD version :one',
+            ExpressionAttributeValues={':high': 'high', ':one': 1}
+        )
+
+        with patch('app.memories.query_entries', return_value=[stale]), patch('app.memories.time.sleep') as mock_sleep:
+            response = client.post('/api/memories/user/1234567890/cleanup', json={'days_to_keep': 30}, headers=AUTH)
+
+        assert response.get_json()['message'] == "Cleaned up 0 old memories"
+        assert 'Item' in table.get_item(Key={'user_id': '1234567890', 'entry_key': 'MEMORY#old'})
+        mock_sleep.assert_called_once()
+
+
+@mock_aws
+class TestMemoryMigration:
+    """Test splitting legacy memories documents into entries."""
+
+    def test_legacy_documents_are_split_idempotently(self):
+        from app.bootstrap import ensure_tables
+        from app.memories import memories_table_name
+        from app.memory_migration import migrate_memories
+
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        ensure_tables(dynamodb)
+        legacy = dynamodb.create_table(
+            TableName='legacy-memories',
+            KeySchema=[{'AttributeName': 'user_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'user_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        legacy.put_item(Item={
+            'user_id': '1234567890',
+            'traits': {'mood': {'value': 'calm'}},
+            'memories': [{'id': 'm1', 'content': 'first'}],
+            'personal_context': {'life_events': [{'id': 'e1', 'value': 'moved'}], 'goals': []},
+            'created_at': '2024-01-01T00:00:00'
+        })
+
+        first = migrate_memories(dynamodb, source='legacy-memories')
+        second = migrate_memories(dynamodb, source='legacy-memories')
+
+        keys = sorted(item['entry_key'] for item in dynamodb.Table(memories_table_name).scan()['Items'])
+        assert first == {'users': 1, 'skipped': 0, 'items': 4}
+        assert second == {'users': 0, 'skipped': 1, 'items': 0}
+        assert keys == ['LIFE_EVENT#e1', 'MEMORY#m1', 'PROFILE', 'TRAIT#mood']
+
+    def test_rerun_after_cutover_keeps_edits_and_deletions(self):
+        from app.bootstrap import ensure_tables
+        from app.memories import memories_table_name
+        from app.memory_migration import migrate_memories
+
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        ensure_tables(dynamodb)
+        legacy = dynamodb.create_table(
+            TableName='legacy-memories',
+            KeySchema=[{'AttributeName': 'user_id', 'KeyType': 'HASH'}],
+            AttributeDefinitions=[{'AttributeName': 'user_id', 'AttributeType': 'S'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        legacy.put_item(Item={
+            'user_id': '1234567890',
+            'traits': {'mood': {'value': 'calm'}},
+            'memories': [{'id': 'm1', 'content': 'first'}],
+            'created_at': '2024-01-01T00:00:00'
+        })
+        migrate_memories(dynamodb, source='legacy-memories')
+
+        # After cutover the user edits a trait and deletes a memory
+        table = dynamodb.Table(memories_table_name)
+        table.put_item(Item={'user_id': '1234567890', 'entry_key': 'TRAIT#mood', 'value': 'restless', 'version': 3})
+        table.delete_item(Key={'user_id': '1234567890', 'entry_key': 'MEMORY#m1'})
+
+        counts = migrate_memories(dynamodb, source='legacy-memories')
+
+        items = {item['entry_key']: item for item in table.scan()['Items']}
+        assert counts == {'users': 0, 'skipped': 1, 'items': 0}
+        assert sorted(items) == ['PROFILE', 'TRAIT#mood']
+        assert items['TRAIT#mood']['value'] == 'restless' and items['TRAIT#mood']['version'] == 3
+
+    def test_interrupted_migration_resumes_without_overwriting(self):
+        from app.bootstrap import ensure_tables
+        from app.memories import memories_table_name
+        from app.memory_migration import migrate_user
+
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        ensure_tables(dynamodb)
+        table = dynamodb.Table(memories_table_name)
+        # A previous run wrote the trait but stopped before the profile
+        table.put_item(Item={'user_id': '1234567890', 'entry_key': 'TRAIT#mood', 'value': 'restless', 'version': 2})
+
+        written = migrate_user(table, {
+            'user_id': '1234567890',
+            'traits': {'mood': {'value': 'calm'}},
+            'memories': [{'id': 'm1', 'content': 'first'}]
+        })
+
+        items = {item['entry_key']: item for item in table.scan()['Items']}
+        assert written == 2
+        assert sorted(items) == ['MEMORY#m1', 'PROFILE', 'TRAIT#mood']
+        assert items['TRAIT#mood']['value'] == 'restless'
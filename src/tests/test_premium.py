@@ -79,6 +79,62 @@ class TestPremiumFunctions:
             result = is_premium_user('+1234567890')
             assert result is False
 
+    def test_is_premium_user_caches_answers(self, app):
+        """Test that premium answers, negative ones included, are served from the cache."""
+        from app.premium import is_premium_user
+
+        table = Mock()
+        table.get_item.return_value = {}
+
+        with patch('app.premium.get_premium_table', return_value=table):
+            assert is_premium_user('+1234567890') is False
+            assert is_premium_user('1234567890') is False
+
+        table.get_item.assert_called_once_with(Key={'phone_number': '1234567890'})
+
+    def test_negative_answers_expire_quickly(self, app):
+        """Test that a subscription written by another process is seen once the short negative TTL passes."""
+        import time
+        from app.premium import is_premium_user, ENTITLEMENT_NEGATIVE_CACHE_TTL
+
+        subscription_end = (datetime.utcnow() + timedelta(days=30)).isoformat()
+        table = Mock()
+        table.get_item.return_value = {}
+
+        with patch('app.premium.get_premium_table', return_value=table):
+            assert is_premium_user('1234567890') is False
+            table.get_item.return_value = {'Item': {'phone_number': '1234567890', 'subscription_end': subscription_end}}
+            with patch('app.premium.time.time', return_value=time.time() + ENTITLEMENT_NEGATIVE_CACHE_TTL + 1):
+                assert is_premium_user('1234567890') is True
+
+    def test_subscription_webhooks_show_once_cached_answers_expire(self, app):
+        """Test that webhook changes reach the cache only through its TTLs: short for a grant, a minute for a revocation."""
+        import time
+        from app.premium import is_premium_user, ENTITLEMENT_CACHE_TTL, ENTITLEMENT_NEGATIVE_CACHE_TTL
+        from app.stripe_integration import handle_subscription_created, handle_subscription_deleted
+
+        items = {}
+        table = Mock()
+        table.get_item.side_effect = lambda Key: {'Item': items[Key['phone_number']]} if Key['phone_number'] in items else {}
+        table.put_item.side_effect = lambda Item: items.__setitem__(Item['phone_number'], Item)
+
+        with patch('app.premium.get_premium_table', return_value=table), \
+             patch('app.stripe_integration.get_stripe_customers_table'), \
+             patch('app.stripe_integration.get_stripe_subscriptions_table'):
+            table.delete_item.side_effect = lambda Key: items.pop(Key['phone_number'], None)
+            now = time.time()
+
+            assert is_premium_user('1234567890') is False
+            handle_subscription_created(Mock(id='sub_1', metadata={'phone_number': '1234567890', 'plan_type': 'monthly'}))
+            assert is_premium_user('1234567890') is False
+            with patch('app.premium.time.time', return_value=now + ENTITLEMENT_NEGATIVE_CACHE_TTL + 1):
+                assert is_premium_user('1234567890') is True
+
+                handle_subscription_deleted(Mock(id='sub_1', metadata={'phone_number': '1234567890'}))
+                assert is_premium_user('1234567890') is True
+            with patch('app.premium.time.time', return_value=now + ENTITLEMENT_NEGATIVE_CACHE_TTL + ENTITLEMENT_CACHE_TTL + 2):
+                assert is_premium_user('1234567890') is False
+
     def test_check_premium_access_active(self, app):
         """Test check_premium_access with active subscription."""
         from app.premium import check_premium_access, get_premium_table
@@ -386,3 +442,78 @@ class TestPremiumEndpoints:
         data = json.loads(response.data)
         assert 'error' in data
         assert 'authorization header' in data['error'].lower()
+
+
+class TestEntitlementToken:
+    """Test signed entitlement tokens."""
+
+    def test_token_round_trip_is_bound_to_phone(self):
+        import app.premium as premium
+
+        with patch.object(premium, 'ENTITLEMENT_TOKEN_SECRET', 'secret'):
+            token = premium.issue_entitlement_token('+1234567890', 'premium', ['dream_archetypes', 'unknown'], None)
+            claims = premium.verify_entitlement_token(token, '1234567890')
+
+            assert claims['subscription_type'] == 'premium'
+            assert claims['features'] == ['dream_archetypes']
+            assert premium.verify_entitlement_token(token, '1999999999') is None
+
+    def test_tampered_or_expired_tokens_are_rejected(self):
+        import app.premium as premium
+
+        with patch.object(premium, 'ENTITLEMENT_TOKEN_SECRET', 'secret'):
+            token = premium.issue_entitlement_token('1234567890', 'premium', premium.PREMIUM_FEATURES, None)
+            payload, signature = token.split('.')
+            forged = premium._b64encode(premium._b64decode(payload).replace(b'|premium|', b'|gold|'))
+
+            assert premium.verify_entitlement_token(f"{forged}.{signature}", '1234567890') is None
+            assert premium.verify_entitlement_token('garbage', '1234567890') is None
+
+            past_end = (datetime.utcnow() - timedelta(minutes=1)).isoformat()
+            expired = premium.issue_entitlement_token('1234567890', 'premium', [], past_end)
+            assert premium.verify_entitlement_token(expired, '1234567890') is None
+
+        assert premium.verify_entitlement_token(token, '1234567890') is None  # disabled without a secret
+
+    def test_require_premium_trusts_token_without_table_lookup(self):
+        import app.premium as premium
+        from flask import Flask
+
+        test_app = Flask(__name__)
+
+        @test_app.route('/test-premium/<phone_number>')
+        @premium.require_premium
+        def test_route(phone_number):
+            return {'message': 'Access granted'}
+
+        with patch.object(premium, 'ENTITLEMENT_TOKEN_SECRET', 'secret'), \
+             patch('app.premium.get_cognito_user_info', return_value={'phone_number': '+1234567890'}), \
+             patch('app.premium.get_premium_table') as mock_table:
+            token = premium.issue_entitlement_token('1234567890', 'premium', premium.PREMIUM_FEATURES, None)
+            response = test_app.test_client().get('/test-premium/1234567890', headers={
+                'Authorization': 'Bearer valid-token',
+                'X-Entitlement-Token': token
+            })
+
+        assert response.status_code == 200
+        mock_table.assert_not_called()
+
+    def test_status_endpoint_issues_token_to_premium_caller(self, client):
+        import app.premium as premium
+
+        status = {
+            'has_premium': True,
+            'subscription_type': 'premium',
+            'subscription_end': (datetime.utcnow() + timedelta(days=30)).isoformat(),
+            'days_remaining': 30,
+            'features': premium.PREMIUM_FEATURES
+        }
+        with patch.object(premium, 'ENTITLEMENT_TOKEN_SECRET', 'secret'), \
+             patch('app.premium.check_premium_access', return_value=status), \
+             patch('app.auth.verify_cognito_token', return_value={'sub': 'test-user', 'phone_number': '+1234567890'}):
+            response = client.get('/api/premium/subscription/status/1234567890', headers={'Authorization': 'Bearer valid-token'})
+            other = client.get('/api/premium/subscription/status/1999999999', headers={'Authorization': 'Bearer valid-token'})
+
+            token = response.get_json()['entitlement_token']
+            assert premium.verify_entitlement_token(token, '1234567890')['features'] == premium.PREMIUM_FEATURES
+            assert 'entitlement_token' not in other.get_json()
@@ -217,6 +217,68 @@ class TestDreamsEndpoint:
             assert data['total'] == 0
             assert data['hasMore'] is False
 
+    def test_get_dreams_cursor_pagination(self, client, mock_auth_session):
+        """Test cursor-based dreams listing returns nextCursor until exhausted."""
+        custom_mock_s3_client = Mock()
+
+        def mock_list_objects_v2(Bucket, Prefix, MaxKeys=1000, ContinuationToken=None, Delimiter=None):
+            if Prefix != '1234567890/dreams/':
+                return {'Contents': [], 'IsTruncated': False}
+            keys = [f'1234567890/dreams/dream{i}.json' for i in range(15)]
+            start = int(ContinuationToken or 0)
+            response = {
+                'Contents': [{'Key': key, 'LastModified': '2024-01-01T00:00:00Z'} for key in keys[start:start + MaxKeys]],
+                'IsTruncated': start + MaxKeys < len(keys)
+            }
+            if response['IsTruncated']:
+                response['NextContinuationToken'] = str(start + MaxKeys)
+            return response
+
+        custom_mock_s3_client.list_objects_v2 = Mock(side_effect=mock_list_objects_v2)
+
+        with patch('app.routes.S3_BUCKET_NAME', 'test-dream-bucket'), \
+             patch('app.routes.get_s3_client', return_value=custom_mock_s3_client):
+            response = client.get('/api/dreams/1234567890?limit=10&cursor=',
+                                headers={'Authorization': 'Bearer valid-token'})
+
+            assert response.status_code == 200
+            data = json.loads(response.data)
+            assert len(data['dreams']) == 10
+            assert data['hasMore'] is True
+            assert data['nextCursor']
+
+            response = client.get(f"/api/dreams/1234567890?limit=10&cursor={data['nextCursor']}",
+                                headers={'Authorization': 'Bearer valid-token'})
+
+            assert response.status_code == 200
+            data = json.loads(response.data)
+            assert len(data['dreams']) == 5
+            assert data['nextCursor'] is None
+            assert data['hasMore'] is False
+
+    def test_get_dreams_invalid_cursor(self, client, mock_auth_session):
+        """Test that a malformed cursor is rejected."""
+        with patch('app.routes.S3_BUCKET_NAME', 'test-dream-bucket'), \
+             patch('app.routes.get_s3_client', return_value=Mock()):
+            response = client.get('/api/dreams/1234567890?cursor=garbage',
+                                headers={'Authorization': 'Bearer valid-token'})
+
+            assert response.status_code == 400
+
+    def test_get_dreams_cursor_for_another_phone(self, client, mock_auth_session):
+        """Test that a cursor issued for another phone number is rejected."""
+        from app.dream_store import encode_cursor
+
+        s3 = Mock()
+        with patch('app.routes.S3_BUCKET_NAME', 'test-dream-bucket'), \
+             patch('app.routes.get_s3_client', return_value=s3):
+            cursor = encode_cursor('5555555555', 0, 'token')
+            response = client.get(f'/api/dreams/1234567890?cursor={cursor}',
+                                headers={'Authorization': 'Bearer valid-token'})
+
+            assert response.status_code == 400
+            s3.list_objects_v2.assert_not_called()
+
     def test_get_dreams_s3_error(self, client, mock_auth_session):
         """Test dreams endpoint when S3 bucket is not configured."""
         with patch('app.routes.S3_BUCKET_NAME', None):
@@ -288,6 +350,16 @@ class TestDreamDetailEndpoint:
             assert 'error' in data
             assert 'format' in data['error'].lower()
 
+    def test_get_dream_rejects_internal_keys(self, client, mock_s3_client, mock_auth_session):
+        """Test dream detail endpoint refuses ids of internal documents."""
+        with patch('app.routes.S3_BUCKET_NAME', 'test-dream-bucket'), \
+             patch('app.routes.get_s3_client', return_value=mock_s3_client):
+            response = client.get('/api/dreams/1234567890/_manifest',
+                                headers={'Authorization': 'Bearer valid-token'})
+
+            assert response.status_code == 400
+            mock_s3_client.get_object.assert_not_called()
+
     def test_get_dream_s3_error(self, client, mock_auth_session):
         """Test dream detail endpoint when S3 bucket is not configured."""
         with patch('app.routes.S3_BUCKET_NAME', None):
@@ -300,6 +372,60 @@ class TestDreamDetailEndpoint:
             assert 'not configured' in data['error'].lower()
 
 
+class TestDreamBatchEndpoint:
+    """Test fetching several dreams in one request."""
+
+    def test_get_dreams_batch_success(self, client, mock_s3_client, mock_auth_session):
+        """Test batch retrieval returns normalised dreams and per-id errors."""
+        with patch('app.routes.S3_BUCKET_NAME', 'test-dream-bucket'), \
+             patch('app.routes.get_s3_client', return_value=mock_s3_client):
+            response = client.post('/api/dreams/1234567890/batch',
+                                 json={'ids': ['dream1', 'nonexistent', 'invalid-dream', 'dream1']},
+                                 headers={'Authorization': 'Bearer valid-token'})
+
+            assert response.status_code == 200
+            data = json.loads(response.data)
+            assert len(data['dreams']) == 1
+            assert data['dreams'][0]['id'] == 'dream1'
+            assert data['dreams'][0]['response'] == 'This dream suggests freedom and liberation'
+            assert data['errors'] == {
+                'nonexistent': 'Dream not found',
+                'invalid-dream': 'Invalid dream data format'
+            }
+
+    def test_get_dreams_batch_requires_ids(self, client, mock_s3_client, mock_auth_session):
+        """Test batch retrieval rejects a missing or malformed id list."""
+        with patch('app.routes.S3_BUCKET_NAME', 'test-dream-bucket'), \
+             patch('app.routes.get_s3_client', return_value=mock_s3_client):
+            for body in ({}, {'ids': []}, {'ids': 'dream1'}, {'ids': [1, 2]}):
+                response = client.post('/api/dreams/1234567890/batch', json=body,
+                                     headers={'Authorization': 'Bearer valid-token'})
+                assert response.status_code == 400
+
+    def test_get_dreams_batch_too_many_ids(self, client, mock_s3_client, mock_auth_session):
+        """Test batch retrieval caps the number of ids per request."""
+        with patch('app.routes.S3_BUCKET_NAME', 'test-dream-bucket'), \
+             patch('app.routes.get_s3_client', return_value=mock_s3_client):
+            response = client.post('/api/dreams/1234567890/batch',
+                                 json={'ids': [f'dream{i}' for i in range(101)]},
+                                 headers={'Authorization': 'Bearer valid-token'})
+
+            assert response.status_code == 400
+            mock_s3_client.get_object.assert_not_called()
+
+    def test_get_dreams_batch_rejects_internal_keys(self, client, mock_s3_client, mock_auth_session):
+        """Test batch retrieval refuses ids that would reach index documents or nested keys."""
+        with patch('app.routes.S3_BUCKET_NAME', 'test-dream-bucket'), \
+             patch('app.routes.get_s3_client', return_value=mock_s3_client):
+            for dream_id in ('_index/manifest', '_index/aggregates', '_manifest', 'dreams/dream1'):
+                response = client.post('/api/dreams/1234567890/batch',
+                                     json={'ids': ['dream1', dream_id]},
+                                     headers={'Authorization': 'Bearer valid-token'})
+                assert response.status_code == 400
+
+            mock_s3_client.get_object.assert_not_called()
+
+
 class TestCORSHeaders:
     """Test CORS headers are properly set."""
     
@@ -6,6 +6,32 @@ import json
 import pytest
 from unittest.mock import patch, Mock
 import stripe
+from botocore.exceptions import ClientError
+from datetime import datetime, timedelta
+
+
+@pytest.fixture
+def stripe_tables():
+    """Moto-backed tables wired into the Stripe integration module."""
+    import boto3
+    from moto import mock_aws
+    import app.stripe_integration as stripe_integration
+    from app.bootstrap import ensure_tables
+
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+        ensure_tables(dynamodb)
+        with patch.object(stripe_integration, 'dynamodb', dynamodb), \
+             patch.object(stripe_integration, '_stripe_customers_table', None), \
+             patch.object(stripe_integration, '_stripe_subscriptions_table', None), \
+             patch.object(stripe_integration, '_stripe_events_table', None):
+            yield dynamodb
+
+
+def make_subscription(subscription_id='sub_1', status='active', plan_type='monthly'):
+    """Mock Stripe subscription for +1234567890."""
+    return Mock(id=subscription_id, customer='cus_1', status=status, current_period_end=1234567890,
+                cancel_at_period_end=False, metadata={'phone_number': '+1234567890', 'plan_type': plan_type})
 
 
 class TestStripeConfiguration:
@@ -76,6 +102,70 @@ class TestStripeConfiguration:
                 assert result is False  # Should fallback to env vars
 
 
+class TestLazyStripeConfiguration:
+    """Test on-demand loading and refreshing of the Stripe configuration."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_config(self):
+        from app.stripe_integration import reset_stripe_config
+        reset_stripe_config()
+        yield
+        reset_stripe_config()
+
+    def test_secrets_load_once_per_refresh_interval(self):
+        import app.stripe_integration as stripe_integration
+
+        with patch.object(stripe_integration, 'load_stripe_secrets', return_value=True) as mock_load:
+            stripe_integration.ensure_stripe_configured()
+            stripe_integration.ensure_stripe_configured()
+            with patch('app.stripe_integration.time.time', return_value=stripe_integration.time.time() + 7200):
+                stripe_integration.ensure_stripe_configured()
+
+        assert mock_load.call_count == 2
+
+    def test_non_stripe_routes_do_not_load_secrets(self, client):
+        with patch('app.stripe_integration.load_stripe_secrets') as mock_load:
+            client.get('/api/memories/user/1234567890')
+
+        mock_load.assert_not_called()
+
+    def test_secrets_file_stands_in_offline(self, tmp_path):
+        import app.stripe_integration as stripe_integration
+
+        secrets_file = tmp_path / 'stripe.json'
+        secrets_file.write_text(json.dumps({'STRIPE_SECRET_KEY': 'sk_test_file', 'STRIPE_MONTHLY_PRICE_ID': 'price_file'}))
+
+        with patch.object(stripe_integration, 'STRIPE_SECRETS_FILE', str(secrets_file)), \
+             patch.object(stripe_integration, 'load_stripe_secrets', return_value=False):
+            stripe_integration.ensure_stripe_configured()
+
+        assert stripe.api_key == 'sk_test_file'
+        assert stripe_integration.SUBSCRIPTION_PRICES['monthly'] == 'price_file'
+
+    def test_rotated_webhook_secret_is_picked_up(self, client):
+        import app.stripe_integration as stripe_integration
+
+        def rotate():
+            stripe_integration.STRIPE_WEBHOOK_SECRET = 'whsec_rotated'
+            return True
+
+        def construct(payload, sig_header, secret):
+            if secret != 'whsec_rotated':
+                raise stripe.error.SignatureVerificationError('bad signature', sig_header)
+            return {'id': 'evt_1', 'type': 'test.event', 'data': {'object': {}}}
+
+        with patch.object(stripe_integration, 'load_stripe_secrets', return_value=False):
+            stripe_integration.ensure_stripe_configured()
+        with patch.object(stripe_integration, 'load_stripe_secrets', side_effect=rotate), \
+             patch.object(stripe_integration, 'STRIPE_SECRETS_FORCED_REFRESH_INTERVAL', 0), \
+             patch('app.stripe_integration.stripe.Webhook.construct_event', side_effect=construct), \
+             patch('app.stripe_integration.record_stripe_event', return_value=True), \
+             patch('app.stripe_integration.get_stripe_event_queue'):
+            response = client.post('/api/stripe/webhook', data='{}', headers={'Stripe-Signature': 'sig'})
+
+        assert response.status_code == 200
+
+
 class TestStripeEndpoints:
     """Test Stripe API endpoints."""
     
@@ -155,11 +245,6 @@ class TestStripeEndpoints:
 
     def test_create_portal_session_success(self, client, mock_stripe, mock_auth_session):
         """Test successful portal session creation."""
-        mock_customer = Mock()
-        mock_customer.id = 'cus_test_123'
-        mock_customer.metadata = {'phone_number': '+1234567890'}
-        
-        mock_stripe['Customer'].list.return_value = Mock(data=[mock_customer])
         mock_stripe['billing_portal'].Session.create.return_value = Mock(
             url='https://billing.stripe.com/test'
         )
@@ -169,26 +254,31 @@ class TestStripeEndpoints:
             'return_url': 'https://example.com/return'
         }
         
-        response = client.post('/api/stripe/create-portal-session',
-                             json=portal_data,
-                             headers={'Authorization': 'Bearer valid-token'})
+        with patch('app.stripe_integration.lookup_stripe_customer', return_value={'customer_id': 'cus_test_123'}):
+            response = client.post('/api/stripe/create-portal-session',
+                                 json=portal_data,
+                                 headers={'Authorization': 'Bearer valid-token'})
         
         assert response.status_code == 200
         data = json.loads(response.data)
         assert 'portal_url' in data
         assert data['portal_url'] == 'https://billing.stripe.com/test'
+        mock_stripe['billing_portal'].Session.create.assert_called_once_with(
+            customer='cus_test_123', return_url='https://example.com/return'
+        )
+        mock_stripe['Customer'].list.assert_not_called()
 
     def test_create_portal_session_customer_not_found(self, client, mock_stripe, mock_auth_session):
         """Test portal session creation when customer is not found."""
-        mock_stripe['Customer'].list.return_value = Mock(data=[])
-        
         portal_data = {
             'phone_number': '+1234567890'
         }
         
-        response = client.post('/api/stripe/create-portal-session',
-                             json=portal_data,
-                             headers={'Authorization': 'Bearer valid-token'})
+        with patch('app.stripe_integration.lookup_stripe_customer', return_value=None), \
+             patch('app.stripe_integration.stripe.Customer.search', return_value=Mock(data=[])):
+            response = client.post('/api/stripe/create-portal-session',
+                                 json=portal_data,
+                                 headers={'Authorization': 'Bearer valid-token'})
         
         assert response.status_code == 404
         data = json.loads(response.data)
@@ -197,10 +287,6 @@ class TestStripeEndpoints:
 
     def test_get_stripe_subscription_status_success(self, client, mock_stripe, mock_auth_session):
         """Test getting Stripe subscription status successfully."""
-        mock_customer = Mock()
-        mock_customer.id = 'cus_test_123'
-        mock_customer.metadata = {'phone_number': '+1234567890'}
-        
         mock_subscription = Mock()
         mock_subscription.id = 'sub_test_123'
         mock_subscription.status = 'active'
@@ -208,11 +294,11 @@ class TestStripeEndpoints:
         mock_subscription.metadata = {'plan_type': 'monthly'}
         mock_subscription.cancel_at_period_end = False
         
-        mock_stripe['Customer'].list.return_value = Mock(data=[mock_customer])
         mock_stripe['Subscription'].list.return_value = Mock(data=[mock_subscription])
         
-        response = client.get('/api/stripe/subscription-status/+1234567890',
-                            headers={'Authorization': 'Bearer valid-token'})
+        with patch('app.stripe_integration.lookup_stripe_customer', return_value={'customer_id': 'cus_test_123'}):
+            response = client.get('/api/stripe/subscription-status/+1234567890',
+                                headers={'Authorization': 'Bearer valid-token'})
         
         assert response.status_code == 200
         data = json.loads(response.data)
@@ -222,10 +308,10 @@ class TestStripeEndpoints:
 
     def test_get_stripe_subscription_status_no_customer(self, client, mock_stripe, mock_auth_session):
         """Test getting subscription status when customer doesn't exist."""
-        mock_stripe['Customer'].list.return_value = Mock(data=[])
-        
-        response = client.get('/api/stripe/subscription-status/+1234567890',
-                            headers={'Authorization': 'Bearer valid-token'})
+        with patch('app.stripe_integration.lookup_stripe_customer', return_value=None), \
+             patch('app.stripe_integration.stripe.Customer.search', return_value=Mock(data=[])):
+            response = client.get('/api/stripe/subscription-status/+1234567890',
+                                headers={'Authorization': 'Bearer valid-token'})
         
         assert response.status_code == 200
         data = json.loads(response.data)
@@ -234,15 +320,11 @@ class TestStripeEndpoints:
 
     def test_get_stripe_subscription_status_no_subscription(self, client, mock_stripe, mock_auth_session):
         """Test getting subscription status when customer has no active subscription."""
-        mock_customer = Mock()
-        mock_customer.id = 'cus_test_123'
-        mock_customer.metadata = {'phone_number': '+1234567890'}
-        
-        mock_stripe['Customer'].list.return_value = Mock(data=[mock_customer])
         mock_stripe['Subscription'].list.return_value = Mock(data=[])
         
-        response = client.get('/api/stripe/subscription-status/+1234567890',
-                            headers={'Authorization': 'Bearer valid-token'})
+        with patch('app.stripe_integration.lookup_stripe_customer', return_value={'customer_id': 'cus_test_123'}):
+            response = client.get('/api/stripe/subscription-status/+1234567890',
+                                headers={'Authorization': 'Bearer valid-token'})
         
         assert response.status_code == 200
         data = json.loads(response.data)
@@ -252,6 +334,16 @@ class TestStripeEndpoints:
 
 class TestStripeWebhooks:
     """Test Stripe webhook handling."""
+
+    @pytest.fixture(autouse=True)
+    def event_queue(self):
+        """Accept every event id, capture queued events and stub the Stripe index tables."""
+        queue = Mock()
+        with patch('app.stripe_integration.record_stripe_event', return_value=True), \
+             patch('app.stripe_integration.get_stripe_event_queue', return_value=queue), \
+             patch('app.stripe_integration.get_stripe_customers_table'), \
+             patch('app.stripe_integration.get_stripe_subscriptions_table'):
+            yield queue
     
     def test_webhook_missing_signature(self, client):
         """Test webhook with missing signature."""
@@ -276,7 +368,7 @@ class TestStripeWebhooks:
         assert 'error' in data
         assert 'Invalid signature' in data['error']
 
-    def test_webhook_checkout_completed(self, client, mock_stripe):
+    def test_webhook_checkout_completed(self, client, mock_stripe, event_queue):
         """Test webhook handling for checkout.session.completed event."""
         # Create a mock session object with metadata attribute
         mock_session = Mock()
@@ -286,6 +378,7 @@ class TestStripeWebhooks:
         }
         
         event_data = {
+            'id': 'evt_checkout',
             'type': 'checkout.session.completed',
             'data': {
                 'object': mock_session
@@ -314,8 +407,13 @@ class TestStripeWebhooks:
             assert response.status_code == 200
             data = json.loads(response.data)
             assert data['status'] == 'success'
+            assert event_queue.put.call_args[0][0] == 'evt_checkout'
+
+            # The worker applies the queued event
+            from app.stripe_integration import process_stripe_event
+            process_stripe_event(event_data)
 
-    def test_webhook_subscription_created(self, client, mock_stripe):
+    def test_webhook_subscription_created(self, client, mock_stripe, event_queue):
         """Test webhook handling for customer.subscription.created event."""
         # Create a mock subscription object with metadata attribute
         mock_subscription = Mock()
@@ -326,6 +424,7 @@ class TestStripeWebhooks:
         }
         
         event_data = {
+            'id': 'evt_created',
             'type': 'customer.subscription.created',
             'data': {
                 'object': mock_subscription
@@ -358,8 +457,44 @@ class TestStripeWebhooks:
                 assert response.status_code == 200
                 data = json.loads(response.data)
                 assert data['status'] == 'success'
+                assert event_queue.put.call_args[0][0] == 'evt_created'
+
+                # The worker applies the queued event
+                from app.stripe_integration import process_stripe_event
+                process_stripe_event(event_data)
+                mock_table.return_value.put_item.assert_called_once()
+
+    def test_failed_premium_write_fails_the_queued_event(self):
+        """Test that a failed grant is reported to the queue for redelivery instead of acknowledged."""
+        from app.event_queue import apply_sqs_records
+        from app.stripe_integration import process_stripe_event
+
+        event = {'id': 'evt_created', 'type': 'customer.subscription.created',
+                 'data': {'object': make_subscription()}}
 
-    def test_webhook_subscription_deleted(self, client, mock_stripe):
+        throttled = ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'PutItem')
+        with patch('app.premium.get_premium_table') as mock_table:
+            mock_table.return_value.put_item.side_effect = throttled
+            result = apply_sqs_records([{'messageId': 'm1', 'body': '{}'}], lambda body: process_stripe_event(event))
+
+        assert result == {'batchItemFailures': [{'itemIdentifier': 'm1'}]}
+
+    def test_permanent_errors_are_not_retried(self):
+        """Test that an event failing for good is acknowledged rather than redelivered to the dead-letter queue."""
+        from app.event_queue import apply_sqs_records
+        from app.stripe_integration import process_stripe_event
+
+        event = {'id': 'evt_created', 'type': 'customer.subscription.created',
+                 'data': {'object': make_subscription()}}
+
+        invalid = ClientError({'Error': {'Code': 'ValidationException'}}, 'PutItem')
+        with patch('app.premium.get_premium_table') as mock_table:
+            mock_table.return_value.put_item.side_effect = invalid
+            result = apply_sqs_records([{'messageId': 'm1', 'body': '{}'}], lambda body: process_stripe_event(event))
+
+        assert result == {'batchItemFailures': []}
+
+    def test_webhook_subscription_deleted(self, client, mock_stripe, event_queue):
         """Test webhook handling for customer.subscription.deleted event."""
         # Create a mock subscription object with metadata attribute
         mock_subscription = Mock()
@@ -368,6 +503,7 @@ class TestStripeWebhooks:
         }
         
         event_data = {
+            'id': 'evt_deleted',
             'type': 'customer.subscription.deleted',
             'data': {
                 'object': mock_subscription
@@ -398,6 +534,297 @@ class TestStripeWebhooks:
                 assert response.status_code == 200
                 data = json.loads(response.data)
                 assert data['status'] == 'success'
+                assert event_queue.put.call_args[0][0] == 'evt_deleted'
+
+                # The worker applies the queued event
+                from app.stripe_integration import process_stripe_event
+                process_stripe_event(event_data)
+                mock_table.return_value.delete_item.assert_called_once()
+
+
+class TestStripeCustomerIndex:
+    """Test the phone number -> Stripe customer index."""
+
+    @pytest.fixture
+    def customers_table(self, stripe_tables):
+        from app.stripe_integration import stripe_customers_table_name
+
+        return stripe_tables.Table(stripe_customers_table_name)
+
+    def test_webhooks_maintain_the_index(self, customers_table):
+        from app.stripe_integration import handle_subscription_updated, handle_subscription_deleted, lookup_stripe_customer
+
+        subscription = make_subscription()
+        handle_subscription_updated(subscription)
+        entry = lookup_stripe_customer('+1234567890')
+        assert (entry['customer_id'], entry['subscription_id']) == ('cus_1', 'sub_1')
+
+        with patch('app.premium.get_premium_table'):
+            handle_subscription_deleted(subscription)
+        entry = lookup_stripe_customer('+1234567890')
+        assert entry['customer_id'] == 'cus_1'
+        assert 'subscription_id' not in entry
+
+    def test_index_miss_searches_stripe_once(self, customers_table):
+        from app.stripe_integration import find_stripe_customer_id
+
+        with patch('app.stripe_integration.stripe.Customer.search', return_value=Mock(data=[Mock(id='cus_9')])) as mock_search:
+            assert find_stripe_customer_id('+1234567890') == 'cus_9'
+            assert find_stripe_customer_id('+1234567890') == 'cus_9'
+
+        mock_search.assert_called_once()
+
+    def test_sync_backfills_from_every_page(self, customers_table):
+        from app.stripe_integration import sync_stripe_customers, lookup_stripe_customer
+
+        customers = [Mock(id=f'cus_{i}', metadata={'phone_number': f'+1{i:09d}'}) for i in range(150)]
+        subscriptions = [Mock(id='sub_7', customer='cus_7', metadata={'phone_number': '+1000000007'})]
+        with patch('app.stripe_integration.stripe.Customer.list', return_value=Mock(auto_paging_iter=Mock(return_value=iter(customers)))), \
+             patch('app.stripe_integration.stripe.Subscription.list', return_value=Mock(auto_paging_iter=Mock(return_value=iter(subscriptions)))):
+            counts = sync_stripe_customers()
+
+        assert counts == {'customers': 150, 'subscriptions': 1}
+        assert lookup_stripe_customer('+1000000149')['customer_id'] == 'cus_149'
+        assert lookup_stripe_customer('+1000000007')['subscription_id'] == 'sub_7'
+
+
+class TestStripeSubscriptionMetadata:
+    """Test the local subscription id -> phone number and plan store."""
+
+    @pytest.fixture
+    def subscriptions_table(self, stripe_tables):
+        from app.stripe_integration import stripe_subscriptions_table_name
+
+        return stripe_tables.Table(stripe_subscriptions_table_name)
+
+    def test_invoices_resolve_subscriptions_seen_at_creation(self, subscriptions_table):
+        from app.stripe_integration import handle_subscription_created, handle_payment_succeeded
+
+        subscription = make_subscription(plan_type='yearly')
+        with patch('app.premium.get_premium_table') as mock_premium_table, \
+             patch('app.stripe_integration.stripe.Subscription.retrieve') as mock_retrieve:
+            handle_subscription_created(subscription)
+            handle_payment_succeeded(Mock(subscription='sub_1'))
+
+        mock_retrieve.assert_not_called()
+        premium_item = mock_premium_table.return_value.put_item.call_args[1]['Item']
+        assert premium_item['subscription_type'] == 'yearly'
+        assert premium_item['stripe_subscription_id'] == 'sub_1'
+
+    def test_unknown_subscriptions_are_fetched_once(self, subscriptions_table):
+        from app.stripe_integration import get_subscription_metadata
+
+        subscription = make_subscription('sub_2', status='past_due')
+        with patch('app.stripe_integration.stripe.Subscription.retrieve', return_value=subscription) as mock_retrieve:
+            first = get_subscription_metadata('sub_2')
+            second = get_subscription_metadata('sub_2')
+
+        mock_retrieve.assert_called_once_with('sub_2')
+        assert first['phone_number'] == second['phone_number'] == '+1234567890'
+        assert second['status'] == 'past_due'
+
+    def test_invoices_without_a_subscription_or_phone_number_are_ignored(self, subscriptions_table):
+        from app.stripe_integration import handle_payment_succeeded, handle_payment_failed
+
+        anonymous = make_subscription('sub_3')
+        anonymous.metadata = {}
+        with patch('app.premium.get_premium_table') as mock_premium_table, \
+             patch('app.stripe_integration.stripe.Subscription.retrieve', return_value=anonymous) as mock_retrieve:
+            for handler in (handle_payment_succeeded, handle_payment_failed):
+                handler(Mock(id='in_one_off', subscription=None))
+                handler(Mock(id='in_1', subscription='sub_3'))
+
+        assert {call.args for call in mock_retrieve.call_args_list} == {('sub_3',)}
+        mock_premium_table.return_value.put_item.assert_not_called()
+
+
+class TestSubscriptionStatusProjection:
+    """Test serving subscription status from the webhook-maintained projection."""
+
+    @pytest.fixture
+    def customers_table(self, stripe_tables):
+        import app.stripe_integration as stripe_integration
+
+        stripe_integration.clear_subscription_status_stats()
+        with patch('app.stripe_integration.ensure_stripe_configured'):
+            yield stripe_tables.Table(stripe_integration.stripe_customers_table_name)
+
+    def test_webhook_status_is_served_without_stripe(self, client, customers_table, mock_auth_session):
+        from app.stripe_integration import handle_subscription_created, handle_subscription_deleted, get_subscription_status_stats
+
+        with patch('app.premium.get_premium_table'):
+            handle_subscription_created(make_subscription())
+
+        with patch('app.stripe_integration.stripe.Subscription.list') as mock_list, \
+             patch('app.stripe_integration.stripe.Customer.search') as mock_search:
+            response = client.get('/api/stripe/subscription-status/+1234567890',
+                                  headers={'Authorization': 'Bearer valid-token'})
+            data = json.loads(response.data)
+            assert data['has_subscription'] is True
+            assert data['subscription']['current_period_end'] == 1234567890
+
+            with patch('app.premium.get_premium_table'):
+                handle_subscription_deleted(make_subscription(status='canceled'))
+            response = client.get('/api/stripe/subscription-status/+1234567890',
+                                  headers={'Authorization': 'Bearer valid-token'})
+            assert json.loads(response.data)['has_subscription'] is False
+
+        mock_list.assert_not_called()
+        mock_search.assert_not_called()
+        assert get_subscription_status_stats()['fresh'] == 2
+
+    def test_out_of_order_events_do_not_undo_newer_ones(self, customers_table):
+        from app.stripe_integration import apply_stripe_event, lookup_stripe_customer
+
+        def event(event_type, created, status='active'):
+            return {'id': f'evt_{created}', 'type': event_type, 'created': created,
+                    'data': {'object': make_subscription(status=status)}}
+
+        with patch('app.premium.get_premium_table') as mock_premium_table:
+            apply_stripe_event(event('customer.subscription.created', 100))
+            apply_stripe_event(event('customer.subscription.deleted', 300, status='canceled'))
+            # Delivered late: both predate the cancellation
+            apply_stripe_event(event('customer.subscription.updated', 200))
+            apply_stripe_event(event('customer.subscription.created', 100))
+
+        entry = lookup_stripe_customer('+1234567890')
+        assert 'subscription_status' not in entry and 'subscription_id' not in entry
+        assert mock_premium_table.return_value.put_item.call_count == 1
+        mock_premium_table.return_value.delete_item.assert_called_once()
+
+    def test_redelivered_event_is_applied_again(self, customers_table):
+        from app.stripe_integration import apply_stripe_event, lookup_stripe_customer
+
+        updated = {'id': 'evt_1', 'type': 'customer.subscription.updated', 'created': 100,
+                   'data': {'object': make_subscription(status='past_due')}}
+        apply_stripe_event(updated)
+        apply_stripe_event(updated)
+
+        assert lookup_stripe_customer('+1234567890')['subscription_status']['status'] == 'past_due'
+
+    def test_first_read_goes_through_to_stripe_once(self, customers_table):
+        from app.stripe_integration import get_subscription_status, get_subscription_status_stats
+
+        customers_table.put_item(Item={'phone_number': '+1234567890', 'customer_id': 'cus_1'})
+        with patch('app.stripe_integration.stripe.Subscription.list', return_value=Mock(data=[make_subscription()])) as mock_list:
+            first, _ = get_subscription_status('+1234567890')
+            second, _ = get_subscription_status('+1234567890')
+
+        mock_list.assert_called_once()
+        assert first == second
+        assert second['id'] == 'sub_1'
+        assert get_subscription_status_stats()['misses'] == 1
+
+    def store_stale_status(self, customers_table):
+        from app.stripe_integration import STRIPE_STATUS_TTL
+
+        synced_at = (datetime.utcnow() - timedelta(seconds=STRIPE_STATUS_TTL + 60)).isoformat()
+        customers_table.put_item(Item={
+            'phone_number': '+1234567890', 'customer_id': 'cus_1', 'status_synced_at': synced_at,
+            'subscription_status': {'id': 'sub_1', 'status': 'active', 'current_period_end': 1234567890}
+        })
+        return synced_at
+
+    def test_stale_status_is_refreshed_inline(self, customers_table):
+        from app.stripe_integration import get_subscription_status, get_subscription_status_stats
+
+        self.store_stale_status(customers_table)
+        with patch('app.stripe_integration.stripe.Subscription.list', return_value=Mock(data=[])):
+            assert get_subscription_status('+1234567890')[0] is None
+            assert get_subscription_status('+1234567890')[0] is None
+
+        stats = get_subscription_status_stats()
+        assert (stats['refreshed'], stats['fresh'], stats['stale']) == (1, 1, 0)
+
+    def test_stale_status_is_served_when_stripe_is_slow(self, customers_table):
+        import threading
+        import app.stripe_integration as stripe_integration
+
+        synced_at = self.store_stale_status(customers_table)
+        release = threading.Event()
+        with patch.object(stripe_integration, 'STRIPE_STATUS_REFRESH_TIMEOUT', 0.05), \
+             patch('app.stripe_integration.stripe.Subscription.list', side_effect=lambda **kwargs: release.wait(5)):
+            served, served_synced_at = stripe_integration.get_subscription_status('+1234567890')
+            release.set()
+
+        assert served['id'] == 'sub_1' and served_synced_at == synced_at
+        stats = stripe_integration.get_subscription_status_stats()
+        assert (stats['stale'], stats['refresh_timeouts']) == (1, 1)
+        assert stats['max_age_seconds'] > stripe_integration.STRIPE_STATUS_TTL
+
+
+    def test_late_refresh_does_not_overwrite_a_newer_webhook(self, customers_table):
+        import time
+        from app.stripe_integration import apply_stripe_event, refresh_subscription_status, lookup_stripe_customer
+
+        customers_table.put_item(Item={
+            'phone_number': '+1234567890', 'customer_id': 'cus_1', 'subscription_id': 'sub_1',
+            'subscription_status': {'id': 'sub_1', 'status': 'active'}
+        })
+        deleted = {'id': 'evt_deleted', 'type': 'customer.subscription.deleted', 'created': int(time.time()) + 5,
+                   'data': {'object': make_subscription(status='canceled')}}
+
+        def list_then_cancel(**kwargs):
+            # The subscription is cancelled while the refresh is still waiting on Stripe
+            active = Mock(data=[make_subscription()])
+            with patch('app.premium.get_premium_table'):
+                apply_stripe_event(deleted)
+            return active
+
+        with patch('app.stripe_integration.stripe.Subscription.list', side_effect=list_then_cancel):
+            status, _ = refresh_subscription_status('+1234567890')
+
+        assert status is None
+        assert 'subscription_status' not in lookup_stripe_customer('+1234567890')
+
+
+class TestWebhookDeduplication:
+    """Test fast acknowledgement and deduplication of webhook deliveries."""
+
+    @pytest.fixture
+    def events_table(self):
+        import boto3
+        from moto import mock_aws
+        import app.stripe_integration as stripe_integration
+
+        with mock_aws():
+            dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+            table = dynamodb.create_table(
+                TableName=stripe_integration.stripe_events_table_name,
+                KeySchema=[{'AttributeName': 'event_id', 'KeyType': 'HASH'}],
+                AttributeDefinitions=[{'AttributeName': 'event_id', 'AttributeType': 'S'}],
+                BillingMode='PAY_PER_REQUEST'
+            )
+            with patch.object(stripe_integration, '_stripe_events_table', table):
+                yield table
+
+    def post_event(self, client, event):
+        with patch('app.stripe_integration.stripe.Webhook.construct_event', return_value=event):
+            return client.post('/api/stripe/webhook', data='{}', headers={'Stripe-Signature': 'sig'})
+
+    def test_redelivered_events_are_queued_once(self, client, events_table):
+        event = {'id': 'evt_1', 'type': 'invoice.payment_succeeded', 'data': {'object': Mock(customer='cus_1')}}
+
+        with patch('app.stripe_integration.get_stripe_event_queue') as mock_queue, \
+             patch('app.stripe_integration.handle_payment_succeeded') as mock_handler:
+            first = self.post_event(client, event)
+            second = self.post_event(client, event)
+
+        assert first.get_json()['status'] == 'success'
+        assert second.get_json()['status'] == 'duplicate'
+        mock_queue.return_value.put.assert_called_once_with('evt_1', '{}', 'cus_1')
+        mock_handler.assert_not_called()
+
+    def test_unqueued_events_are_accepted_on_retry(self, client, events_table):
+        event = {'id': 'evt_2', 'type': 'invoice.payment_failed', 'data': {'object': Mock(customer='cus_1')}}
+
+        with patch('app.stripe_integration.get_stripe_event_queue') as mock_queue:
+            mock_queue.return_value.put.side_effect = [Exception('queue unavailable'), None]
+            failed = self.post_event(client, event)
+            retried = self.post_event(client, event)
+
+        assert failed.status_code == 500
+        assert retried.get_json()['status'] == 'success'
 
 
 class TestStripeAuthentication:
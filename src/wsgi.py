@@ -27,3 +27,20 @@ def before_request():
 def handler(event, context):
     from aws_lambda_wsgi import response
     return response(app, event, context)
+
+def dream_manifest_handler(event, context):
+    """Keep per-user dream manifests and analysis aggregates current from S3 object notifications"""
+    import boto3
+    from app.dream_store import apply_s3_event
+    from app.dream_analysis import apply_dream_analysis_event
+    s3_client = boto3.client('s3')
+    return {
+        'applied': apply_s3_event(s3_client, event),
+        'aggregated': apply_dream_analysis_event(s3_client, event)
+    }
+
+def stripe_events_handler(event, context):
+    """Apply queued Stripe webhook events in order, reporting failed messages for redelivery"""
+    from app.event_queue import apply_sqs_records
+    from app.stripe_integration import apply_stripe_event_payload
+    return apply_sqs_records(event['Records'], apply_stripe_event_payload)